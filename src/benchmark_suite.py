@@ -0,0 +1,109 @@
+"""benchmark_suite.py
+
+Measures how the recommendation and portfolio paths (strategy, mark to
+market, financial cache, model validation, portfolio repricing and trading)
+scale with the size of the ticker universe, against the local Intrinio and
+TDAmeritrade simulators, and compares the results with a stored baseline.
+"""
+import argparse
+import logging
+import os
+
+# the simulators accept any API key
+os.environ.setdefault('INTRINIO_API_KEY', 'simulator')
+
+import pandas as pd
+from services import benchmark_suite_svc
+from exception.exceptions import ValidationError
+from support import constants
+from support import logging_definition
+
+log = logging.getLogger()
+
+
+def parse_list(list_str: str, item_type: type):
+    '''
+        Converts a comma separated list into a list of 'item_type' values
+    '''
+    try:
+        return [item_type(i) for i in list_str.split(',')]
+    except Exception:
+        raise ValidationError(
+            "%s is invalid. Expecting a comma separated list" % list_str, None)
+
+
+def main():
+    """
+        Main Function for this script
+    """
+
+    description = """
+                Runs the benchmark suite against synthetic universes of the
+                supplied sizes, and reports regressions against a baseline.
+                Returns a non zero exit code if any regression is found.
+              """
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-benchmarks", help="Comma separated list of benchmarks (%s)" % ", ".join(benchmark_suite_svc.BENCHMARKS.keys()),
+        type=str, default=",".join(benchmark_suite_svc.BENCHMARKS.keys()))
+    parser.add_argument(
+        "-universe_sizes", help="Comma separated list of universe sizes", type=str,
+        default=",".join([str(s) for s in benchmark_suite_svc.BENCHMARK_UNIVERSE_SIZES]))
+    parser.add_argument(
+        "-runs", help="Number of runs of each benchmark", type=int, default=3)
+    parser.add_argument(
+        "-baseline_file", help="Baseline file", type=str, default=constants.BENCHMARK_BASELINE_FILE)
+    parser.add_argument(
+        "-save_baseline", help="Save the results as the new baseline", action="store_true")
+    parser.add_argument(
+        "-threshold", help="Relative change reported as a regression, e.g. 0.25",
+        type=float, default=benchmark_suite_svc.BENCHMARK_REGRESSION_THRESHOLD)
+
+    args = parser.parse_args()
+
+    log.info("Parameters:")
+    log.info("Benchmarks: %s" % args.benchmarks)
+    log.info("Universe Sizes: %s" % args.universe_sizes)
+    log.info("Runs: %d" % args.runs)
+    log.info("Baseline File: %s" % args.baseline_file)
+    log.info("Threshold: %.2f" % args.threshold)
+
+    try:
+        benchmark_names = parse_list(args.benchmarks, str)
+        universe_sizes = parse_list(args.universe_sizes, int)
+
+        # the benchmarked code logs every ticker and order
+        log.setLevel(logging.WARNING)
+        try:
+            results = benchmark_suite_svc.run_suite(
+                benchmark_names, universe_sizes, args.runs)
+        finally:
+            log.setLevel(logging.INFO)
+
+        if args.save_baseline:
+            benchmark_suite_svc.save_baseline(args.baseline_file, results)
+            log.info("Saved baseline to %s" % args.baseline_file)
+            baseline = results
+        elif os.path.exists(args.baseline_file):
+            baseline = benchmark_suite_svc.load_baseline(args.baseline_file)
+        else:
+            log.warning("Baseline file %s was not found" % args.baseline_file)
+            baseline = []
+
+        report = benchmark_suite_svc.regression_report(
+            results, baseline, args.threshold)
+
+        pd.options.display.float_format = '{:.4f}'.format
+        print(report.to_string(index=False))
+
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        exit(-1)
+
+    if (report['status'] == 'REGRESSION').any():
+        log.warning("Performance regressions were found")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
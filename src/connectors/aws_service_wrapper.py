@@ -7,21 +7,63 @@ This module wraps the boto SDK an offers the following value add to the applicat
     2) Automatically catch AWS exceptions and rethrow them as a custom exception
     3) Provide filtering options that are meaningful to the application
 """
-import boto3
+import threading
 from exception.exceptions import ValidationError, AWSError
-from support import util, constants
+from support import util, constants, startup_profiler
 import logging
 
 log = logging.getLogger()
 
-# Global clients available to this module]
-try:
-    CF_CLIENT = boto3.client('cloudformation')
-    S3_CLIENT = boto3.client('s3')
-    SNS_CLIENT = boto3.client('sns')
+# Global clients available to this module, as CF_CLIENT, S3_CLIENT and SNS_CLIENT.
+# boto3 is imported and the clients are created on first use, so that
+# entry points that never call AWS don't pay for it
+AWS_CLIENTS = {
+    'CF_CLIENT': 'cloudformation',
+    'S3_CLIENT': 's3',
+    'SNS_CLIENT': 'sns'
+}
+
+# pylint: disable=invalid-name
+aws_clients = {}
+aws_clients_lock = threading.Lock()
+
+
+def _aws_client(client_name: str):
+    '''
+        Returns one of the boto3 clients (see AWS_CLIENTS), creating it
+        the first time it is used
+
+        Raises
+        ---------
+        AWSError if the client could not be created
+    '''
+    try:
+        client = aws_clients[client_name]
+    except KeyError:
+        with aws_clients_lock:
+            if client_name not in aws_clients:
+                try:
+                    import boto3
+                    aws_clients[client_name] = boto3.client(
+                        AWS_CLIENTS[client_name])
+                except Exception as e:
+                    raise AWSError("Could not connect to AWS", e)
+
+            client = aws_clients[client_name]
+
+    startup_profiler.record_api_call('aws')
+
+    return client
+
+
+def __getattr__(name: str):
+    '''
+        Resolves the client module attributes (e.g. S3_CLIENT) on first access
+    '''
+    if name in AWS_CLIENTS:
+        return _aws_client(name)
+    raise AttributeError("module %s has no attribute %s" % (__name__, name))
 
-except Exception as e:
-    raise AWSError("Could not connect to AWS", e)
 
 # A simple in memory cached used to reduce roundtrips to AWS
 # pylint: disable=invalid-name
@@ -73,7 +115,7 @@ def cf_list_exports(stack_name_filter: list):
         log.debug("Exports not found. Looking them up")
 
     try:
-        paginator = CF_CLIENT.get_paginator('list_exports')
+        paginator = _aws_client('CF_CLIENT').get_paginator('list_exports')
         response_iterator = paginator.paginate()
 
         for page in response_iterator:
@@ -112,7 +154,7 @@ def s3_download_object(bucket_name: str, object_name: str, dest_path: str):
         the destination path (path + filename)
     '''
     try:
-        S3_CLIENT.download_file(bucket_name, object_name, dest_path)
+        _aws_client('S3_CLIENT').download_file(bucket_name, object_name, dest_path)
     except Exception as e:
         raise AWSError("Could not download s3://%s/%s --> %s" %
                        (bucket_name, object_name, dest_path), e)
@@ -123,7 +165,7 @@ def s3_upload_object(source_path: str, bucket_name: str, object_name: str):
         Uploads a file from the source_path (path + file) to the destination bucket
     '''
     try:
-        S3_CLIENT.upload_file(source_path, bucket_name, object_name)
+        _aws_client('S3_CLIENT').upload_file(source_path, bucket_name, object_name)
     except Exception as e:
         raise AWSError("Could not upload %s --> s3://%s/%s" %
                        (source_path, bucket_name, object_name), e)
@@ -134,7 +176,7 @@ def s3_upload_ascii_string(object_contents: str, s3_bucket_name: str, s3_object_
         Uploads an ASCII string directly to S3, bypassing a local file.
     '''
     try:
-        S3_CLIENT.put_object(
+        _aws_client('S3_CLIENT').put_object(
             Body=bytes(object_contents, 'ascii'),
             Bucket=s3_bucket_name,
             Key=s3_object_name
@@ -149,7 +191,7 @@ def sns_publish_notification(topic_arn: str, subject: str, message: str):
         Publishes a simple SNS message
     '''
     try:
-        SNS_CLIENT.publish(
+        _aws_client('SNS_CLIENT').publish(
             TopicArn=topic_arn,
             Message=message,
             Subject=subject
@@ -6,36 +6,267 @@ pricing data and company historical data.
 
 It also converts Intrinio raw responses into easier to digest dictionaries
 that are easier to consume by the application.
+
+The duration of every call to the public functions is measured, see the
+timing module.
+
+The Intrinio SDK is imported, and the API key is read, only when the first
+API client is used, so that importing this module is cheap when all data is
+served by the cache. The clients are available as FUNDAMENTALS_API,
+COMPANY_API and SECURITY_API.
+
+Every HTTP request made by the clients goes through a shared rate limiter,
+which keeps them within the Intrinio API limits, and requests rejected
+because the limits were exceeded anyway are retried. See _rate_limited_request()
+The limiter only applies to the current process, so processes calling the API
+at the same time must share the rate. See share_rate_limit()
 """
 
-import intrinio_sdk
 import atexit
+import email.utils
+import functools
+import math
+import random
+import sys
+import threading
+import time
+from array import array
+import numpy as np
 import requests
-from intrinio_sdk.rest import ApiException
+from urllib3.util.retry import Retry
 import os
 from exception.exceptions import DataError, ValidationError
 from connectors import intrinio_util
+from support import constants, startup_profiler, timing
+from support.rate_limiter import RateLimiter
 from support.financial_cache import cache
+from support.price_store import price_store
 import logging
 import datetime
 from datetime import timedelta
 
-try:
-    API_KEY = os.environ['INTRINIO_API_KEY']
-except KeyError as ke:
-    raise ValidationError("INTRINIO_API_KEY was not set", None)
+log = logging.getLogger()
+
+# base URL of all APIs. It may be overridden to point to a simulator
+INTRINIO_API_URL = os.environ.get(
+    'INTRINIO_API_URL', 'https://api-v2.intrinio.com')
+
+# client name => SDK class name of the APIs used by this module
+INTRINIO_API_CLIENTS = {
+    'FUNDAMENTALS_API': 'FundamentalsApi',
+    'COMPANY_API': 'CompanyApi',
+    'SECURITY_API': 'SecurityApi'
+}
+
+# client name => API client, created on first use. See _api_client()
+api_clients = {}
+api_clients_lock = threading.Lock()
+
+# maximum sustained rate of API calls, and the number of calls that may
+# be made at once after the API was idle
+INTRINIO_MAX_REQUESTS_PER_MINUTE = float(os.environ.get(
+    'INTRINIO_MAX_REQUESTS_PER_MINUTE', 300))
+INTRINIO_MAX_BURST = 10
+
+# HTTP status code returned by Intrinio when the API limits are exceeded
+INTRINIO_RATE_LIMITED_STATUS = 429
+
+# number of times a rate limited call is retried, and the bounds (in seconds)
+# of the exponential backoff used when the response has no Retry-After header
+INTRINIO_MAX_RETRIES = 5
+INTRINIO_RETRY_BASE_DELAY = 1
+INTRINIO_RETRY_MAX_DELAY = 60
+
+# pylint: disable=invalid-name
+rate_limiter = RateLimiter(
+    INTRINIO_MAX_REQUESTS_PER_MINUTE, burst=INTRINIO_MAX_BURST)
+
+
+def _api_key():
+    """
+      Returns the Intrinio API key, read from the INTRINIO_API_KEY
+      environment variable
+    """
+    try:
+        return os.environ['INTRINIO_API_KEY']
+    except KeyError:
+        raise ValidationError("INTRINIO_API_KEY was not set", None)
+
+
+def _api_client(client_name: str):
+    """
+      Returns one of the Intrinio API clients (see INTRINIO_API_CLIENTS),
+      importing the SDK and creating the client the first time it is used.
+
+      Raises
+      -------
+      ValidationError if the API key was not set
+    """
+    try:
+        api = api_clients[client_name]
+    except KeyError:
+        with api_clients_lock:
+            if client_name not in api_clients:
+                import intrinio_sdk
+
+                configuration = intrinio_sdk.Configuration()
+                configuration.api_key['api_key'] = _api_key()
+                configuration.host = INTRINIO_API_URL
+
+                # allow one connection per data loader thread
+                configuration.connection_pool_maxsize = max(
+                    configuration.connection_pool_maxsize, constants.DATA_LOADER_MAX_WORKERS)
+
+                # rate limited requests are retried by _rate_limited_request()
+                # rather than by the SDK or urllib3, whose retries are not
+                # coordinated across threads
+                configuration.retries['allow'] = False
+
+                api_client = intrinio_sdk.ApiClient(configuration)
+                api_client.rest_client.pool_manager.connection_pool_kw['retries'] = \
+                    Retry.DEFAULT.new(respect_retry_after_header=False)
+                api_client.request = functools.partial(
+                    _rate_limited_request, api_client.request)
+
+                api_class = getattr(
+                    intrinio_sdk, INTRINIO_API_CLIENTS[client_name])
+                api_clients[client_name] = api_class(api_client)
+
+            api = api_clients[client_name]
+
+    startup_profiler.record_api_call('intrinio')
+
+    return api
+
+
+def _api_exception():
+    """
+      Returns the exception type raised by the Intrinio SDK
+    """
+    from intrinio_sdk.rest import ApiException
+    return ApiException
+
+
+def _rate_limited_request(request_function: object, method: str, url: str, *args, **kwargs):
+    """
+      Wraps the request() method of the Intrinio API clients, which executes
+      every HTTP request, so that requests are only made when the rate limiter
+      allows it.
+
+      Requests rejected because the API limits were exceeded are retried up
+      to INTRINIO_MAX_RETRIES times, after the delay requested by the
+      Retry-After header, or a jittered exponential backoff.
+      All threads are paused during the delay.
+
+      Raises
+      -------
+      The SDK's ApiException if the request fails, or is still rate limited
+      after all retries
+    """
+    api_exception = _api_exception()
+
+    for attempt in range(0, INTRINIO_MAX_RETRIES + 1):
+        rate_limiter.acquire()
+        try:
+            return request_function(method, url, *args, **kwargs)
+        except api_exception as ae:
+            if ae.status != INTRINIO_RATE_LIMITED_STATUS or attempt == INTRINIO_MAX_RETRIES:
+                raise ae
+
+            delay = _retry_delay(ae, attempt)
+            log.warning("Intrinio API limits exceeded while calling %s. Retrying in %.1f seconds" %
+                        (url, delay))
+            rate_limiter.pause(delay)
+
+
+def _retry_delay(api_exception: Exception, attempt: int):
+    """
+      Returns the number of seconds to wait before retrying a rate limited
+      call. The Retry-After header (in seconds or as an HTTP date) is used
+      when present, otherwise the delay grows exponentially with the
+      number of attempts, with a random jitter so that clients do not
+      retry in lockstep. Delays never exceed INTRINIO_RETRY_MAX_DELAY
+    """
+    retry_after = None
+    if api_exception.headers is not None:
+        retry_after = api_exception.headers.get('Retry-After')
+
+    if retry_after is not None:
+        try:
+            return min(max(float(retry_after), 0), INTRINIO_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+
+        try:
+            retry_time = email.utils.parsedate_to_datetime(
+                retry_after).timestamp()
+            return min(max(retry_time - time.time(), 0), INTRINIO_RETRY_MAX_DELAY)
+        except (TypeError, ValueError):
+            pass
+
+    backoff = min(INTRINIO_RETRY_BASE_DELAY * 2 **
+                  attempt, INTRINIO_RETRY_MAX_DELAY)
+
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def __getattr__(name: str):
+    """
+      Resolves the API clients (e.g. FUNDAMENTALS_API) and API_KEY
+      module attributes on first access
+    """
+    if name in INTRINIO_API_CLIENTS:
+        return _api_client(name)
+    if name == 'API_KEY':
+        return _api_key()
+    raise AttributeError("module %s has no attribute %s" % (__name__, name))
+
+
+def set_api_url(url: str):
+    """
+      Points all Intrinio API calls to the supplied base URL,
+      e.g. 'http://127.0.0.1:5000'
+    """
+    global INTRINIO_API_URL
+
+    # every SDK client holds its own copy of the configuration. Clients
+    # created later will read the new URL
+    with api_clients_lock:
+        INTRINIO_API_URL = url
+        for api in api_clients.values():
+            api.api_client.configuration.host = url
+
+
+def share_rate_limit(processes: int):
+    """
+      Limits this process to its share of the configured API rate, when
+      the API is called by 'processes' processes at the same time, each
+      with its own rate limiter. Used to initialize worker processes.
+    """
+    global rate_limiter
+
+    if processes < 1:
+        raise ValidationError(
+            "Invalid number of processes: %s. Must be at least 1" % str(processes), None)
 
-intrinio_sdk.ApiClient().configuration.api_key['api_key'] = API_KEY
+    rate_limiter = RateLimiter(INTRINIO_MAX_REQUESTS_PER_MINUTE / processes,
+                               burst=max(1, INTRINIO_MAX_BURST // processes))
 
 
-FUNDAMENTALS_API = intrinio_sdk.FundamentalsApi()
-COMPANY_API = intrinio_sdk.CompanyApi()
-SECURITY_API = intrinio_sdk.SecurityApi()
+# Version of the format used to store Intrinio data in the cache. It is part of
+# every cache key, so that entries stored using a previous format are ignored
+INTRINIO_CACHE_FORMAT_VERSION = 3
+INTRINIO_CACHE_PREFIX = 'intrinio-v%d' % INTRINIO_CACHE_FORMAT_VERSION
 
+# Data for closed historical periods never expires, while data for periods
+# that include the current date is refreshed after this many seconds
+INTRINIO_CACHE_RECENT_TTL_SECONDS = 60 * 60
 
-INTRINIO_CACHE_PREFIX = 'intrinio'
+# the maximum page size allowed by the stock prices API
+INTRINIO_PRICE_PAGE_SIZE = 10000
 
 
+@timing.timed()
 def test_api_endpoint():
     """
       Tests the API endpoint directly and throws a DataError if
@@ -43,11 +274,12 @@ def test_api_endpoint():
       This is used to validate that the API key works
     """
 
-    url = 'https://api-v2.intrinio.com/companies/AAPL'
+    url = '%s/companies/AAPL' % INTRINIO_API_URL
 
+    rate_limiter.acquire()
     try:
         response = requests.request('GET', url, params={
-            'api_key': API_KEY
+            'api_key': _api_key()
         }, timeout=10)
     except Exception as e:
         raise DataError("Could not execute GET to %s" % url, e)
@@ -57,6 +289,7 @@ def test_api_endpoint():
             "Invalid response from Intrinio Endpoint", Exception(r.text))
 
 
+@timing.timed()
 def get_target_price_std_dev(ticker: str, start_date: datetime, end_date: datetime):
     """
       retrieves the 'zacks_target_price_std_dev' data point for the supplied date 
@@ -69,6 +302,7 @@ def get_target_price_std_dev(ticker: str, start_date: datetime, end_date: dateti
     )
 
 
+@timing.timed()
 def get_target_price_mean(ticker: str, start_date: datetime, end_date: datetime):
     """
       retrieves the 'zacks_target_price_mean' data point for the supplied date 
@@ -81,6 +315,7 @@ def get_target_price_mean(ticker: str, start_date: datetime, end_date: datetime)
     )
 
 
+@timing.timed()
 def get_target_price_cnt(ticker: str, start_date: datetime, end_date: datetime):
     """
       retrieves the 'zacks_target_price_cnt' data point for the supplied date 
@@ -93,10 +328,58 @@ def get_target_price_cnt(ticker: str, start_date: datetime, end_date: datetime):
     )
 
 
+@timing.timed()
+def get_company_historical_data_multi(ticker: str, start_date: datetime, end_date: datetime, tags: list):
+    """
+      retrieves multiple company historical data points (e.g. 'zacks_target_price_mean'
+      and 'zacks_target_price_std_dev') for the supplied date range with a
+      single logical fetch, and aggregates each one by year and month.
+      see the '_get_company_historical_data_multi()' pydoc for specific information
+      or parameters and exceptions.
+
+      Returns
+      -------
+      A dictionary of tag=>year=>month=>value. For example:
+
+      {
+        'zacks_target_price_mean': {
+          2019: {
+            9 : 15
+          }
+        },
+        'zacks_target_price_std_dev': {
+          2019: {
+            9 : 1.5
+          }
+        }
+      }
+    """
+    historical_data = _get_company_historical_data_multi(ticker, intrinio_util.date_to_string(
+        start_date), intrinio_util.date_to_string(end_date), tags)
+
+    return {tag: _aggregate_by_year_month(historical_data[tag]) for tag in tags}
+
+
+@timing.timed()
+def is_company_historical_data_multi_cached(ticker: str, start_date: datetime, end_date: datetime, tags: list):
+    """
+      Returns true if the results of 'get_company_historical_data_multi()'
+      for the supplied parameters are already present in the cache.
+    """
+    return cache.contains(_company_historical_data_multi_cache_key(
+        ticker, intrinio_util.date_to_string(start_date), intrinio_util.date_to_string(end_date), tags))
+
+
+@timing.timed()
 def get_daily_stock_close_prices(ticker: str, start_date: datetime, end_date: datetime):
     '''
       Returns a list of historical daily stock prices given a ticker symbol and
-      a range of dates.  Currently only returns one page of 100 results
+      a range of dates.
+
+      Prices are served from the local price store (see support.price_store).
+      Only the portions of the date range that were never fetched before are
+      requested from Intrinio (all pages), and are then merged into the store.
+      See '_get_daily_stock_close_price_history()'.
 
       Parameters
       ----------
@@ -121,36 +404,28 @@ def get_daily_stock_close_prices(ticker: str, start_date: datetime, end_date: da
     start_date_str = intrinio_util.date_to_string(start_date)
     end_date_str = intrinio_util.date_to_string(end_date)
 
-    price_dict = {}
+    (dates, closes) = _get_daily_stock_close_price_history(
+        ticker, start_date_str, end_date_str)
 
-    cache_key = "%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
-                                    ticker, start_date_str, end_date_str, "closing-prices")
-    api_response = cache.read(cache_key)
-
-    if api_response is None:
-        try:
-            api_response = SECURITY_API.get_security_stock_prices(
-                ticker, start_date=start_date_str, end_date=end_date_str, frequency='daily', page_size=100)
-            cache.write(cache_key, api_response)
-        except ApiException as ae:
-            raise DataError("API Error while reading price data from Intrinio Security API: ('%s', %s - %s)" %
-                            (ticker, start_date_str, end_date_str), ae)
-        except Exception as e:
-            raise ValidationError("Unknown Error while reading price data from Intrinio Security API: ('%s', %s - %s)" %
-                                  (ticker, start_date_str, end_date_str), e)
-
-    price_list = api_response.stock_prices
-
-    if len(price_list) == 0:
+    if len(dates) == 0:
         raise DataError("No prices returned from Intrinio Security API: ('%s', %s - %s)" %
                         (ticker, start_date_str, end_date_str), None)
 
-    for price in price_list:
-        price_dict[intrinio_util.date_to_string(price.date)] = price.close
+    return {str(date): float(close) for (date, close) in zip(dates, closes)}
 
-    return price_dict
+
+@timing.timed()
+def is_daily_stock_close_prices_cached(ticker: str, start_date: datetime, end_date: datetime):
+    """
+      Returns true if the price store already covers the supplied date range
+      for the ticker, meaning that 'get_daily_stock_close_prices()' will not
+      call the Intrinio API.
+    """
+    return len(price_store.missing_date_ranges(ticker, intrinio_util.date_to_string(
+        start_date), intrinio_util.date_to_string(end_date))) == 0
 
 
+@timing.timed()
 def get_latest_close_price(ticker, price_date: datetime, max_looback: int):
     """
       Retrieves the most recent close price given a price_date and a lookback window
@@ -166,13 +441,84 @@ def get_latest_close_price(ticker, price_date: datetime, max_looback: int):
 
     looback_date = price_date - timedelta(days=max_looback)
 
-    price_dict = get_daily_stock_close_prices(ticker, looback_date, price_date)
+    start_date_str = intrinio_util.date_to_string(looback_date)
+    end_date_str = intrinio_util.date_to_string(price_date)
+
+    (dates, closes) = _get_daily_stock_close_price_history(
+        ticker, start_date_str, end_date_str)
+
+    if len(dates) == 0:
+        raise DataError("No prices returned from Intrinio Security API: ('%s', %s - %s)" %
+                        (ticker, start_date_str, end_date_str), None)
+
+    return (str(dates[-1]), float(closes[-1]))
+
 
-    price_date = sorted(list(price_dict.keys()), reverse=True)[0]
+@timing.timed()
+def get_latest_close_prices(ticker_list: list, price_date_list: list, max_looback: int):
+    """
+      Retrieves the most recent close prices for a list of tickers and a list of
+      price dates using a lookback window. This is the batched equivalent of
+      get_latest_close_price().
+
+      Prices for each ticker are loaded into the local price store once,
+      covering all the supplied dates, and every date is then resolved with a
+      single vectorized lookup.
+
+      Parameters
+      ----------
+      ticker_list : list
+        list of ticker symbols
+      price_date_list : list
+        list of price dates as python date objects
+      max_looback : int
+        the maximum number of days (1..9) to look back from each price date
+
+      Raises
+      -----------
+      ValidationError if parameters are incorrect
+      DataError if a price could not be found for any ticker/date
+
+      Returns
+      -----------
+      a NumPy array of close prices shaped (len(ticker_list), len(price_date_list))
+    """
+
+    if max_looback not in range(1, 10):
+        raise ValidationError(
+            "Invalid 'max_looback'. Allowed values are [1..10]", None)
+
+    if ticker_list is None or price_date_list is None or len(price_date_list) == 0:
+        raise ValidationError(
+            "Invalid ticker or price date list", None)
 
-    return (price_date, price_dict[price_date])
+    price_dates = np.array([intrinio_util.date_to_string(d)
+                            for d in price_date_list], dtype='datetime64[D]')
+    lookback_dates = price_dates - np.timedelta64(max_looback, 'D')
 
+    start_date_str = str(lookback_dates.min())
+    end_date_str = str(price_dates.max())
 
+    prices = np.empty((len(ticker_list), len(price_dates)))
+
+    for (i, ticker) in enumerate(ticker_list):
+        (dates, closes) = _get_daily_stock_close_price_history(
+            ticker, start_date_str, end_date_str)
+
+        latest = np.searchsorted(dates, price_dates, 'right') - 1
+        found = latest >= 0
+        found[found] = dates[latest[found]] >= lookback_dates[found]
+
+        if not found.all():
+            raise DataError("No prices returned from Intrinio Security API: ('%s', %s)" %
+                            (ticker, str(price_dates[~found][0])), None)
+
+        prices[i] = closes[latest]
+
+    return prices
+
+
+@timing.timed()
 def get_historical_revenue(ticker: str, year_from: int, year_to: int):
     '''
       Returns a dictionary of year->"total revenue" for the supplied ticker and
@@ -198,6 +544,7 @@ def get_historical_revenue(ticker: str, year_from: int, year_to: int):
     )
 
 
+@timing.timed()
 def get_historical_fcff(ticker: str, year_from: int, year_to: int):
     '''
       Returns a dictionary of year->"fcff value" for the supplied ticker and
@@ -237,6 +584,7 @@ def get_historical_fcff(ticker: str, year_from: int, year_to: int):
     )
 
 
+@timing.timed()
 def get_historical_income_stmt(ticker: str, year_from: int,
                                year_to: int, tag_filter_list: list):
     """
@@ -259,6 +607,7 @@ def get_historical_income_stmt(ticker: str, year_from: int,
         ticker.upper(), 'income_statement', year_from, year_to, tag_filter_list)
 
 
+@timing.timed()
 def get_historical_balance_sheet(ticker: str, year_from: int,
                                  year_to: int, tag_filter_list: list):
     """
@@ -280,6 +629,7 @@ def get_historical_balance_sheet(ticker: str, year_from: int,
         ticker.upper(), 'balance_sheet_statement', year_from, year_to, tag_filter_list)
 
 
+@timing.timed()
 def get_historical_cashflow_stmt(ticker: str, year_from: int,
                                  year_to: int, tag_filter_list: list):
     """
@@ -305,10 +655,29 @@ def get_historical_cashflow_stmt(ticker: str, year_from: int,
 # Private Helper methods
 #
 
-def _transform_financial_stmt(std_financials_list: list, tag_filter_list: list):
+def _compact_financial_stmt(std_financials_list: list):
+    """
+      Helper function that converts a financial statement in the raw
+      Intrinio format into the compact representation stored in the cache,
+      which is a tuple of (tag, value) pairs.
+
+      Returns
+      -------
+      A tuple like this:
+
+      (
+        ('netcashfromcontinuingoperatingactivities', 77434000000.0),
+        ('purchaseofplantpropertyandequipment', -13313000000)
+      )
+    """
+    return tuple((financial.data_tag.tag, financial.value) for financial in std_financials_list)
+
+
+def _transform_financial_stmt(compact_financials: tuple, tag_filter_list: list):
     """
       Helper function that transforms a financial statement stored in
-      the raw Intrinio format into a more user friendly one.
+      the compact format (see _compact_financial_stmt) into a more user
+      friendly one.
 
       Returns
       -------
@@ -323,11 +692,11 @@ def _transform_financial_stmt(std_financials_list: list, tag_filter_list: list):
     """
     results = {}
 
-    for financial in std_financials_list:
+    for (tag, value) in compact_financials:
 
         if (tag_filter_list is None or
-                financial.data_tag.tag in tag_filter_list):
-            results[financial.data_tag.tag] = financial.value
+                tag in tag_filter_list):
+            results[tag] = value
 
     return results
 
@@ -386,18 +755,21 @@ def _read_historical_financial_statement(ticker: str, statement_name: str, year_
 
             cache_key = "%s-%s-%s-%s-%s-%d" % (
                 INTRINIO_CACHE_PREFIX, "statement", ticker, statement_name, statement_type, i)
-            statement = cache.read(cache_key)
+            compact_financials = cache.read(cache_key)
 
-            if statement is None:
-                statement = FUNDAMENTALS_API.get_fundamental_standardized_financials(
+            if compact_financials is None:
+                statement = _api_client('FUNDAMENTALS_API').get_fundamental_standardized_financials(
                     satement_name)
+                compact_financials = _compact_financial_stmt(
+                    statement.standardized_financials)
 
-                cache.write(cache_key, statement)
+                cache.write(cache_key, compact_financials,
+                            _cache_expiration("%d-12-31" % i))
 
             hist_statements[i] = _transform_financial_stmt(
-                statement.standardized_financials, tag_filter_list)
+                compact_financials, tag_filter_list)
 
-    except ApiException as ae:
+    except _api_exception() as ae:
         raise DataError(
             "Error retrieving ('%s', %d - %d) -> '%s' from Intrinio Fundamentals API" % (ticker, year_from, year_to, statement_name), ae)
 
@@ -423,11 +795,13 @@ def _read_company_data_point(ticker: str, tag: str):
     if api_response is None:
         # else call the API directly
         try:
-            api_response = COMPANY_API.get_company_data_point_number(
+            api_response = _api_client('COMPANY_API').get_company_data_point_number(
                 ticker, tag)
 
-            cache.write(cache_key, api_response)
-        except ApiException as ae:
+            # data points always represent the latest value
+            cache.write(cache_key, api_response,
+                        INTRINIO_CACHE_RECENT_TTL_SECONDS)
+        except _api_exception() as ae:
             raise DataError(
                 "Error retrieving ('%s') -> '%s' from Intrinio Company API" % (ticker, tag), ae)
         except Exception as e:
@@ -437,6 +811,39 @@ def _read_company_data_point(ticker: str, tag: str):
     return api_response
 
 
+def _read_company_historical_data(ticker: str, start_date: str, end_date: str, frequency: str, tag: str):
+    """
+      Helper function that calls the Intrinio company API directly (bypassing
+      the cache) for the supplied date range and tag
+
+      Raises
+      -------
+      DataError in case of any error calling the intrio API, or if no data
+        was returned
+      ValidationError in case of an unknown exception
+
+      Returns
+      -------
+      The 'historical_data_dict' portion of the 'get_company_historical_data'
+      API response, converted to the compact format. See _encode_historical_data()
+    """
+    try:
+        api_response = _api_client('COMPANY_API').get_company_historical_data(
+            ticker, tag, frequency=frequency, start_date=start_date, end_date=end_date)
+    except _api_exception() as ae:
+        raise DataError(
+            "Error retrieving ('%s', %s - %s) -> '%s' from Intrinio Company API" % (ticker, start_date, end_date, tag), ae)
+    except Exception as e:
+        raise ValidationError(
+            "Error parsing ('%s', %s - %s) -> '%s' from Intrinio Company API" % (ticker, start_date, end_date, tag), e)
+
+    if len(api_response.historical_data) == 0:
+        raise DataError("No Data returned for ('%s', %s - %s) -> '%s' from Intrinio Company API" %
+                        (ticker, start_date, end_date, tag), None)
+
+    return _encode_historical_data(api_response.historical_data_dict)
+
+
 def _get_company_historical_data(ticker: str, start_date: str, end_date: str, tag: str):
     """
       Helper function that will read the Intrinio company API for the supplied date range
@@ -471,28 +878,247 @@ def _get_company_historical_data(ticker: str, start_date: str, end_date: str, ta
     # check the cache first
     cache_key = "%s-%s-%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
                                           "company_historical_data", ticker, start_date, end_date, frequency, tag)
-    api_response = cache.read(cache_key)
+    historical_data = cache.read(cache_key)
 
-    if api_response is None:
+    if historical_data is None:
         # else call the API directly
-        try:
-            api_response = COMPANY_API.get_company_historical_data(
-                ticker, tag, frequency=frequency, start_date=start_date, end_date=end_date)
-        except ApiException as ae:
-            raise DataError(
-                "Error retrieving ('%s', %s - %s) -> '%s' from Intrinio Company API" % (ticker, start_date, end_date, tag), ae)
-        except Exception as e:
-            raise ValidationError(
-                "Error parsing ('%s', %s - %s) -> '%s' from Intrinio Company API" % (ticker, start_date, end_date, tag), e)
+        historical_data = _read_company_historical_data(
+            ticker, start_date, end_date, frequency, tag)
 
-    if len(api_response.historical_data) == 0:
-        raise DataError("No Data returned for ('%s', %s - %s) -> '%s' from Intrinio Company API" %
-                        (ticker, start_date, end_date, tag), None)
-    else:
         # only write to cache if response has some valid data
-        cache.write(cache_key, api_response)
+        cache.write(cache_key, historical_data,
+                    _cache_expiration(end_date))
+
+    return _decode_historical_data(historical_data)
+
+
+def _get_company_historical_data_multi(ticker: str, start_date: str, end_date: str, tags: list):
+    """
+      Helper function that will read multiple tags from the Intrinio company API
+      for the supplied date range, and cache them as a single unit.
+
+      The Intrinio historical data endpoint only accepts one tag per call,
+      so on a cache miss each tag is requested in turn, but the results are
+      only cached (and returned) if all of them contain valid data.
+
+      Parameters
+      ----------
+      ticker : str
+        Ticker symbol. E.g. 'AAPL'
+      start_date : str
+        Start date of the metric formatted as YYYY-MM-DD
+      end_date : str
+        End date of the metric formatted as YYYY-MM-DD
+      tags : list
+        the list of metric names to retrieve
+
+      Raises
+      -------
+      DataError in case of any error calling the intrio API
+      ValidationError in case of an unknown exception or an empty tag list
+
+      Returns
+      -------
+      A dictionary of tag=>'historical_data_dict'. For example:
+
+      {
+        'zacks_target_price_mean': [
+          {'date': datetime.date(2018, 9, 29), 'value': 265595000000.0},
+          {'date': datetime.date(2017, 9, 30), 'value': 229234000000.0}
+        ]
+      }
+    """
+
+    if tags is None or len(tags) == 0:
+        raise ValidationError("No tags were supplied", None)
+
+    # check the cache first
+    cache_key = _company_historical_data_multi_cache_key(
+        ticker, start_date, end_date, tags)
+    historical_data = cache.read(cache_key)
+
+    if historical_data is None:
+        # else call the API directly
+        historical_data = {}
+        for tag in tags:
+            historical_data[tag] = _read_company_historical_data(
+                ticker, start_date, end_date, 'yearly', tag)
+
+        cache.write(cache_key, historical_data, _cache_expiration(end_date))
+
+    return {tag: _decode_historical_data(historical_data[tag]) for tag in tags}
+
+
+def _read_daily_stock_close_prices(ticker: str, start_date: str, end_date: str):
+    """
+      Helper function that reads all pages of daily stock prices from the
+      Intrinio security API (bypassing the cache) for the supplied date range
+
+      Raises
+      -------
+      DataError in case of any error calling the intrio API
+      ValidationError in case of an unknown exception
+
+      Returns
+      -------
+      a dictionary of date->price like this
+      {
+        '2019-10-01': 100,
+        '2019-10-02': 101
+      }
+    """
+    price_dict = {}
+    next_page = None
+
+    try:
+        while True:
+            api_response = _api_client('SECURITY_API').get_security_stock_prices(
+                ticker, start_date=start_date, end_date=end_date, frequency='daily',
+                page_size=INTRINIO_PRICE_PAGE_SIZE, next_page=next_page)
+
+            for price in api_response.stock_prices:
+                price_dict[intrinio_util.date_to_string(
+                    price.date)] = price.close
+
+            next_page = api_response.next_page
+            if next_page is None or next_page == "":
+                break
+    except _api_exception() as ae:
+        raise DataError("API Error while reading price data from Intrinio Security API: ('%s', %s - %s)" %
+                        (ticker, start_date, end_date), ae)
+    except Exception as e:
+        raise ValidationError("Unknown Error while reading price data from Intrinio Security API: ('%s', %s - %s)" %
+                              (ticker, start_date, end_date), e)
+
+    return price_dict
+
+
+def _get_daily_stock_close_price_history(ticker: str, start_date: str, end_date: str):
+    """
+      Helper function that returns the closing prices of a ticker from the
+      local price store, making sure that it covers the supplied date range.
+
+      The price store keeps track of the date ranges that were already read
+      from Intrinio. Any portion of the supplied range that is not covered is
+      read from the API and merged into the store.
+
+      Because the closing price of the current date may not be available yet,
+      ranges are only permanently recorded as covered up to the previous day.
+      The remainder is covered for INTRINIO_CACHE_RECENT_TTL_SECONDS.
+
+      Parameters
+      ----------
+      ticker : str
+        Ticker symbol. E.g. 'AAPL'
+      start_date : str
+        Start date formatted as YYYY-MM-DD
+      end_date : str
+        End date formatted as YYYY-MM-DD
+
+      Returns
+      -------
+      A tuple of NumPy arrays (dates, closes) sorted by date.
+    """
+    missing_date_ranges = price_store.missing_date_ranges(
+        ticker, start_date, end_date)
+
+    if len(missing_date_ranges) > 0:
+        last_closed_date = intrinio_util.date_to_string(
+            datetime.datetime.now() - timedelta(days=1))
+        current_date = intrinio_util.date_to_string(datetime.datetime.now())
+
+        price_dict = {}
+        covered_date_ranges = []
+        recent_date_ranges = []
+        for (missing_start, missing_end) in missing_date_ranges:
+            price_dict.update(_read_daily_stock_close_prices(
+                ticker, missing_start, missing_end))
+
+            if missing_start <= last_closed_date:
+                covered_date_ranges.append(
+                    (missing_start, min(missing_end, last_closed_date)))
+            if missing_end >= current_date:
+                recent_date_ranges.append(
+                    (max(missing_start, current_date), missing_end))
+
+        price_store.write(ticker, price_dict, covered_date_ranges,
+                          recent_date_ranges, INTRINIO_CACHE_RECENT_TTL_SECONDS)
+
+    return price_store.read(ticker, start_date, end_date)
 
-    return api_response.historical_data_dict
+
+def _encode_historical_data(historical_data_dict: list):
+    """
+      Converts the 'historical_data_dict' portion of the 'get_company_historical_data'
+      API response into the compact format stored in the cache, which is
+      a tuple of two packed arrays: the dates (as ordinals) and the values.
+      Missing values are stored as NaN. Dates and values are stored as 8 byte,
+      little endian numbers, so that the format does not depend on the platform.
+
+      Input
+
+      [
+        {'date': datetime.date(2018, 9, 29), 'value': 123.0},
+        {'date': datetime.date(2017, 9, 30), 'value': 234.0}
+      ]
+
+      Output
+
+      (b'...', b'...')
+    """
+    dates = array('q', [datapoint['date'].toordinal()
+                        for datapoint in historical_data_dict])
+    values = array('d', [math.nan if datapoint['value'] is None else datapoint['value']
+                         for datapoint in historical_data_dict])
+
+    if sys.byteorder == 'big':
+        dates.byteswap()
+        values.byteswap()
+
+    return (dates.tobytes(), values.tobytes())
+
+
+def _decode_historical_data(historical_data: tuple):
+    """
+      Converts historical data stored in the compact format back into
+      the 'historical_data_dict' format. See _encode_historical_data()
+    """
+    dates = array('q')
+    dates.frombytes(historical_data[0])
+    values = array('d')
+    values.frombytes(historical_data[1])
+
+    if sys.byteorder == 'big':
+        dates.byteswap()
+        values.byteswap()
+
+    return [{'date': datetime.date.fromordinal(date), 'value': None if math.isnan(value) else value}
+            for (date, value) in zip(dates, values)]
+
+
+def _cache_expiration(end_date: str):
+    """
+      Returns the cache expiration (in seconds) of data ending on the supplied
+      date (YYYY-MM-DD). Data for closed periods, meaning that end before the
+      current date, never expires.
+
+      Returns
+      -------
+      None if the data never expires, otherwise INTRINIO_CACHE_RECENT_TTL_SECONDS
+    """
+    if end_date < intrinio_util.date_to_string(datetime.datetime.now()):
+        return None
+
+    return INTRINIO_CACHE_RECENT_TTL_SECONDS
+
+
+def _company_historical_data_multi_cache_key(ticker: str, start_date: str, end_date: str, tags: list):
+    """
+      Returns the cache key used to store the results of
+      '_get_company_historical_data_multi()'
+    """
+    return "%s-%s-%s-%s-%s-%s-%s" % (INTRINIO_CACHE_PREFIX,
+                                     "company_historical_data_multi", ticker, start_date, end_date, 'yearly', ",".join(sorted(tags)))
 
 
 def _aggregate_by_year(historical_data_dict: dict):
@@ -568,8 +1194,11 @@ def _aggregate_by_year_month(historical_data: dict):
 
     converted_response = {}
 
-    # first pass assemble the basic return value
+    # first pass assemble the basic return value. Missing values are skipped
     for datapoint in historical_data:
+        if datapoint['value'] is None:
+            continue
+
         year = datapoint['date'].year
         month = datapoint['date'].month
 
@@ -599,11 +1228,11 @@ def shutdown():
       This is a workaround until a proper fix is released.
 
       This code exists in the API source, but it's not invoked reliably, so we force
-      its invocation
-    """
-    FUNDAMENTALS_API.api_client.pool.close()
-    FUNDAMENTALS_API.api_client.pool.join()
-    COMPANY_API.api_client.pool.close()
-    COMPANY_API.api_client.pool.join()
-    SECURITY_API.api_client.pool.close()
-    SECURITY_API.api_client.pool.join()
+      its invocation. Only the clients that were created, and whose thread pool
+      was started, are shut down.
+    """
+    for api in api_clients.values():
+        pool = api.api_client.pool
+        if pool is not None:
+            pool.close()
+            pool.join()
@@ -0,0 +1,267 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module defines the source of the market data (analyst target prices
+and daily closing prices) consumed by the strategies, the calculator
+and the portfolio.
+
+Two implementations are provided:
+
+1) IntrinioDataSource: reads data from the Intrinio APIs, through the
+   intrinio_data connector and its cache.
+2) LocalFileDataSource: reads data from a prebuilt dataset stored on the
+   local filesystem, without any network access. The dataset is a directory
+   containing one {TICKER}.json file per ticker, like this:
+
+    {
+        "historical_data": {
+            "zacks_target_price_mean": [{"date": "2019-10-01", "value": 120.5}]
+        },
+        "prices": [{"date": "2019-10-01", "close": 100.0}]
+    }
+
+   which is the format produced by record_intrinio_fixtures.py
+
+Components use the 'data_source' singleton unless a source is supplied
+explicitly. It may be replaced to run the whole application from a
+different source.
+"""
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+import numpy as np
+from connectors import intrinio_data, intrinio_util
+from exception.exceptions import ValidationError, DataError, FileSystemError
+
+log = logging.getLogger()
+
+
+class MarketDataSource(ABC):
+    """
+        Base class of all market data sources
+    """
+
+    @abstractmethod
+    def get_company_historical_data_multi(self, ticker: str, start_date: datetime, end_date: datetime, tags: list):
+        """
+          Retrieves multiple company historical data points (e.g. 'zacks_target_price_mean')
+          for the supplied date range, and aggregates each one by year and month.
+
+          Returns
+          -------
+          A dictionary of tag=>year=>month=>value. For example:
+
+          {
+            'zacks_target_price_mean': {
+              2019: {
+                9 : 15
+              }
+            }
+          }
+        """
+        pass
+
+    @abstractmethod
+    def get_latest_close_price(self, ticker: str, price_date: datetime, max_looback: int):
+        """
+          Retrieves the most recent close price given a price_date and a lookback window
+
+          Returns
+          -----------
+          a tuple of date, float with the latest price date and price value
+        """
+        pass
+
+    @abstractmethod
+    def get_latest_close_prices(self, ticker_list: list, price_date_list: list, max_looback: int):
+        """
+          Retrieves the most recent close prices for a list of tickers and a list of
+          price dates using a lookback window.
+
+          Returns
+          -----------
+          a NumPy array of close prices shaped (len(ticker_list), len(price_date_list))
+        """
+        pass
+
+
+class IntrinioDataSource(MarketDataSource):
+    """
+        Market data read from Intrinio. See the intrinio_data module
+    """
+
+    def get_company_historical_data_multi(self, ticker: str, start_date: datetime, end_date: datetime, tags: list):
+        return intrinio_data.get_company_historical_data_multi(ticker, start_date, end_date, tags)
+
+    def get_latest_close_price(self, ticker: str, price_date: datetime, max_looback: int):
+        return intrinio_data.get_latest_close_price(ticker, price_date, max_looback)
+
+    def get_latest_close_prices(self, ticker_list: list, price_date_list: list, max_looback: int):
+        return intrinio_data.get_latest_close_prices(ticker_list, price_date_list, max_looback)
+
+
+class LocalFileDataSource(MarketDataSource):
+    """
+        Market data read from a prebuilt dataset on the local filesystem.
+        Tickers are loaded the first time they are accessed, and then kept
+        in memory as NumPy arrays sorted by date.
+    """
+
+    def __init__(self, path: str):
+        '''
+            Initializes the data source
+
+            Parameters
+            ----------
+            path : str
+                the directory containing the dataset
+        '''
+        if not os.path.isdir(path):
+            raise FileSystemError(
+                "Dataset directory %s was not found" % path, None)
+
+        self.path = path
+        self.lock = threading.Lock()
+
+        # ticker => (historical_data, price_dates, closes)
+        self.loaded_tickers = {}
+
+    def __getstate__(self):
+        # loaded data and locks are not shared with worker processes
+        return {'path': self.path}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['path'])
+
+    def get_company_historical_data_multi(self, ticker: str, start_date: datetime, end_date: datetime, tags: list):
+        if tags is None or len(tags) == 0:
+            raise ValidationError("No tags were supplied", None)
+
+        (historical_data, _, _) = self._load(ticker)
+
+        start = np.datetime64(intrinio_util.date_to_string(start_date))
+        end = np.datetime64(intrinio_util.date_to_string(end_date))
+
+        tag_data = {}
+        for tag in tags:
+            try:
+                (dates, values) = historical_data[tag]
+            except KeyError:
+                raise DataError("No local data for ('%s') -> '%s'" %
+                                (ticker, tag), None)
+
+            # missing values are skipped
+            in_range = (dates >= start) & (dates <= end) & ~np.isnan(values)
+            if not in_range.any():
+                raise DataError("No local data for ('%s', %s - %s) -> '%s'" %
+                                (ticker, str(start), str(end), tag), None)
+
+            tag_data[tag] = intrinio_data._aggregate_by_year_month([{
+                'date': date,
+                'value': value
+            } for (date, value) in zip(dates[in_range].tolist(), values[in_range].tolist())])
+
+        return tag_data
+
+    def get_latest_close_price(self, ticker: str, price_date: datetime, max_looback: int):
+        _validate_looback(max_looback)
+
+        (_, dates, closes) = self._load(ticker)
+
+        end = np.datetime64(intrinio_util.date_to_string(price_date))
+        start = end - np.timedelta64(max_looback, 'D')
+
+        latest = np.searchsorted(dates, end, 'right') - 1
+        if latest < 0 or dates[latest] < start:
+            raise DataError("No local prices for ('%s', %s - %s)" %
+                            (ticker, str(start), str(end)), None)
+
+        return (str(dates[latest]), float(closes[latest]))
+
+    def get_latest_close_prices(self, ticker_list: list, price_date_list: list, max_looback: int):
+        _validate_looback(max_looback)
+
+        if ticker_list is None or price_date_list is None or len(price_date_list) == 0:
+            raise ValidationError(
+                "Invalid ticker or price date list", None)
+
+        price_dates = np.array([intrinio_util.date_to_string(d)
+                                for d in price_date_list], dtype='datetime64[D]')
+        lookback_dates = price_dates - np.timedelta64(max_looback, 'D')
+
+        prices = np.empty((len(ticker_list), len(price_dates)))
+
+        for (i, ticker) in enumerate(ticker_list):
+            (_, dates, closes) = self._load(ticker)
+
+            latest = np.searchsorted(dates, price_dates, 'right') - 1
+            found = latest >= 0
+            found[found] = dates[latest[found]] >= lookback_dates[found]
+
+            if not found.all():
+                raise DataError("No local prices for ('%s', %s)" %
+                                (ticker, str(price_dates[~found][0])), None)
+
+            prices[i] = closes[latest]
+
+        return prices
+
+    def _load(self, ticker: str):
+        '''
+            Returns the (historical_data, price_dates, closes) of a ticker,
+            where historical_data is a dictionary of tag => (dates, values)
+        '''
+        with self.lock:
+            try:
+                return self.loaded_tickers[ticker]
+            except KeyError:
+                pass
+
+        file_name = os.path.join(self.path, "%s.json" % ticker)
+
+        try:
+            with open(file_name) as file:
+                ticker_data = json.load(file)
+        except FileNotFoundError:
+            raise DataError("No local data for %s" % ticker, None)
+        except Exception as e:
+            raise DataError("Could not read %s" % file_name, e)
+
+        historical_data = {}
+        for (tag, data_points) in ticker_data.get('historical_data', {}).items():
+            historical_data[tag] = _to_arrays(data_points, 'value')
+
+        (price_dates, closes) = _to_arrays(
+            ticker_data.get('prices', []), 'close')
+
+        with self.lock:
+            self.loaded_tickers[ticker] = (historical_data, price_dates, closes)
+
+        return (historical_data, price_dates, closes)
+
+
+def _to_arrays(data_points: list, value_name: str):
+    '''
+        Converts a list of dated values, e.g. [{"date": "2019-10-01", "close": 100.0}],
+        into a tuple of NumPy arrays (dates, values) sorted by date.
+        Missing values are stored as NaN
+    '''
+    data_points = sorted(data_points, key=lambda p: p['date'])
+
+    dates = np.array([p['date'] for p in data_points], dtype='datetime64[D]')
+    values = np.array([np.nan if p[value_name] is None else p[value_name]
+                       for p in data_points], dtype='float64')
+
+    return (dates, values)
+
+
+def _validate_looback(max_looback: int):
+    if max_looback not in range(1, 10):
+        raise ValidationError(
+            "Invalid 'max_looback'. Allowed values are [1..10]", None)
+
+
+# pylint: disable=invalid-name
+data_source = IntrinioDataSource()
@@ -1,13 +1,20 @@
 """Author: Mark Hanegraaff -- 2020
 
     This module wraps the TDAmeritrade APIs into a simple SDK.
-    APIs are called using the "requests" package, and all Exceptions
-    and re-raised as TradeErrors
+    APIs are called using a shared "requests" session, which keeps
+    connections alive and pools them across calls, and all Exceptions
+    and re-raised as TradeErrors. The duration of every API call is
+    recorded using the timing module.
 """
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import json
 import logging
+import threading
+import time
 from datetime import datetime
 import random
 import string
@@ -15,7 +22,7 @@ import string
 import dateutil.parser as parser
 from datetime import timedelta
 from exception.exceptions import ValidationError, TradeError
-from support import util
+from support import util, startup_profiler, timing
 
 log = logging.getLogger()
 
@@ -24,9 +31,107 @@ missing_variables = []
 
 TD_ACCESS_TOKEN = ""
 
+# time (seconds since the epoch) after which the access token is no longer valid
+TD_ACCESS_TOKEN_EXPIRATION = 0
+
+# access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 60
+
+# lifetime of access tokens whose login response does not include one
+DEFAULT_TOKEN_LIFETIME = 1800
+
+token_lock = threading.Lock()
+
 # 5 second timeout for each request
 REQUEST_TIMEOUT = 8
 
+# base URL of all APIs. It may be overridden to point to a simulator
+TD_API_URL = os.environ.get(
+    'TDAMERITRADE_API_URL', 'https://api.tdameritrade.com/v1')
+
+# default number of pooled connections, and number of times idempotent
+# requests are retried after connection errors or 5xx responses
+REQUEST_POOL_SIZE = 10
+REQUEST_MAX_RETRIES = 3
+
+session = None
+session_lock = threading.Lock()
+
+# length of the random tag added to every order. See generate_tag()
+ORDER_TAG_LENGTH = 2
+
+
+def _new_session(pool_size: int, max_retries: int):
+    '''
+        Returns a new requests.Session object. See create_session()
+    '''
+    if not isinstance(pool_size, int) or pool_size <= 0:
+        raise ValidationError(
+            "Invalid pool size: %s. Must be at least 1" % str(pool_size), None)
+
+    if not isinstance(max_retries, int) or max_retries < 0:
+        raise ValidationError(
+            "Invalid max retries: %s. Cannot be negative" % str(max_retries), None)
+
+    retry = Retry(total=max_retries, backoff_factor=0.5,
+                  status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size, max_retries=retry)
+
+    new_session = requests.Session()
+    new_session.mount('https://', adapter)
+    new_session.mount('http://', adapter)
+
+    return new_session
+
+
+def create_session(pool_size: int = REQUEST_POOL_SIZE, max_retries: int = REQUEST_MAX_RETRIES):
+    '''
+        Creates the HTTP session shared by all API calls, replacing
+        (and closing) the current one if it exists.
+
+        Parameters
+        ----------
+        pool_size : int
+            maximum number of connections kept alive by the session
+        max_retries : int
+            number of times idempotent requests (e.g. GET, DELETE) are retried.
+            Orders (POST) are never retried.
+
+        Returns
+        -------
+        The new requests.Session object
+    '''
+    global session
+
+    new_session = _new_session(pool_size, max_retries)
+
+    with session_lock:
+        if session is not None:
+            session.close()
+        session = new_session
+
+    return new_session
+
+
+def get_session():
+    '''
+        Returns the shared HTTP session, creating it on first use.
+        The session is created while holding the lock, so that all
+        threads use the same one.
+    '''
+    global session
+
+    startup_profiler.record_api_call('tdameritrade')
+
+    if session is None:
+        with session_lock:
+            if session is None:
+                session = _new_session(
+                    REQUEST_POOL_SIZE, REQUEST_MAX_RETRIES)
+
+    return session
+
 
 def auth_header():
     '''
@@ -46,21 +151,124 @@ def generate_tag():
     chars += list(string.ascii_uppercase)
     chars += ["%d" % i for i in range(0, 9)]
 
-    return "%s%s" % (random.choice(chars), random.choice(chars))
+    return "".join(random.choice(chars) for i in range(0, ORDER_TAG_LENGTH))
+
+
+def is_order_id(order_id: str):
+    '''
+        Returns true if the supplied value is an order id assigned by TDAmeritrade,
+        rather than the tag returned by place_order() when the order id could
+        not be found. Orders can only be read (see get_order()) using their id,
+        which is always longer than a tag.
+    '''
+    return order_id is not None and len(order_id) > ORDER_TAG_LENGTH
 
 
 def td_authenticate(func):
     """
-        A Decorator that fetches an access token if one does not exist.
+        A Decorator that fetches an access token if one does not exist
+        or if it is about to expire. Calls rejected with a 401 (Unauthorized)
+        are retried once with a new token.
         Used to simplify other methods that interact with the TD Apis
     """
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        if TD_ACCESS_TOKEN == "":
-            login()
+        with token_lock:
+            if not access_token_valid() and not load_access_token():
+                login()
+            access_token = TD_ACCESS_TOKEN
+
+        try:
+            return func(*args, **kwargs)
+        except TradeError as te:
+            if not is_unauthorized(te):
+                raise te
+
+        log.info("TDAmeritrade access token was rejected. Logging in again")
+        with token_lock:
+            # another thread may have already refreshed it
+            if TD_ACCESS_TOKEN == access_token:
+                login()
+
         return func(*args, **kwargs)
     return wrapper
 
 
+def is_unauthorized(error: TradeError):
+    '''
+        Returns true if the error was caused by a 401 (Unauthorized) response
+    '''
+    return getattr(error.api_response, 'status_code', None) == 401
+
+
+def access_token_valid():
+    '''
+        Returns true if there is an access token, and it will not expire
+        within the next TOKEN_REFRESH_MARGIN seconds
+    '''
+    return TD_ACCESS_TOKEN != "" and \
+        time.time() < TD_ACCESS_TOKEN_EXPIRATION - TOKEN_REFRESH_MARGIN
+
+
+def set_access_token(access_token: str, expiration: float):
+    '''
+        Sets the access token used by all API calls, and its expiration
+        time expressed in seconds since the epoch
+    '''
+    global TD_ACCESS_TOKEN, TD_ACCESS_TOKEN_EXPIRATION
+
+    TD_ACCESS_TOKEN = access_token
+    TD_ACCESS_TOKEN_EXPIRATION = expiration
+
+
+def load_access_token():
+    '''
+        Loads the access token from the file referenced by the
+        TDAMERITRADE_TOKEN_FILE environment variable, which is optional.
+
+        Returns
+        -------
+        True if a valid token was loaded, False otherwise
+    '''
+    token_file = os.environ.get('TDAMERITRADE_TOKEN_FILE')
+    if token_file is None:
+        return False
+
+    try:
+        with open(token_file) as file:
+            token = json.load(file)
+        set_access_token(token['access_token'], token['expiration'])
+    except Exception as e:
+        log.debug("Could not load TDAmeritrade access token from %s, because: %s" %
+                  (token_file, str(e)))
+        return False
+
+    return access_token_valid()
+
+
+def save_access_token():
+    '''
+        Saves the current access token to the file referenced by the
+        TDAMERITRADE_TOKEN_FILE environment variable, if one is set.
+        The file is only readable by the current user.
+    '''
+    token_file = os.environ.get('TDAMERITRADE_TOKEN_FILE')
+    if token_file is None:
+        return
+
+    temp_file_name = "%s.%d.tmp" % (token_file, os.getpid())
+    try:
+        with os.fdopen(os.open(temp_file_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+            json.dump({
+                'access_token': TD_ACCESS_TOKEN,
+                'expiration': TD_ACCESS_TOKEN_EXPIRATION
+            }, file)
+        os.replace(temp_file_name, token_file)
+    except Exception as e:
+        log.warning("Could not save TDAmeritrade access token to %s, because: %s" %
+                    (token_file, str(e)))
+
+
 def __validate_response(url: str, response: object):
     '''
         validates a request's status code and throws a TradeError
@@ -88,8 +296,8 @@ def request(method: str, url: str, params: dict, payload: dict):
             request payload (data)
     '''
     try:
-        api_response = requests.request(method, url, params=params, json=payload,
-                                        headers=auth_header(), timeout=REQUEST_TIMEOUT)
+        api_response = get_session().request(method, url, params=params, json=payload,
+                                             headers=auth_header(), timeout=REQUEST_TIMEOUT)
     except Exception as e:
         raise TradeError("Could not execute %s to %s" % (method, url), e, None)
 
@@ -132,18 +340,20 @@ def get_credentials():
     return (td_account_id, td_client_id, td_refresh_token)
 
 
+@timing.timed()
 def login():
     '''
         Calls the https://api.tdameritrade.com/v1/oauth2/token Api and
-        requests a temporary access token, effectively logging into TDAmeritrade
+        requests a temporary access token, effectively logging into TDAmeritrade.
+        The token is saved to the token file, if one is configured.
     '''
     (td_account_id, td_client_id, td_refresh_token) = get_credentials()
 
-    auth_url = 'https://api.tdameritrade.com/v1/oauth2/token'
+    auth_url = '%s/oauth2/token' % TD_API_URL
 
     log.info("Generating TDAmeritrade refresh token")
     try:
-        creds_response = requests.post(auth_url, data={
+        creds_response = get_session().post(auth_url, data={
             'grant_type': 'refresh_token',
             'refresh_token': td_refresh_token,
             'client_id': '%s@AMER.OAUTHAP' % td_client_id
@@ -154,8 +364,14 @@ def login():
 
     __validate_response(auth_url, creds_response)
 
-    global TD_ACCESS_TOKEN
-    TD_ACCESS_TOKEN = creds_response.json()['access_token']
+    creds = creds_response.json()
+    try:
+        lifetime = creds['expires_in']
+    except KeyError:
+        lifetime = DEFAULT_TOKEN_LIFETIME
+
+    set_access_token(creds['access_token'], time.time() + lifetime)
+    save_access_token()
 
 '''
     TD Ameritrade APIs
@@ -163,6 +379,7 @@ def login():
 '''
 
 
+@timing.timed()
 @td_authenticate
 def equity_market_open(current_time: datetime):
     '''
@@ -176,7 +393,7 @@ def equity_market_open(current_time: datetime):
     #current_time = pytz.utc.localize(current_time)
 
     market_hours = request(
-        'GET', 'https://api.tdameritrade.com/v1/marketdata/equity/hours', params=params, payload=None)[1]
+        'GET', '%s/marketdata/equity/hours' % TD_API_URL, params=params, payload=None)[1]
 
     try:
         open_time = parser.parse(market_hours['equity']['EQ'][
@@ -189,6 +406,7 @@ def equity_market_open(current_time: datetime):
     return open_time.timestamp() <= current_time.timestamp() <= close_time.timestamp()
 
 
+@timing.timed()
 @td_authenticate
 def positions_summary():
     '''
@@ -245,8 +463,8 @@ def positions_summary():
 
     td_account_id = get_credentials()[0]
 
-    acct_response = request('GET', 'https://api.tdameritrade.com/v1/accounts/%s' %
-                            td_account_id, params={'fields': ['positions']}, payload=None)[1]
+    acct_response = request('GET', '%s/accounts/%s' % (TD_API_URL,
+                            td_account_id), params={'fields': ['positions']}, payload=None)[1]
 
     if acct_response['securitiesAccount']['type'] != 'CASH':
         raise ValidationError(
@@ -260,6 +478,7 @@ def positions_summary():
     return position_summary
 
 
+@timing.timed()
 @td_authenticate
 def place_order(action: str, symbol: str, quantity: float, quantity_type: str):
     '''
@@ -269,7 +488,8 @@ def place_order(action: str, symbol: str, quantity: float, quantity_type: str):
 
         Returns the order id as extracted from the location header. If the order ID
         cannot be found, it will return a the two character tag which was randomly
-        generated during this call
+        generated during this call. The tag cannot be used to read the order,
+        see is_order_id()
 
     '''
 
@@ -304,8 +524,8 @@ def place_order(action: str, symbol: str, quantity: float, quantity_type: str):
         "tag": tag
     }
 
-    headers = request('POST', 'https://api.tdameritrade.com/v1/accounts/%s/orders' %
-                      td_account_id, None, order)[0]
+    headers = request('POST', '%s/accounts/%s/orders' % (TD_API_URL,
+                      td_account_id), None, order)[0]
 
     # fetch the order id from the headers, This is where it's stored
     # https://api.tdameritrade.com/v1/accounts/{ACCT_ID}/orders/{ORDER_ID}'
@@ -318,6 +538,7 @@ def place_order(action: str, symbol: str, quantity: float, quantity_type: str):
     return order_id
 
 
+@timing.timed()
 @td_authenticate
 def cancel_order(order_id: str):
     '''
@@ -326,10 +547,11 @@ def cancel_order(order_id: str):
     '''
 
     td_account_id = get_credentials()[0]
-    request('DELETE', 'https://api.tdameritrade.com/v1/accounts/%s/orders/%s' %
-            (td_account_id, order_id), None, None)
+    request('DELETE', '%s/accounts/%s/orders/%s' %
+            (TD_API_URL, td_account_id, order_id), None, None)
 
 
+@timing.timed()
 @td_authenticate
 def list_recent_orders():
     '''
@@ -372,29 +594,60 @@ def list_recent_orders():
         'toEnteredTime': (datetime.now().strftime("%Y-%m-%d")),
     }
 
-    order_list = request('GET', 'https://api.tdameritrade.com/v1/accounts/%s/orders' %
-                         td_account_id, params=params, payload=None)[1]
+    order_list = request('GET', '%s/accounts/%s/orders' % (TD_API_URL,
+                         td_account_id), params=params, payload=None)[1]
 
     for order in order_list:
-        order_id = str(order['orderId'])
-        recent_orders[order_id] = {}
-
-        recent_orders[order_id]['status'] = order['status']
-        recent_orders[order_id]['symbol'] = order[
-            'orderLegCollection'][0]['instrument']['symbol']
-        recent_orders[order_id]['quantity'] = order[
-            'orderLegCollection'][0]['quantity']
-        try:
-            close_time = order['closeTime']
-        except:
-            close_time = None
-        recent_orders[order_id]['closeTime'] = close_time
-        recent_orders[order_id]['tag'] = order['tag']
-        recent_orders[order_id]['cancelable'] = order['cancelable']
+        recent_orders[str(order['orderId'])] = summarize_order(order)
 
     return recent_orders
 
 
+@timing.timed()
+@td_authenticate
+def get_order(order_id: str):
+    '''
+        Calls the 'https://api.tdameritrade.com/v1/accounts/{ACCOUNT_ID}/orders/{ORDER_ID}' API
+        and returns the summary of a single order, like this:
+
+        {
+            "status": "FILLED",
+            "symbol": "SPY",
+            "quantity": 8.0,
+            "closeTime": "2020-05-04T03:21:04+0000",
+            "tag": "AA_myuser",
+            "cancelable": False
+        }
+    '''
+    td_account_id = get_credentials()[0]
+
+    order = request('GET', '%s/accounts/%s/orders/%s' %
+                    (TD_API_URL, td_account_id, order_id), params=None, payload=None)[1]
+
+    return summarize_order(order)
+
+
+def summarize_order(order: dict):
+    '''
+        Summarizes an order returned by the TDAmeritrade order APIs
+        into a dictionary. See get_order()
+    '''
+    try:
+        close_time = order['closeTime']
+    except:
+        close_time = None
+
+    return {
+        'status': order['status'],
+        'symbol': order['orderLegCollection'][0]['instrument']['symbol'],
+        'quantity': order['orderLegCollection'][0]['quantity'],
+        'closeTime': close_time,
+        'tag': order['tag'],
+        'cancelable': order['cancelable']
+    }
+
+
+@timing.timed()
 @td_authenticate
 def get_latest_equity_price(ticker: str):
     '''
@@ -402,7 +655,38 @@ def get_latest_equity_price(ticker: str):
         and cancels the order.
     '''
 
-    price_response = request('GET', 'https://api.tdameritrade.com/v1/marketdata/%s/quotes' %
-                             ticker, None, None)[1]
+    price_response = request('GET', '%s/marketdata/%s/quotes' % (TD_API_URL,
+                             ticker), None, None)[1]
 
     return price_response[ticker]['lastPrice']
+
+
+@timing.timed()
+@td_authenticate
+def get_latest_equity_prices(ticker_list: list):
+    '''
+        Calls the https://api.tdameritrade.com/v1/marketdata/quotes API
+        and returns the latest price of all the supplied tickers with a single
+        request, as a dictionary like this:
+
+        {
+            "AAPL": 318.89,
+            "MSFT": 184.91
+        }
+
+        Tickers that are not found by TDAmeritrade are not included in the response
+    '''
+    if ticker_list is None or len(ticker_list) == 0:
+        raise ValidationError("No ticker list was supplied", None)
+
+    price_response = request('GET', '%s/marketdata/quotes' % TD_API_URL,
+                             params={'symbol': ','.join(ticker_list)}, payload=None)[1]
+
+    latest_prices = {}
+    for ticker in ticker_list:
+        try:
+            latest_prices[ticker] = price_response[ticker]['lastPrice']
+        except KeyError:
+            log.warning("Could not find a quote for %s" % ticker)
+
+    return latest_prices
@@ -10,7 +10,7 @@ from exception.exceptions import ValidationError
 from model.base_model import BaseModel
 from support import constants, util
 import dateutil.parser as parser
-from connectors import intrinio_data
+from connectors import market_data_source
 
 log = logging.getLogger()
 
@@ -116,12 +116,16 @@ class Portfolio(BaseModel):
         except Exception:
             return True
 
-    def create_empty_portfolio(self, recommendation_set: object):
+    def create_empty_portfolio(self, recommendation_set: object, data_source: object = None):
         '''
             Creates a new and empty portfolio object based on a recommendation set.
-            Once created, the portfolio will be ready to trade
-
+            Once created, the portfolio will be ready to trade.
+            Prices are read from 'data_source', which defaults to
+            market_data_source.data_source
         '''
+        if data_source is None:
+            data_source = market_data_source.data_source
+
         securities = recommendation_set.to_dict()['securities_set']
         securities_list = []
 
@@ -129,7 +133,7 @@ class Portfolio(BaseModel):
             ticker = security['ticker_symbol']
             analysis_price = security['price']
 
-            (price_date_str, latest_price) = intrinio_data.get_latest_close_price(
+            (price_date_str, latest_price) = data_source.get_latest_close_price(
                 ticker, datetime.now(), 5)
             securities_list.append(
                 {
@@ -163,16 +167,20 @@ class Portfolio(BaseModel):
         log.info("Created empty portfolio using price date of: %s",
                  str(price_date))
 
-    def reprice(self, price_date: datetime):
+    def reprice(self, price_date: datetime, data_source: object = None):
         '''
             Reads the current prices, computes the latest returns
             and updates the portfolio object.
+            Prices are read from 'data_source', which defaults to
+            market_data_source.data_source
         '''
+        if data_source is None:
+            data_source = market_data_source.data_source
 
         # Update the current returns in the securities set
         for security in self.model['securities_set']:
             analysis_price = security['analysis_price']
-            (price_date_str, latest_price) = intrinio_data.get_latest_close_price(
+            (price_date_str, latest_price) = data_source.get_latest_close_price(
                 security['ticker_symbol'], price_date, 5)
             security['current_price'] = latest_price
 
@@ -180,7 +188,7 @@ class Portfolio(BaseModel):
         if not self.is_empty():
             for security in self.model['current_portfolio']['securities']:
                 purchase_price = security['purchase_price']
-                (price_date_str, latest_price) = intrinio_data.get_latest_close_price(
+                (price_date_str, latest_price) = data_source.get_latest_close_price(
                     security['ticker_symbol'], price_date, 5)
                 security['current_price'] = latest_price
 
@@ -5,18 +5,25 @@
     https://github.com/hanegraaff/stock-advisor-software
 """
 
+import sys
+from support import startup_profiler
+
+# started before any other import, so that imports are measured
+if startup_profiler.PROFILE_STARTUP_ARG in sys.argv:
+    startup_profiler.start()
+
 import argparse
 import logging
 import traceback
 from datetime import datetime
 from model.recommendation_set import SecurityRecommendationSet
 from support import constants, util, logging_definition
-from connectors import connector_test, td_ameritrade, aws_service_wrapper
+from connectors import connector_test, aws_service_wrapper
 from model.portfolio import Portfolio
 from exception.exceptions import AWSError
 from services import portfolio_mgr_svc
 from services.broker import Broker
-from support import util
+from support import util, timing
 
 log = logging.getLogger()
 
@@ -39,17 +46,28 @@ def parse_params():
         "-app_namespace", help="Application namespace used to identify AWS resources", type=str, required=True)
     parser.add_argument(
         "-portfolio_size", help="Number of securties that will be part of the portfolio", type=int, required=True)
+    parser.add_argument(
+        startup_profiler.PROFILE_STARTUP_ARG, help="Log the import times of all modules and the time of the first API calls at exit",
+        action="store_true")
+    parser.add_argument(
+        "-metrics_format", help="Format of the metrics (TDAmeritrade call and trading phase latencies) reported at exit",
+        choices=timing.REPORT_FORMATS, default=timing.REPORT_FORMAT_JSON)
+    parser.add_argument(
+        "-metrics_file", help="File the metrics are written to. If omitted they are logged",
+        type=str, required=False)
 
     args = parser.parse_args()
 
     app_ns = args.app_namespace
     portfolio_size = args.portfolio_size
+    metrics_format = args.metrics_format
+    metrics_file = args.metrics_file
 
     if portfolio_size <= 0:
         log.error("Portfolio Size (-portfolio_size) must be a positive number")
         exit(-1)
 
-    return (app_ns, portfolio_size)
+    return (app_ns, portfolio_size, metrics_format, metrics_file)
 
 
 def main():
@@ -57,18 +75,25 @@ def main():
         Main function of this script
     """
     try:
-        (app_ns, portfolio_size) = parse_params()
+        (app_ns, portfolio_size, metrics_format, metrics_file) = parse_params()
 
         log.info("Application Parameters")
         log.info("-app_namespace: %s" % app_ns)
         log.info("-portfolio_size: %d" % portfolio_size)
+        log.info("-metrics_format: %s" % metrics_format)
+        log.info("-metrics_file: %s" % metrics_file)
+
+        # TDAmeritrade call and trading phase latencies are reported at exit
+        timing.dump_report_at_exit(metrics_format, metrics_file)
 
         # test all connectivity upfront, so if there any issues
         # the problem becomes more apparent
-        connector_test.test_all_connectivity()
+        with timing.span('portfolio_manager.connectivity_test'):
+            connector_test.test_all_connectivity()
 
-        (current_portfolio,
-         security_recommendation) = portfolio_mgr_svc.get_service_inputs(app_ns)
+        with timing.span('portfolio_manager.get_service_inputs'):
+            (current_portfolio,
+             security_recommendation) = portfolio_mgr_svc.get_service_inputs(app_ns)
 
         log.info("Loaded recommendation set id: %s" %
                  security_recommendation.model['set_id'])
@@ -79,46 +104,25 @@ def main():
             current_portfolio.create_empty_portfolio(security_recommendation)
         else:
             log.info("Repricing portfolio")
-            current_portfolio.reprice(datetime.now())
+            with timing.span('portfolio_manager.reprice'):
+                current_portfolio.reprice(datetime.now())
 
         (updated_portfolio, updated) = portfolio_mgr_svc.update_portfolio(
             current_portfolio, security_recommendation, portfolio_size)
 
         # See if there is anything that needs to be traded
-        market_open = td_ameritrade.equity_market_open(datetime.now())
-
-        if market_open == True:
-            broker = Broker()
-            broker.cancel_all_open_orders()
-
-            log.info("Market is open. Looking for trading opportunities")
-            current_positions = td_ameritrade.positions_summary()
-
-            try:
-                if broker.reconcile_portfolio(current_positions, updated_portfolio) == False:
-                    log.info(
-                        "Portfolio is not in sync with brokerage account positions. Positions will be rebalanced")
-
-                broker.materialize_portfolio(
-                    current_positions, updated_portfolio)
-            finally:
-                updated_positions = td_ameritrade.positions_summary()
-                broker.synchronize_portfolio(
-                    updated_positions, updated_portfolio)
-
-                updated_portfolio.recalc_returns()
-                broker.cancel_all_open_orders()
-        else:
-            log.info("Market is closed. Nothing to trade")
+        portfolio_mgr_svc.trade_portfolio(updated_portfolio, Broker())
 
         log.info("updated portfolio: %s" %
                  util.format_dict(updated_portfolio.to_dict()))
 
         log.info("Saving updated portfolio")
-        updated_portfolio.save_to_s3(app_ns)
+        with timing.span('portfolio_manager.save_portfolio'):
+            updated_portfolio.save_to_s3(app_ns)
 
-        portfolio_mgr_svc.publish_current_returns(
-            updated_portfolio, updated, app_ns)
+        with timing.span('portfolio_manager.publish_returns'):
+            portfolio_mgr_svc.publish_current_returns(
+                updated_portfolio, updated, app_ns)
 
     except Exception as e:
         stack_trace = traceback.format_exc()
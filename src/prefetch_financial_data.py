@@ -0,0 +1,77 @@
+"""prefetch_financial_data.py
+
+Populates the financial cache and price store ahead of a run, so that
+scheduled recommendation runs and backtests start against a hot cache.
+"""
+import argparse
+import logging
+from datetime import datetime
+from model.ticker_file import TickerFile
+from connectors import intrinio_data
+from services import backtest_svc, prefetch_svc
+from support import constants, util
+from support import logging_definition
+
+log = logging.getLogger()
+
+
+def main():
+    """
+        Main Function for this script
+    """
+
+    description = """
+                Reads a list of ticker symbols and populates the financial cache
+                with the target price estimates and daily prices required by
+                the PRICE_DISPERSION strategy for the supplied range of periods.
+
+                Requests are executed concurrently and are retried with an
+                exponential backoff when Intrinio rate limits them.
+              """
+
+    current_period = datetime.now().strftime('%Y/%m')
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("-ticker_file", help="Ticker Symbol file",
+                        type=str, required=True)
+    parser.add_argument(
+        "-start_period", help="First analysis period (yyyy/mm)", type=str, required=True)
+    parser.add_argument(
+        "-end_period", help="Last analysis period (yyyy/mm). Defaults to the current month", type=str, default=current_period)
+    parser.add_argument(
+        "-max_workers", help="Number of concurrent requests", type=int, default=constants.DATA_LOADER_MAX_WORKERS)
+
+    args = parser.parse_args()
+
+    log.info("Parameters:")
+    log.info("Ticker File: %s" % args.ticker_file)
+    log.info("Periods: %s - %s" % (args.start_period, args.end_period))
+    log.info("Max Workers: %d" % args.max_workers)
+
+    try:
+        (start_year, start_month) = util.parse_period(args.start_period)
+        (end_year, end_month) = util.parse_period(args.end_period)
+
+        periods = backtest_svc.backtest_periods(
+            start_year, start_month, end_year, end_month)
+
+        ticker_list = TickerFile.from_local_file(
+            constants.TICKER_DATA_DIR, args.ticker_file).ticker_list
+
+        log.info("Prefetching financial data for %d tickers and %d periods" %
+                 (len(ticker_list), len(periods)))
+
+        stats = prefetch_svc.prefetch(
+            ticker_list, periods, args.max_workers)
+
+        log.info("Prefetch results:")
+        log.info(util.format_dict(stats.to_dict()))
+        log.info("Intrinio rate limiter:")
+        log.info(util.format_dict(intrinio_data.rate_limiter.stats()))
+
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        exit(-1)
+
+if __name__ == "__main__":
+    main()
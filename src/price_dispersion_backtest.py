@@ -2,23 +2,34 @@
 """
 import argparse
 import logging
+import os
 import pandas as pd
-from datetime import datetime
-from datetime import timedelta
-from support import util
-from exception.exceptions import BaseError
-from connectors import intrinio_util
-from support.financial_cache import cache
-from strategies.price_dispersion_strategy import PriceDispersionStrategy
-from strategies import calculator
+from connectors import market_data_source
+from exception.exceptions import ValidationError
 from model.ticker_file import TickerFile
-from support import constants
+from services import backtest_svc
+from support import constants, util
 
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] - %(message)s')
 log = logging.getLogger()
 
 
+def parse_horizons(horizons_str: str):
+    '''
+        Converts a comma separated list of horizons (in months) into a list of ints
+    '''
+    try:
+        horizons = [int(h) for h in horizons_str.split(',')]
+    except Exception:
+        raise ValidationError(
+            "%s is invalid. Expecting a comma separated list of months, e.g. '1,2,3'" % horizons_str, None)
+
+    backtest_svc.validate_horizons(horizons)
+
+    return horizons
+
+
 def main():
     """
         Main Function for this script
@@ -30,6 +41,8 @@ def main():
                 It works by running the strategy on a monthly basis and then displaying
                 the average current returns vs the selected portolio returns.
 
+                Periods are executed in parallel using a pool of worker processes.
+
               """
 
     parser = argparse.ArgumentParser(description=description)
@@ -37,6 +50,16 @@ def main():
                         type=str, required=True)
     parser.add_argument(
         "-output_size", help="Number of selected securities", type=int, required=True)
+    parser.add_argument(
+        "-start_period", help="First analysis period (yyyy/mm)", type=str, default="2019/05")
+    parser.add_argument(
+        "-end_period", help="Last analysis period (yyyy/mm)", type=str, default="2020/01")
+    parser.add_argument(
+        "-horizons", help="Comma separated list of return horizons in months", type=str, default="1,2,3")
+    parser.add_argument(
+        "-max_workers", help="Number of worker processes, which share the Intrinio API rate", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "-dataset_dir", help="Local dataset directory used instead of Intrinio", type=str, default=None)
 
     args = parser.parse_args()
 
@@ -46,107 +69,33 @@ def main():
     log.info("Parameters:")
     log.info("Ticker File: %s" % ticker_file_name)
     log.info("Output Size: %d" % output_size)
-
-    ticker_list = []
-
-    backtest_report = {
-        'investment_period': [],
-        'ticker_sample_size': [],
-        'avg_ret_1M': [],
-        'sel_ret_1M': [],
-        'avg_ret_2M': [],
-        'sel_ret_2M': [],
-        'avg_ret_3M': [],
-        'sel_ret_3M': []
-    }
-
-    backtest_summary = {
-        'investment_period': [],
-        'ticker_sample_size': [],
-        'avg_tot_1M': [],
-        'sel_tot_1M': [],
-        'avg_tot_2M': [],
-        'sel_tot_2M': [],
-        'avg_tot_3M': [],
-        'sel_tot_3M': []
-    }
-
-    today = datetime.now()
-
-    def backtest(year: int, month: int):
-        log.info("Peforming backtest for %d/%d" % (month, year))
-        data_end_date = intrinio_util.get_month_date_range(year, month)[1]
-
-        strategy = PriceDispersionStrategy(
-            ticker_list, year, month, output_size)
-        strategy.generate_recommendation()
-
-        date_1m = data_end_date + timedelta(days=30)
-        date_2m = data_end_date + timedelta(days=60)
-        date_3m = data_end_date + timedelta(days=90)
-
-        portfolio_1m = calculator.mark_to_market(
-            strategy.recommendation_dataframe, date_1m)['actual_return'].mean() * 100
-        portfolio_2m = calculator.mark_to_market(
-            strategy.recommendation_dataframe, date_2m)['actual_return'].mean() * 100
-        portfolio_3m = calculator.mark_to_market(
-            strategy.recommendation_dataframe, date_3m)['actual_return'].mean() * 100
-
-        all_stocks_1m = calculator.mark_to_market(strategy.raw_dataframe, date_1m)[
-            'actual_return'].mean() * 100
-        all_stocks_2m = calculator.mark_to_market(strategy.raw_dataframe, date_2m)[
-            'actual_return'].mean() * 100
-        all_stocks_3m = calculator.mark_to_market(strategy.raw_dataframe, date_3m)[
-            'actual_return'].mean() * 100
-
-        backtest_report['investment_period'].append(
-            data_end_date.strftime('%Y/%m'))
-        backtest_report['ticker_sample_size'].append(
-            len(strategy.raw_dataframe))
-
-        backtest_report['avg_ret_1M'].append(all_stocks_1m)
-        backtest_report['sel_ret_1M'].append(portfolio_1m)
-        backtest_report['avg_ret_2M'].append(all_stocks_2m)
-        backtest_report['sel_ret_2M'].append(portfolio_2m)
-        backtest_report['avg_ret_3M'].append(all_stocks_3m)
-        backtest_report['sel_ret_3M'].append(portfolio_3m)
+    log.info("Periods: %s - %s" % (args.start_period, args.end_period))
+    log.info("Horizons: %s" % args.horizons)
+    log.info("Max Workers: %d" % args.max_workers)
+    log.info("Data Source: %s" % (args.dataset_dir or "Intrinio"))
 
     try:
+        (start_year, start_month) = util.parse_period(args.start_period)
+        (end_year, end_month) = util.parse_period(args.end_period)
+        horizons = parse_horizons(args.horizons)
+
+        periods = backtest_svc.backtest_periods(
+            start_year, start_month, end_year, end_month)
 
         ticker_list = TickerFile.from_local_file(
             constants.TICKER_DATA_DIR, ticker_file_name).ticker_list
 
-        backtest(2019, 5)
-        backtest(2019, 6)
-        backtest(2019, 7)
-        backtest(2019, 8)
-        backtest(2019, 9)
-        backtest(2019, 10)
-        backtest(2019, 11)
-        backtest(2019, 12)
-        backtest(2020, 1)
-
-        backtest_dataframe = pd.DataFrame(backtest_report)
+        if args.dataset_dir is None:
+            data_source = market_data_source.data_source
+        else:
+            data_source = market_data_source.LocalFileDataSource(
+                args.dataset_dir)
+
+        (backtest_dataframe, backtest_summary_dataframe) = backtest_svc.run_backtest(
+            ticker_list, periods, horizons, output_size, args.max_workers, data_source)
+
         pd.options.display.float_format = '{:.2f}%'.format
         print(backtest_dataframe.to_string(index=False))
-
-        backtest_summary['investment_period'] = ['----/--']
-        backtest_summary['ticker_sample_size'] = ['--']
-
-        backtest_summary['avg_tot_1M'].append(
-            backtest_dataframe['avg_ret_1M'].sum())
-        backtest_summary['sel_tot_1M'].append(
-            backtest_dataframe['sel_ret_1M'].sum())
-        backtest_summary['avg_tot_2M'].append(
-            backtest_dataframe['avg_ret_2M'].sum())
-        backtest_summary['sel_tot_2M'].append(
-            backtest_dataframe['sel_ret_2M'].sum())
-        backtest_summary['avg_tot_3M'].append(
-            backtest_dataframe['avg_ret_3M'].sum())
-        backtest_summary['sel_tot_3M'].append(
-            backtest_dataframe['sel_ret_3M'].sum())
-
-        backtest_summary_dataframe = pd.DataFrame(backtest_summary)
         print(backtest_summary_dataframe.to_string(index=False))
 
     except Exception as e:
@@ -0,0 +1,63 @@
+"""record_intrinio_fixtures.py
+
+Records the Intrinio data used by the PRICE_DISPERSION strategy (target
+price estimates and daily prices) for a ticker file and a date range, and
+saves it as fixtures for the local Intrinio simulator.
+"""
+import argparse
+import logging
+from datetime import datetime
+from model.ticker_file import TickerFile
+from simulator import intrinio_simulator
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+from support import constants
+from support import logging_definition
+
+log = logging.getLogger()
+
+
+def main():
+    """
+        Main Function for this script
+    """
+
+    description = """
+                Records Intrinio data as fixtures for the local Intrinio
+                simulator. See strategy_benchmark.py
+              """
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("-ticker_file", help="Ticker Symbol file",
+                        type=str, required=True)
+    parser.add_argument(
+        "-start_date", help="First date of the recorded data (YYYY-MM-DD)", type=str, required=True)
+    parser.add_argument(
+        "-end_date", help="Last date of the recorded data (YYYY-MM-DD)", type=str, required=True)
+    parser.add_argument(
+        "-output_dir", help="Directory where fixtures are saved", type=str, required=True)
+
+    args = parser.parse_args()
+
+    log.info("Parameters:")
+    log.info("Ticker File: %s" % args.ticker_file)
+    log.info("Date Range: %s - %s" % (args.start_date, args.end_date))
+    log.info("Output Directory: %s" % args.output_dir)
+
+    try:
+        ticker_list = TickerFile.from_local_file(
+            constants.TICKER_DATA_DIR, args.ticker_file).ticker_list
+
+        fixtures = intrinio_simulator.record_fixtures(
+            ticker_list, datetime.strptime(args.start_date, '%Y-%m-%d'),
+            datetime.strptime(args.end_date, '%Y-%m-%d'),
+            PriceDispersionStrategy.TARGET_PRICE_TAGS)
+
+        intrinio_simulator.save_fixtures(args.output_dir, fixtures)
+        log.info("Recorded %d tickers" % len(fixtures))
+
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        exit(-1)
+
+if __name__ == "__main__":
+    main()
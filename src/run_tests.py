@@ -6,21 +6,36 @@ import unittest
 import logging
 from test.test_exceptions import TestExceptions
 from test.test_support_financial_cache import TestFinancialCache
+from test.test_support_price_store import TestPriceStore
 from test.test_support_util import TestSupportUtil
+from test.test_support_startup_profiler import TestStartupProfiler
+from test.test_support_lazy_module import TestLazyModule
 from test.test_strategies_price_dispersion import TestStrategiesPriceDispersion
 from test.test_strategies_calculator import TestStrategiesCalculator
 from test.test_connectors_aws_service_wrapper import TestConnectorsAWSServiceWrapper
 from test.test_connectors_td_ameritrade import TestConnectorsTDAmeritrade
 from test.test_connectors_intrinio_util import TestConnectorsIntrinioUtil
 from test.test_connectors_intrinio_data import TestConnectorsIntrinioData
+from test.test_connectors_market_data_source import TestConnectorsMarketDataSource
 from test.test_connector_connector_test import TestConnectorsTest
 from test.test_services_recommendation import TestServicesRecommendation
 from test.test_services_portfolio_mgr import TestServicePortfolioManager
 from test.test_services_broker import TestBroker
+from test.test_services_order_tracker import TestServicesOrderTracker
+from test.test_services_trading_benchmark import TestServicesTradingBenchmark
+from test.test_services_strategy_benchmark import TestServicesStrategyBenchmark
+from test.test_services_benchmark_suite import TestServicesBenchmarkSuite
+from test.test_simulator_td_ameritrade_simulator import TestTDAmeritradeSimulator
+from test.test_simulator_intrinio_simulator import TestIntrinioSimulator
+from test.test_services_backtest import TestServicesBacktest
+from test.test_services_prefetch import TestServicesPrefetch
 from test.test_model_ticker_file import TestModelTickerFile
 from test.test_model_recommendation_set import TestSecurityRecommendationSet
 from test.test_model_base_model import TestBaseModel
 from test.test_model_portfolio import TestPortfolio
+from test.test_startup import TestStartup
+from test.test_support_timing import TestSupportTiming
+from test.test_support_rate_limiter import TestSupportRateLimiter
 
 logging.basicConfig(level=logging.ERROR,
                     format='[%(levelname)s] - %(message)s')
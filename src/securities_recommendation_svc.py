@@ -6,12 +6,19 @@ Complete documentation can be found here:
 https://github.com/hanegraaff/stock-advisor-software
 
 """
+import sys
+from support import startup_profiler
+
+# started before any other import, so that imports are measured
+if startup_profiler.PROFILE_STARTUP_ARG in sys.argv:
+    startup_profiler.start()
+
 import argparse
 import logging
 import traceback
 from datetime import datetime, timedelta
-from connectors import aws_service_wrapper, connector_test
-from support import util
+from connectors import aws_service_wrapper, connector_test, market_data_source, intrinio_data
+from support import util, timing
 from exception.exceptions import ValidationError, AWSError
 from strategies.price_dispersion_strategy import PriceDispersionStrategy
 from strategies import calculator
@@ -38,7 +45,7 @@ def parse_params():
         Returns
         ----------
         A tuple containing the application paramter values
-        (environment, ticker_file_name, output_size, month, year, current_price_date, app_ns)
+        (environment, ticker_file_name, output_size, month, year, current_price_date, app_ns, dataset_dir)
     """
 
     description = """ Reads a list of US Equity ticker symbols and recommends a subset of them
@@ -61,6 +68,11 @@ def parse_params():
         "-ticker_file", help="Ticker Symbol local file path", type=str, required=True)
     parser.add_argument(
         "-output_size", help="Number of selected securities", type=int, required=True)
+    parser.add_argument(
+        "-dataset_dir", help="Local dataset directory used instead of Intrinio", type=str, required=False)
+    parser.add_argument(
+        startup_profiler.PROFILE_STARTUP_ARG, help="Log the import times of all modules and the time of the first API calls at exit",
+        action="store_true")
 
     subparsers = parser.add_subparsers(title='environment',
                                        description='runtime environment',
@@ -87,6 +99,7 @@ def parse_params():
     ticker_file_name = args.ticker_file
     output_size = args.output_size
     environment = args.environment
+    dataset_dir = args.dataset_dir
     app_ns = None
 
     try:
@@ -119,7 +132,7 @@ def parse_params():
             app_ns = args.app_namespace
 
         return (environment, ticker_file_name, output_size,
-                month, year, current_price_date, app_ns)
+                month, year, current_price_date, app_ns, dataset_dir)
     except Exception as e:
         log.error("Could not validate command line parameters beacuse: %s" % str(e))
         exit(-1)
@@ -138,10 +151,11 @@ def display_calculation_dataframe(month: int, year: int, strategy: object, curre
     raw_dataframe = strategy.raw_dataframe
 
     log.info("Calculating Current Returns")
-    raw_dataframe = calculator.mark_to_market(
-        strategy.raw_dataframe, current_price_date)
-    recommendation_dataframe = calculator.mark_to_market(
-        strategy.recommendation_dataframe, current_price_date)
+    with timing.span('recommendation_svc.mark_to_market'):
+        raw_dataframe = calculator.mark_to_market(
+            strategy.raw_dataframe, current_price_date)
+        recommendation_dataframe = calculator.mark_to_market(
+            strategy.recommendation_dataframe, current_price_date)
 
     log.info("")
     log.info("Recommended Securities")
@@ -165,9 +179,15 @@ def main():
     """
         Main function for this script
     """
+    # phase durations, cache and rate limiter counters are logged as JSON records at exit
+    timing.register_counters('financial_cache', intrinio_data.cache.stats)
+    timing.register_counters('intrinio_rate_limiter',
+                             intrinio_data.rate_limiter.stats)
+    timing.log_report_at_exit()
+
     try:
         (environment, ticker_file_name, output_size, month,
-         year, current_price_date, app_ns) = parse_params()
+         year, current_price_date, app_ns, dataset_dir) = parse_params()
 
         log.info("Parameters:")
         log.info("Environment: %s" % environment)
@@ -175,33 +195,45 @@ def main():
         log.info("Output Size: %d" % output_size)
         log.info("Analysis Month: %d" % month)
         log.info("Analysis Year: %d" % year)
+        log.info("Data Source: %s" % (dataset_dir or "Intrinio"))
+
+        if dataset_dir is not None:
+            market_data_source.data_source = market_data_source.LocalFileDataSource(
+                dataset_dir)
 
         if environment == "TEST":
             log.info("reading ticker file from local filesystem")
-            ticker_list = TickerFile.from_local_file(
-                constants.TICKER_DATA_DIR, ticker_file_name).ticker_list
+            with timing.span('recommendation_svc.read_ticker_file'):
+                ticker_list = TickerFile.from_local_file(
+                    constants.TICKER_DATA_DIR, ticker_file_name).ticker_list
 
             log.info("Performing Recommendation Algorithm")
             strategy = PriceDispersionStrategy(
                 ticker_list, year, month, output_size)
-            strategy.generate_recommendation()
+            with timing.span('recommendation_svc.generate_recommendation'):
+                strategy.generate_recommendation()
             display_calculation_dataframe(
                 month, year, strategy, current_price_date)
         else:  # environment == "PRODUCTION"
             # test all connectivity upfront, so if there any issues
             # the problem becomes more apparent
-            connector_test.test_aws_connectivity()
-            connector_test.test_intrinio_connectivity()
+            with timing.span('recommendation_svc.connectivity_test'):
+                connector_test.test_aws_connectivity()
+                if dataset_dir is None:
+                    connector_test.test_intrinio_connectivity()
 
             log.info("Reading ticker file from s3 bucket")
-            ticker_list = TickerFile.from_s3_bucket(
-                ticker_file_name, app_ns).ticker_list
+            with timing.span('recommendation_svc.read_ticker_file'):
+                ticker_list = TickerFile.from_s3_bucket(
+                    ticker_file_name, app_ns).ticker_list
 
             log.info("Loading existing recommendation set from S3")
             recommendation_set = None
 
             try:
-                recommendation_set = SecurityRecommendationSet.from_s3(app_ns)
+                with timing.span('recommendation_svc.load_recommendation_set'):
+                    recommendation_set = SecurityRecommendationSet.from_s3(
+                        app_ns)
             except AWSError as awe:
                 if not awe.resource_not_found():
                     raise awe
@@ -214,14 +246,17 @@ def main():
                 strategy = PriceDispersionStrategy(
                     ticker_list, year, month, output_size)
 
-                strategy.generate_recommendation()
+                with timing.span('recommendation_svc.generate_recommendation'):
+                    strategy.generate_recommendation()
                 recommendation_set = strategy.recommendation_set
                 display_calculation_dataframe(
                     month, year, strategy, current_price_date)
 
-                recommendation_set.save_to_s3(app_ns)
-                recommendation_svc.notify_new_recommendation(
-                    recommendation_set, app_ns)
+                with timing.span('recommendation_svc.save_recommendation_set'):
+                    recommendation_set.save_to_s3(app_ns)
+                with timing.span('recommendation_svc.publish_notification'):
+                    recommendation_svc.notify_new_recommendation(
+                        recommendation_set, app_ns)
             else:
                 log.info(
                     "Recommendation set is still valid. There is nothing to do")
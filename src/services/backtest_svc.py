@@ -0,0 +1,203 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains the backtest engine used by the price_dispersion_backtest
+script. It exists so that the code may be tested, otherwise it would
+be organized along with the script itself.
+
+A backtest runs the PRICE_DISPERSION strategy once for every month in a
+date range and marks the results to market for a list of horizons
+(expressed in months). Periods are independent of each other, so they are
+sharded across a pool of processes. All workers share the on disk financial
+cache and price store, which are warmed by the parent process before the
+periods are distributed, using prefetch_svc with one thread per worker.
+
+Every process has its own Intrinio rate limiter, so each worker is limited
+to its share of the configured rate, and the pool as a whole never exceeds it.
+"""
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+from connectors import intrinio_data, intrinio_util, market_data_source
+from services import prefetch_svc
+from exception.exceptions import ValidationError
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+from strategies import calculator
+
+log = logging.getLogger()
+
+
+def backtest_periods(start_year: int, start_month: int, end_year: int, end_month: int):
+    '''
+        Returns the list of (year, month) periods between the supplied
+        start and end periods (inclusive)
+
+        E.g.
+            (2019, 11, 2020, 2) -> [(2019, 11), (2019, 12), (2020, 1), (2020, 2)]
+    '''
+    if (start_month not in range(1, 13) or end_month not in range(1, 13)):
+        raise ValidationError("Invalid month. Must be between 1 and 12", None)
+
+    if (start_year, start_month) > (end_year, end_month):
+        raise ValidationError(
+            "The backtest start period must not be after the end period", None)
+
+    periods = []
+    (year, month) = (start_year, start_month)
+    while (year, month) <= (end_year, end_month):
+        periods.append((year, month))
+        (year, month) = (year + month // 12, month % 12 + 1)
+
+    return periods
+
+
+def validate_horizons(horizons: list):
+    '''
+        Validates the list of horizons (in months) and raises a ValidationError
+        if it is empty or contains non positive values
+    '''
+    if horizons is None or len(horizons) == 0:
+        raise ValidationError("At least one horizon must be supplied", None)
+
+    for horizon in horizons:
+        if not isinstance(horizon, int) or horizon <= 0:
+            raise ValidationError(
+                "Invalid horizon: %s. Must be a positive number of months" % str(horizon), None)
+
+
+def horizon_price_dates(data_end_date: datetime, horizons: list):
+    '''
+        Returns a dictionary of horizon label => price date, e.g.
+
+        {
+            '1M': data_end_date + 30 days,
+            '2M': data_end_date + 60 days
+        }
+    '''
+    return {"%dM" % horizon: data_end_date + timedelta(days=30 * horizon)
+            for horizon in horizons}
+
+
+def backtest_period(ticker_list: list, year: int, month: int, output_size: int, horizons: list,
+                    data_source: object = None):
+    '''
+        Runs the strategy for a single period and marks the results to
+        market for every horizon. Horizons ending in the future are reported
+        as NaN.
+
+        This function is executed by the worker processes, so it must be
+        defined at the module level.
+
+        Returns
+        -------
+        A dictionary representing a single row of the backtest report
+    '''
+    log.info("Peforming backtest for %d/%d" % (month, year))
+    data_end_date = intrinio_util.get_month_date_range(year, month)[1]
+
+    if data_source is None:
+        data_source = market_data_source.data_source
+
+    strategy = PriceDispersionStrategy(
+        ticker_list, year, month, output_size, data_source=data_source)
+    strategy.generate_recommendation()
+
+    row = {
+        'investment_period': data_end_date.strftime('%Y/%m'),
+        'ticker_sample_size': len(strategy.raw_dataframe)
+    }
+
+    now = datetime.now()
+    all_price_dates = horizon_price_dates(data_end_date, horizons)
+    price_dates = {h: d for (h, d) in all_price_dates.items() if d <= now}
+
+    if len(price_dates) > 0:
+        portfolio_returns = calculator.mark_to_market_multi(
+            strategy.recommendation_dataframe, price_dates, data_source)
+        all_stocks_returns = calculator.mark_to_market_multi(
+            strategy.raw_dataframe, price_dates, data_source)
+
+    for horizon in all_price_dates.keys():
+        if horizon in price_dates:
+            row['avg_ret_%s' % horizon] = all_stocks_returns[
+                'actual_return_%s' % horizon].mean() * 100
+            row['sel_ret_%s' % horizon] = portfolio_returns[
+                'actual_return_%s' % horizon].mean() * 100
+        else:
+            row['avg_ret_%s' % horizon] = math.nan
+            row['sel_ret_%s' % horizon] = math.nan
+
+    return row
+
+
+def run_backtest(ticker_list: list, periods: list, horizons: list, output_size: int, max_workers: int,
+                 data_source: object = None):
+    '''
+        Runs the backtest for all the supplied periods, distributing them
+        across a pool of 'max_workers' processes. When 'max_workers' is 1,
+        periods are executed serially in the current process.
+
+        Parameters
+        ----------
+        ticker_list : list
+            list of tickers included in the analysis
+        periods : list
+            list of (year, month) tuples. See backtest_periods()
+        horizons : list
+            list of horizons in months used to compute returns
+        output_size : int
+            number of securities selected by the strategy
+        max_workers : int
+            number of worker processes. When reading from Intrinio, each
+            worker is limited to 1/max_workers of the API rate
+        data_source : MarketDataSource
+            (optional) the source of the financial data.
+            Defaults to market_data_source.data_source
+
+        Returns
+        -------
+        A tuple of Pandas dataframes (backtest_report, backtest_summary)
+    '''
+    validate_horizons(horizons)
+
+    if periods is None or len(periods) == 0:
+        raise ValidationError("At least one period must be supplied", None)
+
+    if max_workers <= 0:
+        raise ValidationError("Max workers must be at least 1", None)
+
+    if data_source is None:
+        data_source = market_data_source.data_source
+
+    # local datasets do not need to be warmed, or rate limited
+    initializer = None
+    if isinstance(data_source, market_data_source.IntrinioDataSource):
+        stats = prefetch_svc.prefetch(ticker_list, periods, max_workers)
+        log.info("Warmed financial data: %s" % str(stats.to_dict()))
+        initializer = intrinio_data.share_rate_limit
+
+    args = [(ticker_list, year, month, output_size, horizons, data_source)
+            for (year, month) in periods]
+
+    if max_workers == 1:
+        report_rows = [backtest_period(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                                 initargs=(max_workers,)) as executor:
+            report_rows = list(executor.map(
+                backtest_period, *zip(*args)))
+
+    backtest_report = pd.DataFrame(report_rows)
+
+    backtest_summary = {
+        'investment_period': ['----/--'],
+        'ticker_sample_size': ['--']
+    }
+    for horizon in horizon_price_dates(datetime.now(), horizons).keys():
+        backtest_summary['avg_tot_%s' % horizon] = [
+            backtest_report['avg_ret_%s' % horizon].sum()]
+        backtest_summary['sel_tot_%s' % horizon] = [
+            backtest_report['sel_ret_%s' % horizon].sum()]
+
+    return (backtest_report, pd.DataFrame(backtest_summary))
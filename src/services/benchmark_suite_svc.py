@@ -0,0 +1,379 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains supporting logic for the benchmark_suite script,
+which measures how the main recommendation and portfolio paths scale with
+the size of the ticker universe. It exists solely so that the code may be
+tested. otherwise it would be organized along with the script itself.
+
+Every benchmark runs against the local Intrinio and TDAmeritrade simulators,
+using a synthetic universe, and returns the duration of one or more
+measurements. Results can be saved as a baseline, and later runs can be
+compared against it to produce a regression report.
+"""
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from connectors import intrinio_data
+from exception.exceptions import ValidationError, FileSystemError
+from model.portfolio import Portfolio
+from services import strategy_benchmark_svc, trading_benchmark_svc
+from services.broker import Broker
+from services.order_tracker import OrderTracker
+from simulator.intrinio_simulator import SyntheticFixtures
+from simulator.td_ameritrade_simulator import TDAmeritradeSimulator
+from strategies import calculator
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+from support import constants, util
+from support.financial_cache import FinancialCache
+
+log = logging.getLogger()
+
+BENCHMARK_UNIVERSE_SIZES = [30, 500, 3000]
+
+# analysis period and price date used by all benchmarks
+BENCHMARK_YEAR = 2020
+BENCHMARK_MONTH = 1
+BENCHMARK_PRICE_DATE = datetime(2020, 2, 28)
+
+# relative change of the median duration reported as a regression
+BENCHMARK_REGRESSION_THRESHOLD = 0.25
+
+# changes smaller than this are considered noise
+BENCHMARK_MIN_CHANGE_SECONDS = 0.001
+
+# number of monthly analysis periods ranked by the ranking benchmark
+BENCHMARK_RANKING_PERIODS = 120
+
+FIXTURES = SyntheticFixtures()
+
+
+def benchmark_strategy(ticker_list: list):
+    '''
+        PriceDispersionStrategy.generate_recommendation(), with a cold and a warm cache
+    '''
+    with strategy_benchmark_svc.local_intrinio(FIXTURES) as simulator:
+        cold = strategy_benchmark_svc.strategy_run(
+            simulator, ticker_list, BENCHMARK_YEAR, BENCHMARK_MONTH, 3, constants.DATA_LOADER_MAX_WORKERS)
+        warm = strategy_benchmark_svc.strategy_run(
+            simulator, ticker_list, BENCHMARK_YEAR, BENCHMARK_MONTH, 3, constants.DATA_LOADER_MAX_WORKERS)
+
+    return {
+        'generate_recommendation.cold': cold['elapsed_seconds'],
+        'generate_recommendation.warm': warm['elapsed_seconds']
+    }
+
+
+def benchmark_mark_to_market(ticker_list: list):
+    '''
+        calculator.mark_to_market(), with a warm price store
+    '''
+    data_frame = pd.DataFrame({
+        'ticker': ticker_list,
+        'analysis_price': [100.0] * len(ticker_list)
+    })
+
+    with strategy_benchmark_svc.local_intrinio(FIXTURES):
+        calculator.mark_to_market(data_frame, BENCHMARK_PRICE_DATE)
+
+        start = time.perf_counter()
+        calculator.mark_to_market(data_frame, BENCHMARK_PRICE_DATE)
+        elapsed = time.perf_counter() - start
+
+    return {'mark_to_market': elapsed}
+
+
+def benchmark_financial_cache(ticker_list: list):
+    '''
+        FinancialCache.write() and read() of one historical data entry per ticker,
+        from the memory tier and from disk
+    '''
+    value = intrinio_data._encode_historical_data([{
+        'date': datetime(2020, 1, day).date(),
+        'value': 100.0 + day
+    } for day in range(1, 23)])
+    keys = ["benchmark-%s" % ticker for ticker in ticker_list]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = FinancialCache(cache_dir)
+        try:
+            start = time.perf_counter()
+            for key in keys:
+                cache.write(key, value)
+            write_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for key in keys:
+                cache.read(key)
+            read_elapsed = time.perf_counter() - start
+        finally:
+            cache.disk_cache.close()
+
+        # a new instance starts with an empty memory tier
+        cache = FinancialCache(cache_dir)
+        try:
+            start = time.perf_counter()
+            for key in keys:
+                cache.read(key)
+            read_disk_elapsed = time.perf_counter() - start
+        finally:
+            cache.disk_cache.close()
+
+    return {
+        'financial_cache.write': write_elapsed,
+        'financial_cache.read': read_elapsed,
+        'financial_cache.read_disk': read_disk_elapsed
+    }
+
+
+def benchmark_base_model(ticker_list: list):
+    '''
+        BaseModel.from_dict() and validate_model() of a portfolio
+        containing every ticker
+    '''
+    model_dict = trading_benchmark_svc.create_portfolio(
+        ticker_list, {ticker: 100.0 for ticker in ticker_list}).to_dict()
+
+    start = time.perf_counter()
+    portfolio = Portfolio.from_dict(model_dict)
+    from_dict_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    portfolio.validate_model()
+    validate_elapsed = time.perf_counter() - start
+
+    return {
+        'from_dict': from_dict_elapsed,
+        'validate_model': validate_elapsed
+    }
+
+
+def benchmark_reprice(ticker_list: list):
+    '''
+        Portfolio.reprice() of a portfolio containing every ticker,
+        with a warm price store
+    '''
+    portfolio = trading_benchmark_svc.create_portfolio(
+        ticker_list, {ticker: 100.0 for ticker in ticker_list})
+
+    with strategy_benchmark_svc.local_intrinio(FIXTURES):
+        portfolio.reprice(BENCHMARK_PRICE_DATE)
+
+        start = time.perf_counter()
+        portfolio.reprice(BENCHMARK_PRICE_DATE)
+        elapsed = time.perf_counter() - start
+
+    return {'reprice': elapsed}
+
+
+def benchmark_broker_trade(ticker_list: list):
+    '''
+        Broker.trade() of a buy order for every ticker, against the
+        TDAmeritrade simulator, including order tracking
+    '''
+    prices = {ticker: 100.0 for ticker in ticker_list}
+    portfolio = trading_benchmark_svc.create_portfolio(ticker_list, prices)
+    simulator = TDAmeritradeSimulator(
+        prices=prices, cash=1000 * len(ticker_list))
+
+    with trading_benchmark_svc.local_td_ameritrade(simulator):
+        broker = Broker(OrderTracker(initial_interval=0.01))
+
+        start = time.perf_counter()
+        broker.trade('BUY', [(ticker, 1)
+                             for ticker in ticker_list], portfolio)
+        elapsed = time.perf_counter() - start
+
+    return {'broker_trade': elapsed}
+
+
+def benchmark_ranking(ticker_list: list):
+    '''
+        PriceDispersionStrategy.score_securities() and rank_securities() of
+        BENCHMARK_RANKING_PERIODS analysis periods in a single call
+    '''
+    rng = np.random.default_rng(len(ticker_list))
+    shape = (BENCHMARK_RANKING_PERIODS, len(ticker_list))
+
+    analysis_prices = rng.uniform(10, 100, shape)
+    target_price_avgs = analysis_prices * rng.uniform(0.8, 1.5, shape)
+    target_price_sdtdevs = target_price_avgs * rng.uniform(0, 0.3, shape)
+
+    start = time.perf_counter()
+    (dispersion_stdev_pct, analyst_expected_return) = PriceDispersionStrategy.score_securities(
+        analysis_prices, target_price_avgs, target_price_sdtdevs)
+    PriceDispersionStrategy.rank_securities(
+        dispersion_stdev_pct, analyst_expected_return)
+    elapsed = time.perf_counter() - start
+
+    return {'ranking': elapsed}
+
+
+BENCHMARKS = {
+    'strategy': benchmark_strategy,
+    'ranking': benchmark_ranking,
+    'mark_to_market': benchmark_mark_to_market,
+    'financial_cache': benchmark_financial_cache,
+    'base_model': benchmark_base_model,
+    'reprice': benchmark_reprice,
+    'broker_trade': benchmark_broker_trade
+}
+
+
+def run_suite(benchmark_names: list, universe_sizes: list, runs: int):
+    '''
+        Executes the supplied benchmarks for every universe size
+
+        Parameters
+        ----------
+        benchmark_names : list
+            list of benchmarks to run. See BENCHMARKS
+        universe_sizes : list
+            list of synthetic universe sizes
+        runs : int
+            number of times each benchmark is executed
+
+        Returns
+        -------
+        A list of results, one per measurement and universe size, e.g.
+
+        [{
+            'benchmark': 'mark_to_market',
+            'universe_size': 30,
+            'runs': 3,
+            'min_seconds': 0.01,
+            'median_seconds': 0.012
+        }]
+    '''
+    for name in benchmark_names:
+        if name not in BENCHMARKS:
+            raise ValidationError("Unknown benchmark: %s. Valid values are: %s" %
+                                  (name, ", ".join(BENCHMARKS.keys())), None)
+
+    if universe_sizes is None or len(universe_sizes) == 0 or min(universe_sizes) < 2:
+        raise ValidationError(
+            "Universe sizes must contain at least 2 tickers", None)
+
+    if runs <= 0:
+        raise ValidationError("Runs must be a positive number", None)
+
+    results = []
+    for name in benchmark_names:
+        for universe_size in universe_sizes:
+            log.info("Running %s benchmark with %d tickers" %
+                     (name, universe_size))
+            ticker_list = strategy_benchmark_svc.synthetic_ticker_list(
+                universe_size)
+
+            measurements = {}
+            for i in range(0, runs):
+                for (measurement, seconds) in BENCHMARKS[name](ticker_list).items():
+                    measurements.setdefault(measurement, []).append(seconds)
+
+            for (measurement, seconds_list) in measurements.items():
+                results.append({
+                    'benchmark': measurement,
+                    'universe_size': universe_size,
+                    'runs': runs,
+                    'min_seconds': min(seconds_list),
+                    'median_seconds': statistics.median(seconds_list)
+                })
+
+    return results
+
+
+def save_baseline(path: str, results: list):
+    '''
+        Saves the results of run_suite() as a baseline
+    '''
+    baseline = {
+        'creation_date': util.date_to_iso_utc_string(datetime.now()),
+        'results': results
+    }
+
+    util.create_dir(os.path.dirname(path) or '.')
+
+    try:
+        with open(path, 'w') as file:
+            json.dump(baseline, file, indent=4)
+    except Exception as e:
+        raise FileSystemError("Could not save baseline to %s" % path, e)
+
+
+def load_baseline(path: str):
+    '''
+        Loads a baseline saved by save_baseline(), and returns its results
+    '''
+    try:
+        with open(path) as file:
+            return json.load(file)['results']
+    except Exception as e:
+        raise FileSystemError("Could not load baseline from %s" % path, e)
+
+
+def regression_report(results: list, baseline: list, threshold: float):
+    '''
+        Compares the median duration of each result with the baseline
+
+        Parameters
+        ----------
+        results : list
+            results returned by run_suite()
+        baseline : list
+            results loaded from a baseline
+        threshold : float
+            relative change (e.g. 0.25) beyond which a measurement is
+            reported as a REGRESSION or an IMPROVEMENT. Changes smaller
+            than BENCHMARK_MIN_CHANGE_SECONDS are ignored
+
+        Returns
+        -------
+        A Pandas dataframe with one row per result, and the following columns:
+        benchmark, universe_size, baseline_seconds, current_seconds, change_pct, status
+    '''
+    if threshold < 0:
+        raise ValidationError("Threshold cannot be negative", None)
+
+    baseline_seconds = {(b['benchmark'], b['universe_size']): b['median_seconds']
+                        for b in baseline}
+
+    report = {
+        'benchmark': [],
+        'universe_size': [],
+        'baseline_seconds': [],
+        'current_seconds': [],
+        'change_pct': [],
+        'status': []
+    }
+
+    for result in results:
+        current = result['median_seconds']
+        previous = baseline_seconds.get(
+            (result['benchmark'], result['universe_size']))
+
+        if previous is None:
+            (change, status) = (None, 'NEW')
+        else:
+            change = (current / previous - 1) if previous > 0 else 0
+            if abs(current - previous) < BENCHMARK_MIN_CHANGE_SECONDS:
+                status = 'OK'
+            elif change > threshold:
+                status = 'REGRESSION'
+            elif change < -threshold:
+                status = 'IMPROVEMENT'
+            else:
+                status = 'OK'
+
+        report['benchmark'].append(result['benchmark'])
+        report['universe_size'].append(result['universe_size'])
+        report['baseline_seconds'].append(previous)
+        report['current_seconds'].append(current)
+        report['change_pct'].append(None if change is None else change * 100)
+        report['status'].append(status)
+
+    return pd.DataFrame(report)
@@ -2,12 +2,13 @@
 """
 
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import dateutil.parser as parser
 from connectors import td_ameritrade
+from services.order_tracker import OrderTracker
 from exception.exceptions import ValidationError, TradeError
-from support import util
+from support import util, constants, timing
 
 log = logging.getLogger()
 
@@ -26,6 +27,33 @@ class Broker():
             based on the contents of the brokerage account.
     '''
 
+    def __init__(self, order_tracker: object = None, **kwargs):
+        '''
+            Initializes the broker
+
+            Parameters
+            ----------
+            order_tracker : OrderTracker
+                (optional) the object used to wait for orders to complete.
+                Defaults to an OrderTracker with the default polling schedule
+            max_workers : int (kwargs)
+                (optional) the maximum number of orders submitted concurrently
+        '''
+        if order_tracker is None:
+            order_tracker = OrderTracker()
+
+        try:
+            max_workers = kwargs['max_workers']
+        except KeyError:
+            max_workers = constants.ORDER_PLACEMENT_MAX_WORKERS
+
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValidationError(
+                "Invalid max workers: %s. Must be at least 1" % str(max_workers), None)
+
+        self.order_tracker = order_tracker
+        self.max_workers = max_workers
+
     def reconcile_portfolio(self, broker_positions: dict, current_portfolio: object):
         '''
             Compares the current portfolio with the current positions recorded
@@ -91,6 +119,7 @@ class Broker():
 
         current_portfolio.validate_model()
 
+    @timing.timed()
     def cancel_all_open_orders(self):
         '''
             Cancels any open orders that are in a cancelable state.
@@ -153,6 +182,7 @@ class Broker():
 
         return (sell_list, buy_list)
 
+    @timing.timed()
     def trade(self, action: str, trade_instructions: list, new_portfolio: dict):
         '''
             Executes all trades for the supplied list and action (BUY/SELL).
@@ -199,6 +229,20 @@ class Broker():
                 return
 
             new_portfolio.get_position(ticker)['order_id'] = order_id
+
+        def place_order(trade_instruction: tuple):
+            '''
+                Places a single order and returns its ID, or the TradeError
+                that prevented it from being placed
+            '''
+            (ticker, quantity) = trade_instruction
+            try:
+                log.info("Placing order: %s %.2f %s" %
+                         (action, quantity, ticker))
+                return td_ameritrade.place_order(
+                    action, ticker, quantity, 'SHARES')
+            except TradeError as te:
+                return te
         #
         # Executes all trades
         #
@@ -211,51 +255,43 @@ class Broker():
             log.info("There are no securities to be traded")
             return True
 
-        for (ticker, quantity) in trade_instructions:
-            try:
-                log.info("Placing order: %s %.2f %s" %
-                         (action, quantity, ticker))
-                order_id = td_ameritrade.place_order(
-                    action, ticker, quantity, 'SHARES')
-                track_order(ticker, order_id)
-            except TradeError as te:
-                log.warning("Could not execute order, because: %s" % str(te))
+        # submit all orders concurrently, so that they reach the market at
+        # nearly the same time
+        with timing.span('broker.submit_orders'):
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(trade_instructions))) as executor:
+                order_results = list(
+                    executor.map(place_order, trade_instructions))
+
+        for ((ticker, _), order_result) in zip(trade_instructions, order_results):
+            if isinstance(order_result, TradeError):
+                log.warning("Could not execute order, because: %s" %
+                            str(order_result))
                 order_ids.append('ERROR')
+            else:
+                track_order(ticker, order_result)
 
         #
         # Wait for trades to complete and update portfolio accordingly
         #
-        for i in range(0, 5):
-            log.info("Waiting for all trades to execute")
-            recent_orders = td_ameritrade.list_recent_orders()
-
-            completed = True
-            for order_id in recent_orders.keys():
-                status = recent_orders[order_id]['status']
-                close_time = recent_orders[order_id]['closeTime']
-
-                log.debug("Order %s is in %s state" % (order_id, status))
-                if close_time is None:
-                    log.info("Order %s is not completed" % order_id)
-                    completed = False
-                elif status == 'FILLED':
-                    log.info(
-                        "Order %s was filled and will no longer be tracked" % order_id)
-                    fill_order(order_id, recent_orders[order_id][
-                               'quantity'], recent_orders[order_id]['closeTime'])
-                else:
-                    log.info("Order %s completed with an error state" %
-                             order_id)
-                    if order_id in order_ids:
-                        order_ids.remove(order_id)
-
-            if completed:
-                log.info("All orders are closed.")
-                break
-            else:
+        log.info("Waiting for all trades to execute")
+        (completed_orders, pending_order_ids) = self.order_tracker.wait_for_orders(
+            [order_id for order_id in order_ids if order_id != 'ERROR'])
+
+        for order_id in completed_orders.keys():
+            order = completed_orders[order_id]
+
+            if order['status'] == 'FILLED':
                 log.info(
-                    "One or more orders are still being processed. Sleeping for 1 minute")
-                time.sleep(60)
+                    "Order %s was filled and will no longer be tracked" % order_id)
+                fill_order(order_id, order['quantity'], order['closeTime'])
+            else:
+                log.info("Order %s completed with an error state" %
+                         order_id)
+                if order_id in order_ids:
+                    order_ids.remove(order_id)
+
+        for order_id in pending_order_ids:
+            log.info("Order %s is not completed" % order_id)
 
         if len(order_ids) == 0:
             log.info("All securities were succefully [%s] traded" % action)
@@ -265,6 +301,7 @@ class Broker():
                      % (len(order_ids), action))
             return False
 
+    @timing.timed()
     def materialize_portfolio(self, broker_positions: dict, portfolio: object):
         '''
             Materializes the porfolio by executing the trades necessary to do so.
@@ -299,10 +336,17 @@ class Broker():
             # trade 90% of available cash
             trade_dollar_amount = (available_cash / len(buy_trades)) * 0.9
 
+            # price all securities with a single request
+            latest_prices = td_ameritrade.get_latest_equity_prices(buy_trades)
+
             buy_instructions = []
             for buy_ticker in buy_trades:
-                latest_price = td_ameritrade.get_latest_equity_price(
-                    buy_ticker)
+                try:
+                    latest_price = latest_prices[buy_ticker]
+                except KeyError:
+                    log.warning(
+                        "Will not purchase %s, because its price could not be determined" % buy_ticker)
+                    continue
 
                 shares = int(trade_dollar_amount / latest_price)
 
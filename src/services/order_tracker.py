@@ -0,0 +1,158 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module tracks orders placed with TDAmeritrade until they complete.
+
+Orders are polled individually, starting with a short interval that grows
+exponentially up to a maximum, so that market orders filling within seconds
+are detected right away while slow fills are tracked until a deadline.
+Orders placed without an order id (see td_ameritrade.is_order_id()) cannot
+be polled, and are reported as pending right away.
+Time is measured through a clock object, which can be replaced in tests
+so that tracking does not require real sleeps.
+
+Every polling round is recorded as an 'order_tracker.poll' timing span.
+"""
+import logging
+from connectors import td_ameritrade
+from exception.exceptions import ValidationError, TradeError
+from support import timing
+from support.util import SystemClock
+
+log = logging.getLogger()
+
+# default polling schedule, in seconds
+ORDER_POLL_INITIAL_INTERVAL = 2
+ORDER_POLL_BACKOFF_FACTOR = 2
+ORDER_POLL_MAX_INTERVAL = 60
+ORDER_TRACKING_DEADLINE = 600
+
+
+class OrderTracker():
+    """
+        Waits for a set of orders to complete, polling the status of each
+        order with an exponential backoff until a deadline is reached.
+    """
+
+    def __init__(self, **kwargs):
+        '''
+            Initializes the tracker
+
+            Parameters
+            ----------
+            initial_interval : float (kwargs)
+                (optional) seconds between the first two polls
+            backoff_factor : float (kwargs)
+                (optional) the factor by which the interval grows after each poll
+            max_interval : float (kwargs)
+                (optional) the maximum number of seconds between polls
+            deadline : float (kwargs)
+                (optional) the number of seconds after which tracking stops
+            clock : object (kwargs)
+                (optional) an object exposing time() and sleep(seconds).
+                Defaults to the SystemClock
+        '''
+        try:
+            self.initial_interval = kwargs['initial_interval']
+        except KeyError:
+            self.initial_interval = ORDER_POLL_INITIAL_INTERVAL
+
+        try:
+            self.backoff_factor = kwargs['backoff_factor']
+        except KeyError:
+            self.backoff_factor = ORDER_POLL_BACKOFF_FACTOR
+
+        try:
+            self.max_interval = kwargs['max_interval']
+        except KeyError:
+            self.max_interval = ORDER_POLL_MAX_INTERVAL
+
+        try:
+            self.deadline = kwargs['deadline']
+        except KeyError:
+            self.deadline = ORDER_TRACKING_DEADLINE
+
+        try:
+            self.clock = kwargs['clock']
+        except KeyError:
+            self.clock = SystemClock()
+
+        if self.initial_interval <= 0 or self.max_interval <= 0:
+            raise ValidationError("Polling intervals must be positive", None)
+
+        if self.backoff_factor < 1:
+            raise ValidationError("Backoff factor must be at least 1", None)
+
+        if self.deadline < 0:
+            raise ValidationError("Deadline cannot be negative", None)
+
+    @timing.timed()
+    def wait_for_orders(self, order_ids: list):
+        '''
+            Polls the status of the supplied orders until they are all completed
+            or the deadline is reached. Orders whose status cannot be read
+            are retried on the next poll, while orders that are only known by
+            their tag are never polled.
+
+            Parameters
+            ----------
+            order_ids : list
+                list of order ids returned by td_ameritrade.place_order()
+
+            Returns
+            -------
+            A tuple (completed_orders, pending_order_ids), where completed_orders
+            is a dictionary of order_id => order summary (see td_ameritrade.get_order())
+            and pending_order_ids is the list of orders that did not complete
+            before the deadline, or that could not be tracked
+        '''
+        completed_orders = {}
+        pending_order_ids = []
+        untracked_order_ids = []
+
+        for order_id in order_ids:
+            if td_ameritrade.is_order_id(order_id):
+                pending_order_ids.append(order_id)
+            else:
+                log.warning("Order %s has no order id and cannot be tracked" %
+                            order_id)
+                untracked_order_ids.append(order_id)
+
+        deadline_time = self.clock.time() + self.deadline
+        interval = self.initial_interval
+
+        while True:
+            with timing.span('order_tracker.poll'):
+                for order_id in list(pending_order_ids):
+                    try:
+                        order = td_ameritrade.get_order(order_id)
+                    except TradeError as te:
+                        log.warning("Could not read the status of order %s, because: %s" %
+                                    (order_id, str(te)))
+                        continue
+
+                    log.debug("Order %s is in %s state" %
+                              (order_id, order['status']))
+                    if order['closeTime'] is None:
+                        continue
+
+                    completed_orders[order_id] = order
+                    pending_order_ids.remove(order_id)
+
+            if len(pending_order_ids) == 0:
+                log.info("All orders are closed.")
+                break
+
+            remaining = deadline_time - self.clock.time()
+            if remaining <= 0:
+                log.info("%d order(s) did not complete before the deadline" %
+                         len(pending_order_ids))
+                break
+
+            sleep_seconds = min(interval, remaining)
+            log.info("%d order(s) are still being processed. Sleeping for %.1f seconds" %
+                     (len(pending_order_ids), sleep_seconds))
+            self.clock.sleep(sleep_seconds)
+
+            interval = min(interval * self.backoff_factor, self.max_interval)
+
+        return (completed_orders, pending_order_ids + untracked_order_ids)
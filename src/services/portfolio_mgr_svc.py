@@ -5,12 +5,12 @@ import random
 import dateutil.parser as parser
 from tzlocal import get_localzone
 from datetime import datetime
-from connectors import aws_service_wrapper
+from connectors import aws_service_wrapper, td_ameritrade
 from exception.exceptions import ValidationError, AWSError
 from model.portfolio import Portfolio
 from model.recommendation_set import SecurityRecommendationSet
 from connectors import aws_service_wrapper
-from support import util, constants
+from support import util, constants, timing
 
 log = logging.getLogger()
 
@@ -126,6 +126,53 @@ def update_portfolio(current_portfolio: object, recommendation_set: object, port
     return (updated_portfolio, updated)
 
 
+@timing.timed()
+def trade_portfolio(updated_portfolio: object, broker: object):
+    '''
+        Executes the trades required to materialize the supplied portfolio,
+        and synchronizes it with the brokerage account positions afterwards.
+        Nothing is traded when the market is closed.
+
+        Parameters
+        ----------
+        updated_portfolio : Portfolio
+            the portfolio returned by update_portfolio()
+        broker : Broker
+            the Broker object used to place trades
+
+        Returns
+        -------
+        True if the market was open, False otherwise
+    '''
+    market_open = td_ameritrade.equity_market_open(datetime.now())
+
+    if market_open != True:
+        log.info("Market is closed. Nothing to trade")
+        return False
+
+    broker.cancel_all_open_orders()
+
+    log.info("Market is open. Looking for trading opportunities")
+    current_positions = td_ameritrade.positions_summary()
+
+    try:
+        if broker.reconcile_portfolio(current_positions, updated_portfolio) == False:
+            log.info(
+                "Portfolio is not in sync with brokerage account positions. Positions will be rebalanced")
+
+        broker.materialize_portfolio(
+            current_positions, updated_portfolio)
+    finally:
+        updated_positions = td_ameritrade.positions_summary()
+        broker.synchronize_portfolio(
+            updated_positions, updated_portfolio)
+
+        updated_portfolio.recalc_returns()
+        broker.cancel_all_open_orders()
+
+    return True
+
+
 def publish_current_returns(updated_portfolio: object, updated: bool, app_ns: str):
     '''
         publishes current returns as a SNS notifcation, given an updated portfolio
@@ -0,0 +1,177 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains supporting logic for the prefetch_financial_data script,
+which populates the financial cache and price store ahead of a run.
+It exists solely so that the code may be tested. otherwise it would
+be organized along with the script itself.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from connectors import intrinio_data, intrinio_util
+from exception.exceptions import BaseError, ValidationError
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+
+log = logging.getLogger()
+
+# HTTP status code returned by Intrinio when the API limits are exceeded
+RATE_LIMITED_STATUS = intrinio_data.INTRINIO_RATE_LIMITED_STATUS
+
+
+class PrefetchStats():
+    """
+        Thread safe counters describing the outcome of a prefetch run.
+        Every item is counted once, either as a hit or as a miss, and every
+        miss is either fetched, throttled or an error, so that
+
+            misses = fetched + throttled + errors
+
+        Attributes
+        ----------
+        hits : int
+            items that were already present in the cache
+        misses : int
+            items that were not present in the cache
+        fetched : int
+            items that were successfully fetched from Intrinio
+        errors : int
+            items that could not be fetched, for reasons other than rate limiting
+        throttled : int
+            items that could not be fetched because requests were still
+            rate limited after the retries made by intrinio_data
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.errors = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def increment(self, counter: str):
+        '''
+            Increments the supplied counter
+        '''
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def to_dict(self):
+        '''
+            returns the counters as a dictionary
+        '''
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'fetched': self.fetched,
+            'errors': self.errors,
+            'throttled': self.throttled
+        }
+
+
+def is_rate_limited(error: BaseError):
+    '''
+        Returns true if the error was caused by an Intrinio rate limit response
+    '''
+    return getattr(error.cause, 'status', None) == RATE_LIMITED_STATUS
+
+
+def fetch(stats: PrefetchStats, func: object, *args):
+    '''
+        Calls the supplied Intrinio data function. Rate limited requests
+        are already retried by intrinio_data, so failures are not retried
+        here. Failures are counted as throttled if the requests were still
+        rate limited, and as errors otherwise.
+
+        Returns
+        -------
+        True if the data was fetched, False otherwise
+    '''
+    try:
+        func(*args)
+        stats.increment('fetched')
+        return True
+    except BaseError as be:
+        log.debug("Could not prefetch %s, because: %s" %
+                  (str(args), str(be)))
+        if is_rate_limited(be):
+            stats.increment('throttled')
+        else:
+            stats.increment('errors')
+        return False
+
+
+def prefetch_ticker(ticker: str, periods: list, stats: PrefetchStats):
+    '''
+        Populates the target price estimates for every period, and the daily prices
+        for the whole range of the supplied periods for a single ticker.
+        Date ranges match the ones used by the PriceDispersionStrategy, so that
+        subsequent runs are served entirely from the cache.
+    '''
+    now = datetime.now()
+
+    for (year, month) in periods:
+        (start_date, end_date) = intrinio_util.get_month_date_range(year, month)
+        end_date = min(end_date, now)
+
+        if intrinio_data.is_company_historical_data_multi_cached(
+                ticker, start_date, end_date, PriceDispersionStrategy.TARGET_PRICE_TAGS):
+            stats.increment('hits')
+            continue
+
+        stats.increment('misses')
+        fetch(stats, intrinio_data.get_company_historical_data_multi,
+              ticker, start_date, end_date, PriceDispersionStrategy.TARGET_PRICE_TAGS)
+
+    (first_year, first_month) = periods[0]
+    price_start_date = intrinio_util.get_month_date_range(
+        first_year, first_month)[0] - timedelta(days=10)
+
+    if intrinio_data.is_daily_stock_close_prices_cached(ticker, price_start_date, now - timedelta(days=1)):
+        stats.increment('hits')
+        return
+
+    stats.increment('misses')
+    fetch(stats, intrinio_data.get_daily_stock_close_prices,
+          ticker, price_start_date, now)
+
+
+def prefetch(ticker_list: list, periods: list, max_workers: int):
+    '''
+        Populates the financial cache and price store for all the supplied
+        tickers and periods using a pool of 'max_workers' threads.
+
+        Parameters
+        ----------
+        ticker_list : list
+            list of tickers
+        periods : list
+            list of (year, month) tuples
+        max_workers : int
+            number of concurrent requests
+
+        Returns
+        -------
+        A PrefetchStats object with the outcome of the run
+    '''
+    if ticker_list is None or len(ticker_list) == 0:
+        raise ValidationError("No ticker list was supplied", None)
+
+    if periods is None or len(periods) == 0:
+        raise ValidationError("At least one period must be supplied", None)
+
+    if max_workers <= 0:
+        raise ValidationError("Max workers must be at least 1", None)
+
+    stats = PrefetchStats()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(prefetch_ticker, ticker, periods, stats)
+                   for ticker in ticker_list]
+
+        # re-raise any unexpected error
+        for future in futures:
+            future.result()
+
+    return stats
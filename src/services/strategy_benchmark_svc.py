@@ -0,0 +1,146 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains supporting logic for the strategy_benchmark script,
+which measures the latency of the PriceDispersionStrategy against the
+local Intrinio simulator. It exists solely so that the code may be
+tested. otherwise it would be organized along with the script itself.
+
+For every number of workers, the strategy is executed twice against an
+empty cache and price store: once cold, reading all data from the simulator,
+and once warm, reading it from the cache.
+"""
+import logging
+import math
+import tempfile
+import time
+from contextlib import contextmanager
+from connectors import intrinio_data
+from exception.exceptions import ValidationError
+from simulator.intrinio_simulator import IntrinioSimulator
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+from support.financial_cache import FinancialCache
+from support.price_store import PriceStore
+from support.rate_limiter import RateLimiter
+
+log = logging.getLogger()
+
+
+def synthetic_ticker_list(universe_size: int):
+    '''
+        Returns a list of 'universe_size' synthetic ticker symbols,
+        e.g. ['SYN0000', 'SYN0001', ...]
+    '''
+    return ["SYN%04d" % i for i in range(0, universe_size)]
+
+
+@contextmanager
+def local_intrinio(fixtures: object, **simulator_args):
+    '''
+        Starts an IntrinioSimulator serving the supplied fixtures, and points
+        the intrinio_data connector to it, using an empty temporary cache and
+        price store. Requests are not rate limited, since the limits of the
+        Intrinio API do not apply to the simulator. The connector settings
+        are restored on exit.
+    '''
+    original_url = intrinio_data.INTRINIO_API_URL
+    original_cache = intrinio_data.cache
+    original_price_store = intrinio_data.price_store
+    original_rate_limiter = intrinio_data.rate_limiter
+
+    with IntrinioSimulator(fixtures, **simulator_args) as simulator, \
+            tempfile.TemporaryDirectory() as data_dir:
+        intrinio_data.set_api_url(simulator.url)
+        intrinio_data.cache = FinancialCache("%s/cache" % data_dir)
+        intrinio_data.price_store = PriceStore("%s/prices" % data_dir)
+        intrinio_data.rate_limiter = RateLimiter(math.inf)
+
+        try:
+            yield simulator
+        finally:
+            intrinio_data.cache.disk_cache.close()
+            intrinio_data.set_api_url(original_url)
+            intrinio_data.cache = original_cache
+            intrinio_data.price_store = original_price_store
+            intrinio_data.rate_limiter = original_rate_limiter
+
+
+def strategy_run(simulator: object, ticker_list: list, year: int, month: int, output_size: int, max_workers: int):
+    '''
+        Executes PriceDispersionStrategy.generate_recommendation() once
+        against a running simulator, using whatever cache is currently
+        configured in the intrinio_data connector
+
+        Returns
+        -------
+        A dictionary with the outcome of the run, e.g.
+        {
+            'elapsed_seconds': 1.5,
+            'requests': 60,
+            'throttled_requests': 0,
+            'recommended': 3
+        }
+    '''
+    request_count = simulator.request_count
+    throttled_requests = intrinio_data.rate_limiter.stats()['throttled_requests']
+
+    strategy = PriceDispersionStrategy(
+        ticker_list, year, month, output_size, max_workers=max_workers)
+
+    start = time.perf_counter()
+    strategy.generate_recommendation()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'elapsed_seconds': elapsed,
+        'requests': simulator.request_count - request_count,
+        'throttled_requests': intrinio_data.rate_limiter.stats()['throttled_requests'] - throttled_requests,
+        'recommended': len(strategy.recommendation_set.model['securities_set'])
+    }
+
+
+def run_benchmark(fixtures: object, ticker_list: list, year: int, month: int,
+                  output_size: int, max_workers_list: list, **simulator_args):
+    '''
+        Executes a cold and a warm cache run of the PriceDispersionStrategy
+        for every number of workers in 'max_workers_list'
+
+        Parameters
+        ----------
+        fixtures : object
+            the simulator fixture source. See simulator.intrinio_simulator
+        ticker_list : list
+            the tickers analyzed by the strategy
+        year : int
+            analysis year
+        month : int
+            analysis month
+        output_size : int
+            number of recommended securities
+        max_workers_list : list
+            list of worker pool sizes to benchmark
+        simulator_args : kwargs
+            latency supplied to the IntrinioSimulator
+
+        Returns
+        -------
+        A list of run results (see strategy_run()), each one including
+        the 'max_workers' and the 'cache' state ('cold' or 'warm')
+    '''
+    if max_workers_list is None or len(max_workers_list) == 0:
+        raise ValidationError("No worker pool sizes were supplied", None)
+
+    results = []
+
+    for max_workers in max_workers_list:
+        with local_intrinio(fixtures, **simulator_args) as simulator:
+            for cache_state in ['cold', 'warm']:
+                log.info("Benchmarking %d worker(s), %s cache" %
+                         (max_workers, cache_state))
+
+                result = strategy_run(
+                    simulator, ticker_list, year, month, output_size, max_workers)
+                result['max_workers'] = max_workers
+                result['cache'] = cache_state
+                results.append(result)
+
+    return results
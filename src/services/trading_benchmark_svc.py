@@ -0,0 +1,196 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module contains supporting logic for the trading_benchmark script,
+which measures the latency of the portfolio manager trading path against
+the local TDAmeritrade simulator. It exists solely so that the code may be
+tested. otherwise it would be organized along with the script itself.
+
+Each run starts a simulator whose account holds 'portfolio_size' positions
+that are not part of a new, unfilled portfolio of the same size, so that
+a run unwinds every existing position and buys every new one.
+"""
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from connectors import td_ameritrade
+from exception.exceptions import ValidationError
+from model.portfolio import Portfolio
+from services import portfolio_mgr_svc
+from services.broker import Broker
+from services.order_tracker import OrderTracker
+from simulator.td_ameritrade_simulator import TDAmeritradeSimulator, SIMULATOR_ACCOUNT_ID
+from support import util
+
+log = logging.getLogger()
+
+
+def create_portfolio(ticker_list: list, prices: dict):
+    '''
+        Creates a new portfolio made of the supplied tickers, none of
+        which are owned yet
+    '''
+    now = util.date_to_iso_utc_string(datetime.now())
+
+    return Portfolio.from_dict({
+        "portfolio_id": str(uuid.uuid1()),
+        "set_id": str(uuid.uuid1()),
+        "creation_date": now,
+        "price_date": now,
+        "securities_set": [{
+            "ticker_symbol": ticker,
+            "analysis_price": prices[ticker],
+            "current_price": prices[ticker],
+            "current_returns": 0
+        } for ticker in ticker_list],
+        "current_portfolio": {
+            "securities": [{
+                "ticker_symbol": ticker,
+                "quantity": 0,
+                "purchase_date": None,
+                "purchase_price": 0,
+                "current_price": prices[ticker],
+                "current_returns": 0,
+                "trade_state": "UNFILLED",
+                "order_id": None
+            } for ticker in ticker_list]
+        }
+    })
+
+
+@contextmanager
+def local_td_ameritrade(simulator: object):
+    '''
+        Starts the supplied TDAmeritradeSimulator and points the td_ameritrade
+        connector to it, using the simulator's credentials. The connector
+        settings and the environment are restored on exit.
+    '''
+    environment = {
+        'TDAMERITRADE_ACCOUNT_ID': SIMULATOR_ACCOUNT_ID,
+        'TDAMERITRADE_CLIENT_ID': 'simulator',
+        'TDAMERITRADE_REFRESH_TOKEN': 'simulator',
+        'TDAMERITRADE_TOKEN_FILE': None
+    }
+    original_environment = {name: os.environ.get(name)
+                            for name in environment.keys()}
+    original_url = td_ameritrade.TD_API_URL
+
+    with simulator:
+        _set_environment(environment)
+        td_ameritrade.TD_API_URL = simulator.url
+        td_ameritrade.set_access_token("", 0)
+        td_ameritrade.create_session()
+
+        try:
+            yield simulator
+        finally:
+            _set_environment(original_environment)
+            td_ameritrade.TD_API_URL = original_url
+            td_ameritrade.set_access_token("", 0)
+            td_ameritrade.create_session()
+
+
+def benchmark_run(portfolio_size: int, poll_interval: float, **simulator_args):
+    '''
+        Executes portfolio_mgr_svc.trade_portfolio() once against a new simulator
+
+        Parameters
+        ----------
+        portfolio_size : int
+            number of positions that are sold, and bought
+        poll_interval : float
+            initial interval used to poll for order completion
+        simulator_args : kwargs
+            latency, fill_delay, rejection_rate and seed supplied
+            to the TDAmeritradeSimulator
+
+        Returns
+        -------
+        A dictionary with the outcome of the run, e.g.
+        {
+            'elapsed_seconds': 1.5,
+            'requests': 40,
+            'filled': 10,
+            'unfilled': 0
+        }
+    '''
+    rand = random.Random(simulator_args.get('seed'))
+
+    old_tickers = ["OLD%d" % i for i in range(0, portfolio_size)]
+    new_tickers = ["NEW%d" % i for i in range(0, portfolio_size)]
+    prices = {ticker: round(rand.uniform(10, 500), 2)
+              for ticker in old_tickers + new_tickers}
+
+    simulator = TDAmeritradeSimulator(
+        prices=prices,
+        positions={ticker: 10 for ticker in old_tickers},
+        cash=10000 * portfolio_size,
+        **simulator_args
+    )
+    portfolio = create_portfolio(new_tickers, prices)
+
+    with local_td_ameritrade(simulator):
+        broker = Broker(OrderTracker(initial_interval=poll_interval))
+
+        start = time.perf_counter()
+        portfolio_mgr_svc.trade_portfolio(portfolio, broker)
+        elapsed = time.perf_counter() - start
+
+    trade_states = [sec['trade_state']
+                    for sec in portfolio.model['current_portfolio']['securities']]
+
+    return {
+        'elapsed_seconds': elapsed,
+        'requests': simulator.request_count,
+        'filled': trade_states.count('FILLED'),
+        'unfilled': len(trade_states) - trade_states.count('FILLED')
+    }
+
+
+def run_benchmark(portfolio_size: int, runs: int, poll_interval: float, **simulator_args):
+    '''
+        Executes 'runs' benchmark runs and summarizes them.
+        See benchmark_run() for a description of the parameters
+
+        Returns
+        -------
+        A tuple containing the list of run results, and a summary dictionary
+    '''
+    if portfolio_size <= 0:
+        raise ValidationError("Portfolio size must be a positive number", None)
+
+    if runs <= 0:
+        raise ValidationError("Runs must be a positive number", None)
+
+    results = []
+    for i in range(0, runs):
+        log.info("Benchmark run %d of %d" % (i + 1, runs))
+        results.append(benchmark_run(
+            portfolio_size, poll_interval, **simulator_args))
+
+    elapsed = [r['elapsed_seconds'] for r in results]
+    summary = {
+        'runs': runs,
+        'portfolio_size': portfolio_size,
+        'min_seconds': min(elapsed),
+        'mean_seconds': sum(elapsed) / runs,
+        'max_seconds': max(elapsed),
+        'mean_requests': sum(r['requests'] for r in results) / runs,
+        'mean_unfilled': sum(r['unfilled'] for r in results) / runs
+    }
+
+    return (results, summary)
+
+
+def _set_environment(environment: dict):
+    '''
+        Sets the supplied environment variables. 'None' values are removed
+    '''
+    for (name, value) in environment.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
@@ -0,0 +1,172 @@
+"""Author: Mark Hanegraaff -- 2020
+
+Base class of the local HTTP stand-ins for the APIs used by this
+software. A simulator serves JSON responses from a background thread
+on a random local port, and delays every response by a configurable latency.
+
+Subclasses implement handle(), which receives a parsed request and
+returns a tuple of (status, headers, body).
+"""
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from exception.exceptions import ValidationError
+
+log = logging.getLogger()
+
+
+class HttpSimulator(ABC):
+    """
+        A local HTTP server simulating a remote API
+
+        Attributes
+        ----------
+        base_path : str
+            path prefix of all API requests, e.g. '/v1'
+    """
+
+    base_path = ''
+
+    def __init__(self, latency: float):
+        '''
+            Initializes the simulator
+
+            Parameters
+            ----------
+            latency : float
+                seconds added to every response
+        '''
+        if latency < 0:
+            raise ValidationError("Latency cannot be negative", None)
+
+        self.latency = latency
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        '''
+            The base URL of the simulated APIs, e.g. http://127.0.0.1:5000/v1
+        '''
+        if self.server is None:
+            raise ValidationError("Simulator is not running", None)
+
+        return "http://%s:%d%s" % (self.server.server_address + (self.base_path,))
+
+    def start(self):
+        '''
+            Starts serving requests on a random local port, in a background thread
+        '''
+        class Handler(SimulatorRequestHandler):
+            pass
+        Handler.simulator = self
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+        # a short poll interval lets stop() return quickly
+        threading.Thread(target=self.server.serve_forever,
+                         kwargs={'poll_interval': 0.05}, daemon=True).start()
+
+        log.debug("%s listening on %s" % (type(self).__name__, self.url))
+        return self
+
+    def stop(self):
+        '''
+            Stops the server
+        '''
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @abstractmethod
+    def handle(self, method: str, path: list, query: dict, headers: object, body: bytes):
+        '''
+            Handles a single request
+
+            Parameters
+            ----------
+            method : str
+                the HTTP method, e.g. GET
+            path : list
+                the components of the request path following the base path,
+                e.g. ['accounts', '123', 'orders']
+            query : dict
+                the query string parameters, as returned by urllib.parse.parse_qs
+            headers : object
+                the request headers
+            body : bytes
+                the request body
+
+            Returns
+            -------
+            A tuple of (status, headers, body), where body is serialized as JSON
+            unless it is None
+        '''
+        pass
+
+
+class SimulatorRequestHandler(BaseHTTPRequestHandler):
+    """
+        Routes HTTP requests to an HttpSimulator
+    """
+
+    simulator = None
+
+    # keep connections alive, like the real APIs
+    protocol_version = 'HTTP/1.1'
+
+    # headers and body are written separately, so do not delay small writes
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format: str, *args):
+        log.debug("%s: %s" % (type(self.simulator).__name__, format % args))
+
+    def _handle(self, method: str):
+        simulator = self.simulator
+
+        # the body is always read, so that the connection can be reused
+        request_body = self.rfile.read(
+            int(self.headers.get('Content-Length', 0)))
+
+        time.sleep(simulator.latency)
+
+        url = urlparse(self.path)
+        path = url.path[len(simulator.base_path):].strip('/').split('/')
+
+        with simulator.lock:
+            simulator.request_count += 1
+
+        (status, headers, body) = simulator.handle(
+            method, path, parse_qs(url.query), self.headers, request_body)
+
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+
+        self.send_response(status)
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
@@ -0,0 +1,418 @@
+"""Author: Mark Hanegraaff -- 2020
+
+A local HTTP stand-in for the Intrinio APIs used by the intrinio_data
+connector. It is used to benchmark the recommendation path
+(e.g. the PriceDispersionStrategy) without network access or API limits.
+
+The simulator supports:
+
+    GET /companies/{TICKER}
+    GET /companies/{TICKER}/historical_data/{TAG}
+    GET /companies/{TICKER}/data_point/{TAG}/number
+    GET /fundamentals/{ID}/standardized_financials
+    GET /securities/{TICKER}/prices
+
+and serves data from a fixture source, which is either:
+
+1) RecordedFixtures: data recorded from Intrinio (see record_fixtures())
+   and stored as one JSON file per ticker, like this:
+
+    {
+        "historical_data": {
+            "zacks_target_price_mean": [{"date": "2019-10-01", "value": 120.5}]
+        },
+        "prices": [{"date": "2019-10-01", "close": 100.0}],
+        "data_points": {"marketcap": 1000000000.0},
+        "financials": {
+            "income_statement-2019-FY": {"totalrevenue": 100000.0}
+        }
+    }
+
+2) SyntheticFixtures: deterministic data generated on demand for any ticker,
+   used to simulate large universes.
+
+The frequency of historical data requests is ignored, and all values
+within the requested date range are returned.
+
+The simulator may also enforce a rate limit, rejecting the requests that
+exceed it with a 429 (Too Many Requests) response and a Retry-After header,
+like the Intrinio APIs do.
+"""
+import json
+import logging
+import math
+import os
+import random
+import time
+from datetime import date, timedelta
+from connectors import intrinio_util
+from exception.exceptions import BaseError, ValidationError, FileSystemError
+from simulator.http_simulator import HttpSimulator
+from support import util
+
+log = logging.getLogger()
+
+
+class IntrinioSimulator(HttpSimulator):
+    """
+        A local simulation of the Intrinio APIs, backed by a fixture source
+    """
+
+    def __init__(self, fixtures: object, **kwargs):
+        '''
+            Initializes the simulator
+
+            Parameters
+            ----------
+            fixtures : object
+                the fixture source. Either a RecordedFixtures or a SyntheticFixtures object
+            latency : float (kwargs)
+                (optional) seconds added to every response. Defaults to 0
+            requests_per_second : int (kwargs)
+                (optional) the number of requests accepted every second.
+                Defaults to no limit
+        '''
+        try:
+            latency = kwargs['latency']
+        except KeyError:
+            latency = 0
+
+        try:
+            requests_per_second = kwargs['requests_per_second']
+        except KeyError:
+            requests_per_second = None
+
+        super().__init__(latency)
+
+        if fixtures is None:
+            raise ValidationError("No fixtures were supplied", None)
+
+        if requests_per_second is not None and requests_per_second < 1:
+            raise ValidationError(
+                "Requests per second must be at least 1", None)
+
+        self.fixtures = fixtures
+        self.requests_per_second = requests_per_second
+        self.rate_limited_count = 0
+
+        # start and number of requests of the current one second window
+        self.window_start = 0
+        self.window_count = 0
+
+    def rate_limited(self):
+        '''
+            Returns true if the current request exceeds the rate limit
+        '''
+        if self.requests_per_second is None:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+
+            self.window_count += 1
+            if self.window_count <= self.requests_per_second:
+                return False
+
+            self.rate_limited_count += 1
+            return True
+
+    def handle(self, method: str, path: list, query: dict, headers: object, body: bytes):
+        '''
+            Authenticates and routes a request. See HttpSimulator.handle()
+        '''
+        def param(name: str, default: str = None):
+            return query.get(name, [default])[0]
+
+        if param('api_key') is None and headers.get('X-Authorization-Public-Key') is None:
+            return (401, {}, {'error': 'Unauthorized', 'message': 'An API key is required'})
+
+        if method != 'GET':
+            return not_found()
+
+        if self.rate_limited():
+            return (429, {'Retry-After': '1'}, {'error': 'Too Many Requests', 'message': 'API limits exceeded'})
+
+        if len(path) == 2 and path[0] == 'companies':
+            return (200, {}, {'ticker': path[1], 'name': path[1]})
+
+        if len(path) == 4 and path[0] == 'companies' and path[2] == 'historical_data':
+            historical_data = self.fixtures.historical_data(
+                path[1], path[3], param('start_date', '0000-00-00'), param('end_date', '9999-99-99'))
+            if historical_data is None:
+                return not_found()
+
+            return (200, {}, {
+                'historical_data': historical_data,
+                'company': {'ticker': path[1]},
+                'next_page': None
+            })
+
+        if len(path) == 5 and path[0] == 'companies' and path[2] == 'data_point' and path[4] == 'number':
+            value = self.fixtures.data_point(path[1], path[3])
+            return not_found() if value is None else (200, {}, value)
+
+        if len(path) == 3 and path[0] == 'fundamentals' and path[2] == 'standardized_financials':
+            financials = self.fixtures.standardized_financials(path[1])
+            if financials is None:
+                return not_found()
+
+            return (200, {}, {
+                'standardized_financials': [{
+                    'data_tag': {'tag': tag},
+                    'value': value
+                } for (tag, value) in financials.items()],
+                'fundamental': {'id': path[1]},
+                'next_page': None
+            })
+
+        if len(path) == 3 and path[0] == 'securities' and path[2] == 'prices':
+            stock_prices = self.fixtures.stock_prices(
+                path[1], param('start_date', '0000-00-00'), param('end_date', '9999-99-99'))
+            if stock_prices is None:
+                return not_found()
+
+            page_size = int(param('page_size', '100'))
+            offset = int(param('next_page', '0') or '0')
+            next_offset = offset + page_size
+
+            return (200, {}, {
+                'stock_prices': stock_prices[offset:next_offset],
+                'security': {'ticker': path[1]},
+                'next_page': str(next_offset) if next_offset < len(stock_prices) else None
+            })
+
+        return not_found()
+
+
+class RecordedFixtures():
+    """
+        A fixture source serving data recorded from Intrinio
+    """
+
+    def __init__(self, fixtures: dict):
+        '''
+            Parameters
+            ----------
+            fixtures : dict
+                a dictionary of ticker => fixture. See the module documentation
+        '''
+        self.fixtures = fixtures
+
+    @property
+    def ticker_list(self):
+        '''
+            The sorted list of tickers with recorded data
+        '''
+        return sorted(self.fixtures.keys())
+
+    def historical_data(self, ticker: str, tag: str, start_date: str, end_date: str):
+        try:
+            values = self.fixtures[ticker]['historical_data'][tag]
+        except KeyError:
+            return None
+
+        return _newest_first(values, start_date, end_date)
+
+    def stock_prices(self, ticker: str, start_date: str, end_date: str):
+        try:
+            values = self.fixtures[ticker]['prices']
+        except KeyError:
+            return None
+
+        return _newest_first(values, start_date, end_date)
+
+    def data_point(self, ticker: str, tag: str):
+        try:
+            return self.fixtures[ticker]['data_points'][tag]
+        except KeyError:
+            return None
+
+    def standardized_financials(self, statement_id: str):
+        '''
+            Returns the financials of statement ids like 'AAPL-income_statement-2019-FY'
+        '''
+        (ticker, statement) = statement_id.split('-', 1)
+        try:
+            return self.fixtures[ticker]['financials'][statement]
+        except KeyError:
+            return None
+
+
+class SyntheticFixtures():
+    """
+        A fixture source generating deterministic data for any ticker. Prices
+        follow a smooth cycle around a per ticker base price, and target price
+        estimates are spread around them, so that the dispersion of the
+        estimates varies across tickers.
+    """
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def _ticker_profile(self, ticker: str):
+        '''
+            returns the (base_price, phase, upside, dispersion) of a ticker
+        '''
+        rand = random.Random("%s-%s" % (self.seed, ticker))
+        return (rand.uniform(10, 500), rand.uniform(0, 2 * math.pi),
+                rand.uniform(-0.1, 0.4), rand.uniform(0.01, 0.3))
+
+    def _close(self, ticker: str, day: date):
+        (base_price, phase, _, _) = self._ticker_profile(ticker)
+        ordinal = day.toordinal()
+        return round(base_price * (1 + 0.2 * math.sin(ordinal / 40 + phase) +
+                                   0.01 * math.sin(ordinal * 1.7 + phase)), 2)
+
+    def historical_data(self, ticker: str, tag: str, start_date: str, end_date: str):
+        (_, phase, upside, dispersion) = self._ticker_profile(ticker)
+        magnitude = self.data_point(ticker, tag)
+
+        values = []
+        for day in _business_days(start_date, end_date):
+            close = self._close(ticker, day)
+            if tag == 'zacks_target_price_mean':
+                value = close * (1 + upside)
+            elif tag == 'zacks_target_price_std_dev':
+                value = close * dispersion * \
+                    (1 + 0.5 * math.sin(day.toordinal() / 25 + phase))
+            else:
+                value = magnitude * (1 + 0.1 * math.sin(day.toordinal() / 90))
+            values.append({'date': day.isoformat(), 'value': round(value, 2)})
+
+        return values
+
+    def stock_prices(self, ticker: str, start_date: str, end_date: str):
+        return [{'date': day.isoformat(), 'close': self._close(ticker, day)}
+                for day in _business_days(start_date, end_date)]
+
+    def data_point(self, ticker: str, tag: str):
+        return round(random.Random("%s-%s-%s" % (self.seed, ticker, tag)).uniform(1, 1e9), 2)
+
+    def standardized_financials(self, statement_id: str):
+        rand = random.Random("%s-%s" % (self.seed, statement_id))
+        return {tag: round(rand.uniform(1e6, 1e9), 2)
+                for tag in ['totalrevenue', 'netincome', 'netcashfromcontinuingoperatingactivities',
+                            'purchaseofplantpropertyandequipment', 'freecashflow']}
+
+
+def load_fixtures(path: str):
+    '''
+        Loads the recorded fixtures from a directory containing
+        one {TICKER}.json file per ticker
+
+        Returns
+        -------
+        A RecordedFixtures object
+    '''
+    fixtures = {}
+
+    try:
+        for file_name in sorted(os.listdir(path)):
+            if not file_name.endswith('.json'):
+                continue
+            with open(os.path.join(path, file_name)) as file:
+                fixtures[file_name[:-len('.json')]] = json.load(file)
+    except Exception as e:
+        raise FileSystemError("Could not load fixtures from %s" % path, e)
+
+    return RecordedFixtures(fixtures)
+
+
+def save_fixtures(path: str, fixtures: dict):
+    '''
+        Saves a dictionary of ticker => fixture to a directory,
+        as one {TICKER}.json file per ticker
+    '''
+    util.create_dir(path)
+
+    try:
+        for (ticker, fixture) in fixtures.items():
+            with open(os.path.join(path, "%s.json" % ticker), 'w') as file:
+                json.dump(fixture, file, indent=1)
+    except Exception as e:
+        raise FileSystemError("Could not save fixtures to %s" % path, e)
+
+
+def record_fixtures(ticker_list: list, start_date: date, end_date: date, tags: list):
+    '''
+        Records the historical data for the supplied tags and the daily prices
+        of every ticker from Intrinio, bypassing the cache.
+        Tickers, or tags, whose data cannot be read are skipped.
+
+        Returns
+        -------
+        A dictionary of ticker => fixture
+    '''
+    # imported here so that the simulator can be used without an Intrinio API key
+    from connectors import intrinio_data
+
+    start_date_str = intrinio_util.date_to_string(start_date)
+    end_date_str = intrinio_util.date_to_string(end_date)
+
+    fixtures = {}
+    for ticker in ticker_list:
+        fixture = {
+            'historical_data': {},
+            'prices': [],
+            'data_points': {},
+            'financials': {}
+        }
+
+        for tag in tags:
+            try:
+                historical_data = intrinio_data._decode_historical_data(
+                    intrinio_data._read_company_historical_data(ticker, start_date_str, end_date_str, 'daily', tag))
+            except BaseError as be:
+                log.warning("Could not record %s/%s, because: %s" %
+                            (ticker, tag, str(be)))
+                continue
+
+            fixture['historical_data'][tag] = [{
+                'date': intrinio_util.date_to_string(data_point['date']),
+                'value': data_point['value']
+            } for data_point in historical_data]
+
+        try:
+            price_dict = intrinio_data._read_daily_stock_close_prices(
+                ticker, start_date_str, end_date_str)
+            fixture['prices'] = [{'date': price_date, 'close': close}
+                                 for (price_date, close) in sorted(price_dict.items())]
+        except BaseError as be:
+            log.warning("Could not record %s prices, because: %s" %
+                        (ticker, str(be)))
+
+        fixtures[ticker] = fixture
+
+    return fixtures
+
+
+def not_found():
+    return (404, {}, {'error': 'Not Found', 'message': 'The requested data could not be found'})
+
+
+def _newest_first(values: list, start_date: str, end_date: str):
+    '''
+        Filters a list of dated values by date range, and sorts
+        it in descending order, like the Intrinio APIs
+    '''
+    return sorted([v for v in values if start_date <= v['date'] <= end_date],
+                  key=lambda v: v['date'], reverse=True)
+
+
+def _business_days(start_date: str, end_date: str):
+    '''
+        Returns the list of weekdays between two dates (YYYY-MM-DD)
+    '''
+    day = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+
+    days = []
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+
+    return days
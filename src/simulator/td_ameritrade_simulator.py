@@ -0,0 +1,351 @@
+"""Author: Mark Hanegraaff -- 2020
+
+A local HTTP stand-in for the TDAmeritrade APIs used by the td_ameritrade
+connector. It is used to test and benchmark the trading path
+(Broker, portfolio manager) end to end without a brokerage account.
+
+The simulator maintains a single CASH account and supports:
+
+    POST   /v1/oauth2/token
+    GET    /v1/accounts/{ACCOUNT_ID}
+    GET    /v1/accounts/{ACCOUNT_ID}/orders
+    POST   /v1/accounts/{ACCOUNT_ID}/orders
+    GET    /v1/accounts/{ACCOUNT_ID}/orders/{ORDER_ID}
+    DELETE /v1/accounts/{ACCOUNT_ID}/orders/{ORDER_ID}
+    GET    /v1/marketdata/quotes
+    GET    /v1/marketdata/{SYMBOL}/quotes
+    GET    /v1/marketdata/equity/hours
+
+Every response is delayed by a configurable latency, and orders fill
+(or are rejected) after a configurable delay.
+
+Example:
+
+    with TDAmeritradeSimulator(latency=0.05, fill_delay=1) as simulator:
+        td_ameritrade.TD_API_URL = simulator.url
+        ...
+"""
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from exception.exceptions import ValidationError
+from simulator.http_simulator import HttpSimulator
+
+log = logging.getLogger()
+
+SIMULATOR_ACCOUNT_ID = "123456789"
+
+
+class TDAmeritradeSimulator(HttpSimulator):
+    """
+        A local, in memory simulation of the TDAmeritrade APIs
+    """
+
+    base_path = '/v1'
+
+    def __init__(self, **kwargs):
+        '''
+            Initializes the simulator
+
+            Parameters
+            ----------
+            latency : float (kwargs)
+                (optional) seconds added to every response. Defaults to 0
+            fill_delay : float (kwargs)
+                (optional) seconds after which orders are filled. Defaults to 0
+            rejection_rate : float (kwargs)
+                (optional) probability (0 to 1) that an order is rejected. Defaults to 0
+            cash : float (kwargs)
+                (optional) initial cash available for trading. Defaults to 100,000
+            positions : dict (kwargs)
+                (optional) initial positions as symbol => quantity
+            prices : dict (kwargs)
+                (optional) prices as symbol => price. Unknown symbols are priced
+                with 'default_price'
+            default_price : float (kwargs)
+                (optional) price of symbols not listed in 'prices'. Defaults to 100
+            market_open : bool (kwargs)
+                (optional) whether the market is open. Defaults to True
+            token_lifetime : int (kwargs)
+                (optional) lifetime of access tokens in seconds. Defaults to 1800
+            seed : int (kwargs)
+                (optional) seed used to generate rejections
+        '''
+        def read_arg(name: str, default: object):
+            try:
+                return kwargs[name]
+            except KeyError:
+                return default
+
+        super().__init__(read_arg('latency', 0))
+
+        self.fill_delay = read_arg('fill_delay', 0)
+        self.rejection_rate = read_arg('rejection_rate', 0)
+        self.cash = read_arg('cash', 100000)
+        self.positions = {symbol: {'longQuantity': quantity, 'averagePrice': 0}
+                          for (symbol, quantity) in read_arg('positions', {}).items()}
+        self.prices = dict(read_arg('prices', {}))
+        self.default_price = read_arg('default_price', 100)
+        self.market_open = read_arg('market_open', True)
+        self.token_lifetime = read_arg('token_lifetime', 1800)
+        self.random = random.Random(read_arg('seed', None))
+
+        if self.fill_delay < 0:
+            raise ValidationError("Fill delay cannot be negative", None)
+
+        if not 0 <= self.rejection_rate <= 1:
+            raise ValidationError(
+                "Rejection rate must be between 0 and 1", None)
+
+        self.orders = {}
+        self.next_order_id = 1000000001
+        self.access_token = None
+        self.token_count = 0
+
+    def price(self, symbol: str):
+        '''
+            Returns the current price of a symbol
+        '''
+        try:
+            return self.prices[symbol]
+        except KeyError:
+            return self.default_price
+
+    def handle(self, method: str, path: list, query: dict, headers: object, body: bytes):
+        '''
+            Authenticates and routes a request. See HttpSimulator.handle()
+        '''
+        with self.lock:
+            if path == ['oauth2', 'token'] and method == 'POST':
+                return self.issue_token()
+
+            if headers.get('Authorization') != 'Bearer %s' % self.access_token:
+                return (401, {}, {'error': 'Not Authorized'})
+
+            return self._route(method, path, query, body)
+
+    def _route(self, method: str, path: list, query: dict, body: bytes):
+        if path == ['marketdata', 'equity', 'hours'] and method == 'GET':
+            return self.get_market_hours()
+
+        if path == ['marketdata', 'quotes'] and method == 'GET':
+            return self.get_quotes(query.get('symbol', [''])[0].split(','))
+
+        if len(path) == 3 and path[0] == 'marketdata' and path[2] == 'quotes' and method == 'GET':
+            return self.get_quotes([path[1]])
+
+        if len(path) < 2 or path[0] != 'accounts' or path[1] != SIMULATOR_ACCOUNT_ID:
+            return (404, {}, {'error': 'Not Found'})
+
+        if len(path) == 2 and method == 'GET':
+            return self.get_account()
+
+        if path[2:] == ['orders'] and method == 'GET':
+            return self.list_orders()
+
+        if path[2:] == ['orders'] and method == 'POST':
+            try:
+                order_request = json.loads(body)
+            except Exception:
+                return (400, {}, {'error': 'Invalid order'})
+            return self.place_order(order_request)
+
+        if len(path) == 4 and path[2] == 'orders' and method == 'GET':
+            return self.get_order(path[3])
+
+        if len(path) == 4 and path[2] == 'orders' and method == 'DELETE':
+            return self.cancel_order(path[3])
+
+        return (404, {}, {'error': 'Not Found'})
+
+    '''
+        API implementations. They are called with the lock held and return
+        a tuple of (status, headers, body)
+    '''
+
+    def issue_token(self):
+        self.token_count += 1
+        self.access_token = "simulated-access-token-%d" % self.token_count
+
+        return (200, {}, {
+            'access_token': self.access_token,
+            'expires_in': self.token_lifetime,
+            'token_type': 'Bearer'
+        })
+
+    def get_account(self):
+        self._update_orders()
+
+        return (200, {}, {
+            'securitiesAccount': {
+                'type': 'CASH',
+                'accountId': SIMULATOR_ACCOUNT_ID,
+                'positions': [{
+                    'instrument': {
+                        'assetType': 'EQUITY',
+                        'symbol': symbol
+                    },
+                    'longQuantity': position['longQuantity'],
+                    'averagePrice': position['averagePrice'],
+                    'marketValue': position['longQuantity'] * self.price(symbol)
+                } for (symbol, position) in self.positions.items()],
+                'currentBalances': {
+                    'cashAvailableForTrading': self.cash
+                }
+            }
+        })
+
+    def list_orders(self):
+        self._update_orders()
+
+        return (200, {}, [_public_order(order) for order in self.orders.values()])
+
+    def get_order(self, order_id: str):
+        self._update_orders()
+
+        try:
+            return (200, {}, _public_order(self.orders[order_id]))
+        except KeyError:
+            return (404, {}, {'error': 'Order not found'})
+
+    def place_order(self, order_request: dict):
+        try:
+            leg = order_request['orderLegCollection'][0]
+            instruction = leg['instruction']
+            quantity = leg['quantity']
+            symbol = leg['instrument']['symbol']
+        except Exception:
+            return (400, {}, {'error': 'Invalid order'})
+
+        order_id = str(self.next_order_id)
+        self.next_order_id += 1
+
+        self.orders[order_id] = {
+            'orderId': int(order_id),
+            'status': 'QUEUED',
+            'enteredTime': _format_time(datetime.now(timezone.utc)),
+            'tag': order_request.get('tag', ''),
+            'cancelable': True,
+            'orderLegCollection': [{
+                'instruction': instruction,
+                'quantity': quantity,
+                'instrument': {
+                    'assetType': 'EQUITY',
+                    'symbol': symbol
+                }
+            }],
+            '_submitted': time.monotonic(),
+            '_rejected': self.random.random() < self.rejection_rate
+        }
+
+        return (201, {'Location': '%s/accounts/%s/orders/%s' %
+                      (self.url, SIMULATOR_ACCOUNT_ID, order_id)}, None)
+
+    def cancel_order(self, order_id: str):
+        self._update_orders()
+
+        try:
+            order = self.orders[order_id]
+        except KeyError:
+            return (404, {}, {'error': 'Order not found'})
+
+        if not order['cancelable']:
+            return (400, {}, {'error': 'Order cannot be canceled'})
+
+        _close_order(order, 'CANCELED')
+        return (200, {}, None)
+
+    def get_quotes(self, symbol_list: list):
+        return (200, {}, {symbol: {
+            'symbol': symbol,
+            'lastPrice': self.price(symbol)
+        } for symbol in symbol_list})
+
+    def get_market_hours(self):
+        if not self.market_open:
+            return (200, {}, {
+                'equity': {
+                    'equity': {
+                        'isOpen': False
+                    }
+                }
+            })
+
+        now = datetime.now(timezone.utc)
+        return (200, {}, {
+            'equity': {
+                'EQ': {
+                    'isOpen': True,
+                    'sessionHours': {
+                        'regularMarket': [{
+                            'start': (now - timedelta(hours=1)).isoformat(),
+                            'end': (now + timedelta(hours=6)).isoformat()
+                        }]
+                    }
+                }
+            }
+        })
+
+    def _update_orders(self):
+        '''
+            Fills or rejects the queued orders whose fill delay has elapsed
+        '''
+        now = time.monotonic()
+
+        for order in self.orders.values():
+            if order['status'] != 'QUEUED' or now - order['_submitted'] < self.fill_delay:
+                continue
+
+            if order['_rejected']:
+                _close_order(order, 'REJECTED')
+            else:
+                self._fill_order(order)
+
+    def _fill_order(self, order: dict):
+        leg = order['orderLegCollection'][0]
+        symbol = leg['instrument']['symbol']
+        quantity = leg['quantity']
+        price = self.price(symbol)
+        position = self.positions.get(
+            symbol, {'longQuantity': 0, 'averagePrice': 0})
+
+        if leg['instruction'] == 'BUY':
+            if quantity * price > self.cash:
+                _close_order(order, 'REJECTED')
+                return
+
+            self.cash -= quantity * price
+            position['averagePrice'] = (position['averagePrice'] * position['longQuantity'] +
+                                        price * quantity) / (position['longQuantity'] + quantity)
+            position['longQuantity'] += quantity
+            self.positions[symbol] = position
+        else:
+            if quantity > position['longQuantity']:
+                _close_order(order, 'REJECTED')
+                return
+
+            self.cash += quantity * price
+            position['longQuantity'] -= quantity
+            if position['longQuantity'] == 0:
+                del self.positions[symbol]
+
+        _close_order(order, 'FILLED')
+
+
+def _close_order(order: dict, status: str):
+    order['status'] = status
+    order['cancelable'] = False
+    order['closeTime'] = _format_time(datetime.now(timezone.utc))
+
+
+def _public_order(order: dict):
+    '''
+        Returns the order without the simulator's private attributes
+    '''
+    return {key: value for (key, value) in order.items() if not key.startswith('_')}
+
+
+def _format_time(time_value: datetime):
+    return time_value.strftime("%Y-%m-%dT%H:%M:%S+0000")
@@ -3,13 +3,13 @@
 This module contains a collection of calculations shared by the trading
 strategies contained in this package.
 """
-import pandas as pd
+import numpy as np
 from datetime import datetime
-from connectors import intrinio_data
+from connectors import market_data_source
 from exception.exceptions import ValidationError, CalculationError, DataError
 
 
-def mark_to_market(data_frame: object, price_date: datetime):
+def mark_to_market(data_frame: object, price_date: datetime, data_source: object = None):
     """
         Peforms a Mark to Market on a Pandas dataframe representing
         a ranked portfolio, and given a price date. This is used
@@ -32,6 +32,9 @@ def mark_to_market(data_frame: object, price_date: datetime):
             portfolio dataframe
         price_date : datetime
             price date, current or historical
+        data_source : MarketDataSource
+            (optional) the source of the price data.
+            Defaults to market_data_source.data_source
 
         Returns
         ---------
@@ -52,11 +55,14 @@ def mark_to_market(data_frame: object, price_date: datetime):
         raise ValidationError(
             "Could not extract required fields for Mark to Market calculation", None)
 
+    if data_source is None:
+        data_source = market_data_source.data_source
+
     mmt_prices = []
 
     for ticker in data_frame['ticker']:
         try:
-            latest_price = intrinio_data.get_latest_close_price(ticker, price_date, 5)[
+            latest_price = data_source.get_latest_close_price(ticker, price_date, 5)[
                 1]
             mmt_prices.append(latest_price)
         except Exception as e:
@@ -66,3 +72,140 @@ def mark_to_market(data_frame: object, price_date: datetime):
     data_frame['actual_return'] = (data_frame['current_price'] -
                                    data_frame['analysis_price']) / data_frame['analysis_price']
     return data_frame
+
+
+def mark_to_market_multi(data_frame: object, price_dates: dict, data_source: object = None):
+    """
+        Peforms a Mark to Market on a Pandas dataframe representing
+        a ranked portfolio for multiple price dates (horizons) at once.
+        All prices are resolved with a single batched lookup, see
+        MarketDataSource.get_latest_close_prices()
+
+        The dataframe must contain the following columuns:
+
+        * ticker
+        * analysis_price
+
+        and for each horizon will add:
+
+        * current_price_{horizon}
+        * actual_return_{horizon}
+
+        Parmeters
+        ---------
+        data_frame : Pandas DataFrame
+            portfolio dataframe
+        price_dates : dict
+            a dictionary of horizon name => price date, e.g.
+            {'1M': datetime(2019, 6, 30), '2M': datetime(2019, 7, 30)}
+        data_source : MarketDataSource
+            (optional) the source of the price data.
+            Defaults to market_data_source.data_source
+
+        Returns
+        ---------
+        A new dataframe with the added columns
+
+        Raises
+        ---------
+        ValidationError if parameters are incorrect
+        DataError if there are problems reading price data
+    """
+
+    if (data_frame is None or price_dates is None or len(price_dates) == 0):
+        raise ValidationError(
+            "Invalid Parameters supplied to Mark to Market calculation", None)
+
+    if ('ticker' not in data_frame.columns
+            or 'analysis_price' not in data_frame.columns):
+        raise ValidationError(
+            "Could not extract required fields for Mark to Market calculation", None)
+
+    if data_source is None:
+        data_source = market_data_source.data_source
+
+    (tickers, ticker_index) = np.unique(
+        data_frame['ticker'].to_numpy(), return_inverse=True)
+    horizons = list(price_dates.keys())
+
+    try:
+        mmt_prices = data_source.get_latest_close_prices(
+            list(tickers), [price_dates[h] for h in horizons], 5)
+    except Exception as e:
+        raise DataError("Could not perform MMT calculation", e)
+
+    analysis_prices = data_frame['analysis_price'].to_numpy()
+
+    for (i, horizon) in enumerate(horizons):
+        current_prices = mmt_prices[ticker_index, i]
+
+        data_frame['current_price_%s' % horizon] = current_prices
+        data_frame['actual_return_%s' % horizon] = (
+            current_prices - analysis_prices) / analysis_prices
+
+    return data_frame
+
+
+def deciles(values: object):
+    """
+        Sorts values into deciles, one row (e.g. analysis period) at a time,
+        without building a Pandas dataframe. Results are identical to
+
+        pd.qcut(row, 10, labels=False, duplicates='drop')
+
+        applied to each row, meaning that duplicate bin edges are dropped
+        and the resulting number of bins may be lower than 10.
+
+        Parmeters
+        ---------
+        values : NumPy array like
+            values shaped (rows, columns), or (columns). Missing values
+            must be supplied as NaN
+
+        Returns
+        ---------
+        A NumPy float array shaped like 'values' with the decile (0-9) of
+        each value. Missing values, and rows that cannot be split into
+        at least one bin, are returned as NaN
+
+        Raises
+        ---------
+        ValidationError if parameters are incorrect
+    """
+    values = np.asarray(values, dtype='float64')
+
+    if values.ndim not in (1, 2):
+        raise ValidationError(
+            "Deciles can only be computed on 1 or 2 dimensional arrays", None)
+
+    rows = np.atleast_2d(values)
+    missing = np.isnan(rows)
+    quantiles = np.linspace(0, 1, 11)
+
+    # like pd.qcut, round up quantiles that are not representable in base 2
+    np.putmask(quantiles, 10 * quantiles != np.arange(11),
+               np.nextafter(quantiles, 1))
+
+    # bin edges, one row of 11 quantiles per row of values
+    edges = np.full((rows.shape[0], len(quantiles)), np.nan)
+    if not missing.any():
+        edges[:] = np.quantile(rows, quantiles, axis=1).T
+    else:
+        valid_rows = ~missing.all(axis=1)
+        if valid_rows.any():
+            edges[valid_rows] = np.nanquantile(
+                rows[valid_rows], quantiles, axis=1).T
+
+    # edges are sorted, so duplicates are adjacent
+    unique_edges = np.ones(edges.shape, dtype=bool)
+    unique_edges[:, 1:] = edges[:, 1:] != edges[:, :-1]
+
+    # bins are right closed, and the first one includes its lower edge
+    edges_below = ((edges[:, np.newaxis, :] < rows[:, :, np.newaxis])
+                   & unique_edges[:, np.newaxis, :]).sum(axis=2)
+    decile_rows = (np.maximum(edges_below, 1) - 1).astype('float64')
+
+    decile_rows[missing] = np.nan
+    decile_rows[unique_edges.sum(axis=1) < 2] = np.nan
+
+    return decile_rows.reshape(values.shape)
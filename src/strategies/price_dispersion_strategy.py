@@ -1,14 +1,19 @@
 """Author: Mark Hanegraaff -- 2020
 """
 
-import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from connectors import intrinio_data, intrinio_util
+from connectors import intrinio_util, market_data_source
 import logging
-from support import util
+from strategies import calculator
+from support import util, constants, lazy_module, timing
 from exception.exceptions import BaseError, ValidationError, DataError
 from model.recommendation_set import SecurityRecommendationSet
 
+# only needed to build the dataframes of the recommendation
+pd = lazy_module.lazy_import('pandas')
+
 
 class PriceDispersionStrategy():
     """
@@ -52,8 +57,10 @@ class PriceDispersionStrategy():
     """
 
     STRATEGY_NAME = "PRICE_DISPERSION"
+    TARGET_PRICE_TAGS = ['zacks_target_price_std_dev',
+                         'zacks_target_price_mean']
 
-    def __init__(self, ticker_list: list, data_year: int, data_month: int, output_size: int):
+    def __init__(self, ticker_list: list, data_year: int, data_month: int, output_size: int, **kwargs):
         """
             Initializes the class with the ticker list, a year and a month.
 
@@ -71,6 +78,12 @@ class PriceDispersionStrategy():
             month : analysis month
             output_size : number of recommended securities that will be returned
                 by this strategy
+            max_workers : int (kwargs)
+                (optional) the number of threads used to load financial data.
+                Defaults to constants.DATA_LOADER_MAX_WORKERS
+            data_source : MarketDataSource (kwargs)
+                (optional) the source of the financial data.
+                Defaults to market_data_source.data_source
 
         """
 
@@ -85,6 +98,20 @@ class PriceDispersionStrategy():
             raise ValidationError(
                 "Output size must be at least 1", None)
 
+        try:
+            max_workers = kwargs['max_workers']
+        except KeyError:
+            max_workers = constants.DATA_LOADER_MAX_WORKERS
+
+        if not isinstance(max_workers, int) or max_workers <= 0:
+            raise ValidationError(
+                "Max workers must be at least 1", None)
+
+        try:
+            self.data_source = kwargs['data_source']
+        except KeyError:
+            self.data_source = market_data_source.data_source
+
         (self.analysis_start_date, self.analysis_end_date) = intrinio_util.get_month_date_range(
             data_year, data_month)
 
@@ -95,17 +122,62 @@ class PriceDispersionStrategy():
         self.ticker_list = ticker_list
 
         self.output_size = output_size
+        self.max_workers = max_workers
         self.data_date = "%d-%d" % (data_year, data_month)
 
         self.recommendation_set = None
         self.raw_dataframe = None
         self.recommendation_dataframe = None
 
+    def __load_ticker_data__(self, ticker: str):
+        """
+            loads the financial data for a single ticker. This method is
+            executed by the worker threads of __load_financial_data__
+
+            Returns
+            ------------
+            A tuple of (ticker, analysis_price, target_price_avg, target_price_sdtdev)
+            or None if the ticker could not be loaded because of a BaseError
+
+            Raises
+            ------------
+            DataError in case of an unexpected error
+        """
+        dds = self.analysis_start_date
+        dde = self.analysis_end_date
+        year = dds.year
+        month = dds.month
+
+        try:
+            target_price_data = self.data_source.get_company_historical_data_multi(
+                ticker, dds, dde, self.TARGET_PRICE_TAGS)
+
+            target_price_sdtdev = target_price_data[
+                'zacks_target_price_std_dev'][year][month]
+            target_price_avg = target_price_data[
+                'zacks_target_price_mean'][year][month]
+
+            analysis_price = self.data_source.get_latest_close_price(ticker, dde, 5)[
+                1]
+
+            return (ticker, analysis_price, target_price_avg, target_price_sdtdev)
+        except BaseError as be:
+            logging.debug(
+                "%s will not be factored in recommendation, because: %s" % (ticker, str(be)))
+            return None
+        except Exception as e:
+            raise DataError(
+                "Could not read %s financial data" % (ticker), e)
+
     def __load_financial_data__(self):
         """
             loads the raw financial required by this strategy and returns it as
             a dictionary suitable for Pandas processing.
 
+            Tickers are loaded concurrently using a pool of 'self.max_workers'
+            threads, and results are returned in the same order as the
+            ticker list.
+
             Returns
             ------------
             A Dictionary with the following format.
@@ -128,62 +200,113 @@ class PriceDispersionStrategy():
         logging.debug("Loading financial data for %s strategy" %
                       self.STRATEGY_NAME)
 
-        financial_data = {
-            'analysis_period': [],
-            'ticker': [],
-            'analysis_price': [],
-            'target_price_avg': [],
-            'dispersion_stdev_pct': [],
-            'analyst_expected_return': []
-        }
-
         dds = self.analysis_start_date
         dde = self.analysis_end_date
-        year = dds.year
-        month = dds.month
-
-        at_least_one = False
 
         logging.debug("Analysis date range is %s, %s" %
                       (dds.strftime("%Y-%m-%d"), dde.strftime("%Y-%m-%d")))
         logging.debug("Analysis price date is %s" % (dde.strftime("%Y-%m-%d")))
 
-        for ticker in self.ticker_list:
-            try:
-                target_price_sdtdev = intrinio_data.get_target_price_std_dev(ticker, dds, dde)[
-                    year][month]
-                target_price_avg = intrinio_data.get_target_price_mean(ticker, dds, dde)[
-                    year][month]
-                dispersion_stdev_pct = target_price_sdtdev / target_price_avg * 100
-
-                analysis_price = intrinio_data.get_latest_close_price(ticker, dde, 5)[
-                    1]
-
-                analyst_expected_return = (
-                    target_price_avg - analysis_price) / analysis_price
-
-                financial_data['analysis_period'].append(self.data_date)
-                financial_data['ticker'].append(ticker)
-                financial_data['analysis_price'].append(analysis_price)
-                financial_data['target_price_avg'].append(target_price_avg)
-                financial_data['dispersion_stdev_pct'].append(
-                    dispersion_stdev_pct)
-                financial_data['analyst_expected_return'].append(
-                    analyst_expected_return)
-
-                at_least_one = True
-            except BaseError as be:
-                logging.debug(
-                    "%s will not be factored in recommendation, because: %s" % (ticker, str(be)))
-            except Exception as e:
-                raise DataError(
-                    "Could not read %s financial data" % (ticker), e)
-
-        if not at_least_one:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            ticker_data_list = list(executor.map(
+                self.__load_ticker_data__, self.ticker_list))
+
+        ticker_data_list = [
+            ticker_data for ticker_data in ticker_data_list if ticker_data is not None]
+
+        if len(ticker_data_list) == 0:
             raise DataError(
                 "Could not load financial data for any if the supplied tickers", None)
 
-        return financial_data
+        (tickers, analysis_prices, target_price_avgs,
+         target_price_sdtdevs) = zip(*ticker_data_list)
+
+        (dispersion_stdev_pct, analyst_expected_return) = self.score_securities(
+            analysis_prices, target_price_avgs, target_price_sdtdevs)
+
+        return {
+            'analysis_period': [self.data_date] * len(tickers),
+            'ticker': list(tickers),
+            'analysis_price': list(analysis_prices),
+            'target_price_avg': list(target_price_avgs),
+            'dispersion_stdev_pct': dispersion_stdev_pct.tolist(),
+            'analyst_expected_return': analyst_expected_return.tolist()
+        }
+
+    @staticmethod
+    def score_securities(analysis_prices: object, target_price_avgs: object, target_price_sdtdevs: object):
+        """
+            Computes the price dispersion and the analyst expected return
+            of a set of securities, for one or more analysis periods at once.
+
+            Parameters
+            ------------
+            analysis_prices : NumPy array like
+                analysis prices shaped (periods, tickers), or (tickers)
+            target_price_avgs : NumPy array like
+                analyst target price averages, shaped like analysis_prices
+            target_price_sdtdevs : NumPy array like
+                analyst target price standard deviations, shaped like analysis_prices
+
+            Missing values must be supplied as NaN
+
+            Returns
+            ------------
+            A tuple of NumPy arrays (dispersion_stdev_pct, analyst_expected_return)
+            shaped like analysis_prices
+        """
+        analysis_prices = np.asarray(analysis_prices, dtype='float64')
+        target_price_avgs = np.asarray(target_price_avgs, dtype='float64')
+        target_price_sdtdevs = np.asarray(
+            target_price_sdtdevs, dtype='float64')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dispersion_stdev_pct = target_price_sdtdevs / target_price_avgs * 100
+            analyst_expected_return = (
+                target_price_avgs - analysis_prices) / analysis_prices
+
+        return (dispersion_stdev_pct, analyst_expected_return)
+
+    @staticmethod
+    def rank_securities(dispersion_stdev_pct: object, analyst_expected_return: object):
+        """
+            Ranks a set of securities, for one or more analysis periods at once.
+            Securities are sorted into deciles based on the price dispersion,
+            and are ranked by decile and analyst expected return, both descending.
+
+            Parameters
+            ------------
+            dispersion_stdev_pct : NumPy array like
+                price dispersion shaped (periods, tickers), or (tickers)
+            analyst_expected_return : NumPy array like
+                analyst expected return, shaped like dispersion_stdev_pct
+
+            Missing values must be supplied as NaN, and are ranked last
+
+            Returns
+            ------------
+            A tuple of NumPy arrays (decile, ranking) shaped like dispersion_stdev_pct,
+            where decile contains the decile of each security (see calculator.deciles)
+            and ranking contains the ticker indices of each period, from the
+            highest to the lowest ranked security.
+        """
+        decile = calculator.deciles(dispersion_stdev_pct)
+        analyst_expected_return = np.asarray(
+            analyst_expected_return, dtype='float64')
+
+        if analyst_expected_return.shape != decile.shape:
+            raise ValidationError(
+                "Price dispersion and expected return must have the same shape", None)
+
+        # sort descending, with missing values last. lexsort is stable,
+        # so ties keep the ticker order
+        decile_key = np.where(np.isnan(decile), np.inf, -decile)
+        return_key = np.where(np.isnan(analyst_expected_return),
+                              np.inf, -analyst_expected_return)
+
+        ranking = np.lexsort((return_key, decile_key), axis=-1)
+
+        return (decile, ranking)
 
     def generate_recommendation(self):
         """
@@ -204,24 +327,27 @@ class PriceDispersionStrategy():
             None
         """
 
-        financial_data = self.__load_financial_data__()
+        with timing.span('strategy.load_financial_data'):
+            financial_data = self.__load_financial_data__()
+
+        with timing.span('strategy.rank_securities'):
+            (decile, ranking) = self.rank_securities(
+                financial_data['dispersion_stdev_pct'], financial_data['analyst_expected_return'])
 
         self.raw_dataframe = pd.DataFrame(financial_data)
         pd.options.display.float_format = '{:.3f}'.format
 
-        # sort the dataframe into deciles
-        self.raw_dataframe['decile'] = pd.qcut(
-            financial_data['dispersion_stdev_pct'], 10, labels=False, duplicates='drop')
-        self.raw_dataframe = self.raw_dataframe.sort_values(
-            ['decile', 'analyst_expected_return'], ascending=(False, False))
+        # deciles are only missing when the dispersion could not be binned
+        self.raw_dataframe['decile'] = decile if np.isnan(
+            decile).any() else decile.astype(int)
+        self.raw_dataframe = self.raw_dataframe.iloc[ranking]
 
         self.recommendation_dataframe = self.raw_dataframe.head(self.output_size).drop(
             ['decile', 'target_price_avg', 'dispersion_stdev_pct', 'analyst_expected_return'], axis=1)
 
         # price the recommended securitues
-        priced_securities = {}
-        for row in self.recommendation_dataframe.itertuples(index=False):
-            priced_securities[row.ticker] = row.analysis_price
+        priced_securities = dict(zip(self.recommendation_dataframe['ticker'].tolist(),
+                                     self.recommendation_dataframe['analysis_price'].tolist()))
 
         # determine the recommendation valid date range
         valid = self.analysis_end_date + timedelta(days=1)
@@ -0,0 +1,96 @@
+"""strategy_benchmark.py
+
+Measures the latency of the PRICE_DISPERSION strategy, with a cold and a
+warm cache, against a local Intrinio simulator serving either recorded
+fixtures (see record_intrinio_fixtures.py) or a synthetic universe.
+"""
+import argparse
+import logging
+import os
+
+# the simulator accepts any API key
+os.environ.setdefault('INTRINIO_API_KEY', 'simulator')
+
+from services import strategy_benchmark_svc
+from simulator import intrinio_simulator
+from exception.exceptions import ValidationError
+from support import util
+from support import logging_definition
+
+log = logging.getLogger()
+
+
+def parse_max_workers(max_workers_str: str):
+    '''
+        Converts a comma separated list of worker pool sizes into a list of ints
+    '''
+    try:
+        return [int(w) for w in max_workers_str.split(',')]
+    except Exception:
+        raise ValidationError(
+            "%s is invalid. Expecting a comma separated list of numbers, e.g. '1,4,10'" % max_workers_str, None)
+
+
+def main():
+    """
+        Main Function for this script
+    """
+
+    description = """
+                Benchmarks the PRICE_DISPERSION strategy against a local
+                Intrinio simulator, with a cold and a warm cache, for each
+                of the supplied worker pool sizes.
+              """
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-fixtures_dir", help="Directory of recorded fixtures. A synthetic universe is used if omitted", type=str, default=None)
+    parser.add_argument(
+        "-universe_size", help="Number of synthetic tickers", type=int, default=30)
+    parser.add_argument(
+        "-year", help="Analysis year", type=int, default=2020)
+    parser.add_argument(
+        "-month", help="Analysis month", type=int, default=1)
+    parser.add_argument(
+        "-output_size", help="Number of selected securities", type=int, default=3)
+    parser.add_argument(
+        "-latency", help="Simulated API latency in seconds", type=float, default=0.05)
+    parser.add_argument(
+        "-max_workers", help="Comma separated list of worker pool sizes", type=str, default="1,4,10")
+    parser.add_argument(
+        "-seed", help="Seed of the synthetic universe", type=int, default=0)
+
+    args = parser.parse_args()
+
+    log.info("Parameters:")
+    log.info("Fixtures: %s" % (args.fixtures_dir or "synthetic"))
+    log.info("Analysis Period: %d/%d" % (args.year, args.month))
+    log.info("Output Size: %d" % args.output_size)
+    log.info("Latency: %.3fs" % args.latency)
+    log.info("Max Workers: %s" % args.max_workers)
+
+    try:
+        if args.fixtures_dir is None:
+            fixtures = intrinio_simulator.SyntheticFixtures(args.seed)
+            ticker_list = strategy_benchmark_svc.synthetic_ticker_list(
+                args.universe_size)
+        else:
+            fixtures = intrinio_simulator.load_fixtures(args.fixtures_dir)
+            ticker_list = fixtures.ticker_list
+
+        log.info("Universe Size: %d" % len(ticker_list))
+
+        results = strategy_benchmark_svc.run_benchmark(
+            fixtures, ticker_list, args.year, args.month, args.output_size,
+            parse_max_workers(args.max_workers), latency=args.latency)
+
+        log.info("Benchmark results:")
+        for result in results:
+            log.info(util.format_dict(result))
+
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        exit(-1)
+
+if __name__ == "__main__":
+    main()
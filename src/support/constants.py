@@ -10,6 +10,24 @@ This module contains application constants and static configuration
 APP_DATA_DIR = "./app_data"
 TICKER_DATA_DIR = "./ticker-data"
 FINANCIAL_DATA_DIR = "./financial-data/"
+PRICE_STORE_DIR = "./financial-data/price-store/"
+BENCHMARK_BASELINE_FILE = "./benchmark-data/baseline.json"
+
+
+'''
+    Data loading constants
+'''
+
+# default number of worker threads used to load financial data
+DATA_LOADER_MAX_WORKERS = 10
+
+
+'''
+    Trading constants
+'''
+
+# default number of orders that are submitted to the broker concurrently
+ORDER_PLACEMENT_MAX_WORKERS = 10
 
 
 '''
@@ -1,7 +1,11 @@
 """Author: Mark Hanegraaff -- 2020
 """
 from io import BytesIO
+from collections import OrderedDict
 import atexit
+import pickle
+import threading
+import time
 from diskcache import Cache
 from support import util, constants
 from exception.exceptions import ValidationError
@@ -13,7 +17,19 @@ log = logging.getLogger()
 class FinancialCache():
     """
         A Disk based database containing an offline version of financial
-        data and used as a cache
+        data and used as a cache.
+
+        Reads are served by a bounded, in memory LRU tier sitting in front of
+        the disk, so that keys that are read repeatedly within the same process
+        do not pay the cost of SQLite and unpickling. Values returned from
+        the memory tier are shared, and must not be modified by callers.
+
+        Entries may be written with an expiration time, after which they
+        are no longer returned by either tier.
+
+        Values are pickled once when written, and stored on disk as bytes,
+        so that the size of every value (used to bound the memory tier)
+        is known without serializing it again.
     """
 
     def __init__(self, path, **kwargs):
@@ -28,6 +44,10 @@ class FinancialCache():
             max_cache_size_bytes : int (kwargs)
             (optional) the maximum size of the cache in bytes
 
+            max_memory_cache_size_bytes : int (kwargs)
+            (optional) the maximum size of the in memory tier in bytes.
+            It is never larger than max_cache_size_bytes
+
             Returns
             -----------
             A tuple of strings containing the start and end date of the fiscal period
@@ -39,23 +59,68 @@ class FinancialCache():
             # default max cache is 4GB
             max_cache_size_bytes = 4e9
 
+        try:
+            max_memory_cache_size_bytes = kwargs['max_memory_cache_size_bytes']
+        except KeyError:
+            # default max memory cache is 64MB
+            max_memory_cache_size_bytes = 64e6
+
         util.create_dir(path)
 
         try:
             self.disk_cache = Cache(path, size_limit=int(max_cache_size_bytes))
+            self.max_memory_cache_size_bytes = min(
+                int(max_memory_cache_size_bytes), int(max_cache_size_bytes))
         except Exception as e:
             raise ValidationError('invalid max cache size', e)
 
+        # key => (value, size in bytes, expire time), in least recently used order
+        self.memory_cache = OrderedDict()
+        self.memory_cache_size_bytes = 0
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
         log.debug("Cache was initialized: %s" % path)
 
-    def write(self, key: str, value: object):
+    def write(self, key: str, value: object, expire_seconds: float = None):
         """
-            Writes an object (value) to the cache using the supplied key
+            Writes an object (value) to the cache using the supplied key.
+
+            Parameters
+            ----------
+            key : str
+                The cache key
+            value : object
+                The object to be cached
+            expire_seconds : float
+                (optional) number of seconds after which the entry expires.
+                When None, the entry never expires
         """
         if (key == "" or key is None) or (value == "" or value is None):
             return
 
-        self.disk_cache[key] = value
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self.disk_cache.set(key, data, expire=expire_seconds)
+
+        expire_time = None if expire_seconds is None else time.time() + expire_seconds
+        self._memory_write(key, value, len(data), expire_time)
+
+    def contains(self, key: str):
+        """
+            Returns true if the supplied key is present in the cache,
+            without reading (and unpickling) its value
+        """
+        if key == "" or key is None:
+            return False
+
+        with self.lock:
+            if self._memory_read(key) is not None:
+                return True
+
+        return key in self.disk_cache
 
     def read(self, key):
         """
@@ -66,12 +131,96 @@ class FinancialCache():
             ----------
             The object in question, or None if they key is not present
         """
+        with self.lock:
+            value = self._memory_read(key)
+            if value is not None:
+                self.memory_hits += 1
+                return value
+
+        (data, expire_time) = self.disk_cache.get(key, expire_time=True)
+
+        if data is None:
+            log.debug("%s not found inside cache" % key)
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.disk_hits += 1
+
+        # entries written before values were pickled by this class
+        # are returned as they are, and not kept in the memory tier
+        if not isinstance(data, bytes):
+            return data
+
+        value = pickle.loads(data)
+        self._memory_write(key, value, len(data), expire_time)
+
+        return value
+
+    def stats(self):
+        """
+            Returns the hit/miss counters and the size of the memory tier
+
+            Returns
+            ----------
+            A dictionary like this:
+
+            {
+                'memory_hits': 10,
+                'disk_hits': 2,
+                'misses': 1,
+                'memory_items': 3,
+                'memory_size_bytes': 1024
+            }
+        """
+        with self.lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_items': len(self.memory_cache),
+                'memory_size_bytes': self.memory_cache_size_bytes
+            }
+
+    def _memory_read(self, key: str):
+        """
+            Returns a value from the memory tier, or None if not present
+            or expired. Must be called while holding the lock.
+        """
         try:
-            return self.disk_cache[key]
+            (value, size, expire_time) = self.memory_cache[key]
         except KeyError:
-            log.debug("%s not found inside cache" % key)
             return None
 
+        if expire_time is not None and expire_time <= time.time():
+            del self.memory_cache[key]
+            self.memory_cache_size_bytes -= size
+            return None
+
+        self.memory_cache.move_to_end(key)
+        return value
+
+    def _memory_write(self, key: str, value: object, size: int, expire_time: float):
+        """
+            Adds a value of the supplied (pickled) size to the memory tier and
+            evicts the least recently used entries until it fits. Values that
+            are larger than the memory tier are not stored.
+        """
+        with self.lock:
+            if key in self.memory_cache:
+                self.memory_cache_size_bytes -= self.memory_cache.pop(key)[1]
+
+            if size > self.max_memory_cache_size_bytes:
+                return
+
+            while self.memory_cache_size_bytes + size > self.max_memory_cache_size_bytes:
+                self.memory_cache_size_bytes -= self.memory_cache.popitem(last=False)[
+                    1][1]
+
+            self.memory_cache[key] = (value, size, expire_time)
+            self.memory_cache_size_bytes += size
+
 
 @atexit.register
 def shutdown_cache():
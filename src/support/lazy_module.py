@@ -0,0 +1,60 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module defers the import of expensive modules (e.g. pandas) that
+are only needed by some of the code paths of a module, until they are
+first used. This reduces the startup time of the entry points that
+don't use them.
+
+    pd = lazy_module.lazy_import('pandas')
+
+    # pandas is imported here
+    data_frame = pd.DataFrame(...)
+"""
+import importlib
+import sys
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+        A placeholder for a module, which imports it the first time
+        one of its attributes is accessed
+    """
+
+    def __init__(self, module_name: str):
+        super().__init__(module_name)
+        self.__dict__['_lock'] = threading.Lock()
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        '''
+            Imports the module, and returns it
+        '''
+        with self._lock:
+            if self._module is None:
+                self.__dict__['_module'] = importlib.import_module(
+                    self.__name__)
+
+        return self._module
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value: object):
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(module_name: str):
+    '''
+        Returns a LazyModule for the supplied module name, or the module
+        itself if it was already imported
+    '''
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    return LazyModule(module_name)
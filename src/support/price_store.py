@@ -0,0 +1,389 @@
+"""Author: Mark Hanegraaff -- 2020
+
+A columnar, on disk store of daily closing prices.
+
+Each ticker is stored as two NumPy arrays (dates and close prices) sorted by
+date, and saved as .npy files that are memory mapped when read. A small
+JSON index per ticker records the date ranges that were already fetched
+from the data provider, so that callers can determine which portions of a
+date range are still missing. Recent date ranges (e.g. the current date,
+whose closing price may not be final yet) are recorded with an expiration
+time, after which they are considered missing again.
+
+    {PRICE_STORE_DIR}/AAPL.dates.npy
+    {PRICE_STORE_DIR}/AAPL.close.npy
+    {PRICE_STORE_DIR}/AAPL.index.json
+    {PRICE_STORE_DIR}/AAPL.lock
+
+Reads return views into the memory mapped arrays, so slicing a date range
+does not copy or deserialize any data. Every memory map holds an open file,
+so only the most recently used tickers are kept loaded.
+
+The store may be shared by several processes (e.g. the backtest workers).
+Files are read while holding a shared lock on the ticker's lock file, and
+written while holding an exclusive one. Writes merge the new prices with
+the ones currently on disk, rather than with the ones loaded by the process,
+so that prices written by other processes are never dropped.
+
+Unlike the financial cache, the store has no size limit. Prices take 16 bytes
+per ticker and trading day (about 4KB per ticker and year), and the store can
+be reset by deleting its folder.
+"""
+import os
+import fcntl
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import numpy as np
+from support import util, constants
+from exception.exceptions import FileSystemError, ValidationError
+import logging
+
+log = logging.getLogger()
+
+DATE_DTYPE = 'datetime64[D]'
+CLOSE_DTYPE = 'float64'
+
+# default number of tickers whose arrays are kept memory mapped. Each one
+# holds two open files, so this must stay well below the open file limit
+PRICE_STORE_MAX_LOADED_TICKERS = 256
+
+
+class PriceStore():
+    """
+        A Disk based, memory mapped store of daily closing prices
+    """
+
+    def __init__(self, path: str, **kwargs):
+        '''
+            Initializes the store
+
+            Parameters
+            ----------
+            path : str
+            The path where the store will be located
+
+            max_loaded_tickers : int (kwargs)
+            (optional) the maximum number of tickers kept memory mapped
+        '''
+        try:
+            max_loaded_tickers = kwargs['max_loaded_tickers']
+        except KeyError:
+            max_loaded_tickers = PRICE_STORE_MAX_LOADED_TICKERS
+
+        if not isinstance(max_loaded_tickers, int) or max_loaded_tickers < 1:
+            raise ValidationError(
+                "Invalid max loaded tickers: %s. Must be at least 1" % str(max_loaded_tickers), None)
+
+        util.create_dir(path)
+
+        self.path = path
+        self.max_loaded_tickers = max_loaded_tickers
+        self.lock = threading.Lock()
+
+        # in memory cache of ticker => (date_ranges, recent_date_ranges, dates, closes),
+        # in least recently used order
+        self.loaded_tickers = OrderedDict()
+        self.loaded_tickers_lock = threading.Lock()
+
+        log.debug("Price store was initialized: %s" % path)
+
+    def missing_date_ranges(self, ticker: str, start_date: str, end_date: str):
+        '''
+            Returns the portions of the supplied date range that are not yet
+            covered by the store for the supplied ticker.
+
+            Parameters
+            ----------
+            ticker : str
+                Ticker Symbol
+            start_date : str
+                Start date formatted as YYYY-MM-DD
+            end_date : str
+                End date formatted as YYYY-MM-DD
+
+            Returns
+            ----------
+            A list of (start, end) tuples formatted as YYYY-MM-DD
+        '''
+        (date_ranges, recent_date_ranges, _, _) = self._load(ticker)
+
+        now = time.time()
+        covered_date_ranges = list(date_ranges) + [(range_start, range_end)
+                                                   for (range_start, range_end, expire_time) in recent_date_ranges
+                                                   if expire_time > now]
+
+        return missing_date_ranges(covered_date_ranges, start_date, end_date)
+
+    def read(self, ticker: str, start_date: str, end_date: str):
+        '''
+            Reads the closing prices for the supplied ticker and date range.
+
+            Parameters
+            ----------
+            ticker : str
+                Ticker Symbol
+            start_date : str
+                Start date formatted as YYYY-MM-DD
+            end_date : str
+                End date formatted as YYYY-MM-DD
+
+            Returns
+            ----------
+            A tuple of NumPy arrays (dates, closes) sorted by date. These are
+            read only views of the underlining memory mapped files
+        '''
+        (_, _, dates, closes) = self._load(ticker)
+
+        start = np.searchsorted(dates, np.datetime64(start_date, 'D'), 'left')
+        end = np.searchsorted(dates, np.datetime64(end_date, 'D'), 'right')
+
+        return (dates[start:end], closes[start:end])
+
+    def write(self, ticker: str, price_dict: dict, date_ranges: list,
+              recent_date_ranges: list = None, recent_expire_seconds: float = 0):
+        '''
+            Merges a set of prices into the store and marks the supplied
+            date ranges as covered.
+
+            Parameters
+            ----------
+            ticker : str
+                Ticker Symbol
+            price_dict : dict
+                a dictionary of date->price, e.g. {'2019-10-01': 100}
+            date_ranges : list
+                a list of (start, end) tuples formatted as YYYY-MM-DD that
+                were read from the data provider
+            recent_date_ranges : list
+                (optional) a list of (start, end) tuples formatted as YYYY-MM-DD
+                that are only considered covered for 'recent_expire_seconds'
+            recent_expire_seconds : float
+                (optional) the number of seconds the recent date ranges remain covered
+        '''
+        if recent_date_ranges is None:
+            recent_date_ranges = []
+
+        with self.lock, self._ticker_lock(ticker, fcntl.LOCK_EX):
+            (current_ranges, current_recent_ranges,
+             current_dates, current_closes) = self._read_files(ticker, None) or _empty_ticker()
+
+            new_dates = np.array(list(price_dict.keys()), dtype=DATE_DTYPE)
+            new_closes = np.array(list(price_dict.values()), dtype=CLOSE_DTYPE)
+
+            # new prices replace existing ones for the same date
+            keep = ~np.isin(current_dates, new_dates)
+            dates = np.concatenate((current_dates[keep], new_dates))
+            closes = np.concatenate((current_closes[keep], new_closes))
+
+            order = np.argsort(dates, kind='stable')
+            dates = dates[order]
+            closes = closes[order]
+
+            merged_ranges = merge_date_ranges(
+                list(current_ranges) + list(date_ranges))
+
+            now = time.time()
+            merged_recent_ranges = [r for r in current_recent_ranges if r[2] > now] + \
+                [(range_start, range_end, now + recent_expire_seconds)
+                 for (range_start, range_end) in recent_date_ranges]
+
+            try:
+                self._save_array(self._file_name(ticker, 'dates.npy'), dates)
+                self._save_array(self._file_name(ticker, 'close.npy'), closes)
+                self._save_index(ticker, merged_ranges, merged_recent_ranges)
+            except Exception as e:
+                raise FileSystemError(
+                    "Could not write %s prices to the price store" % ticker, e)
+
+            with self.loaded_tickers_lock:
+                self.loaded_tickers.pop(ticker, None)
+
+    def _load(self, ticker: str):
+        '''
+            Loads the index and memory maps the price arrays of a ticker.
+            Tickers that are not present return empty arrays.
+            When more than max_loaded_tickers are loaded, the least recently
+            used one is released, closing its memory maps once they are
+            no longer referenced.
+
+            Returns
+            ----------
+            A tuple of (date_ranges, recent_date_ranges, dates, closes)
+        '''
+        with self.loaded_tickers_lock:
+            try:
+                self.loaded_tickers.move_to_end(ticker)
+                return self.loaded_tickers[ticker]
+            except KeyError:
+                pass
+
+        with self._ticker_lock(ticker, fcntl.LOCK_SH):
+            loaded = self._read_files(ticker, 'r')
+
+        if loaded is None:
+            return _empty_ticker()
+
+        with self.loaded_tickers_lock:
+            self.loaded_tickers[ticker] = loaded
+            while len(self.loaded_tickers) > self.max_loaded_tickers:
+                self.loaded_tickers.popitem(last=False)
+
+        return loaded
+
+    def _read_files(self, ticker: str, mmap_mode: str):
+        '''
+            Reads the index and price arrays of a ticker from disk. The arrays
+            are memory mapped using the supplied mode, or read into memory
+            when it is None. Must be called while holding the ticker lock.
+
+            Returns
+            ----------
+            A tuple of (date_ranges, recent_date_ranges, dates, closes),
+            or None if the ticker is not present
+        '''
+        try:
+            with open(self._file_name(ticker, 'index.json')) as file:
+                index = json.load(file)
+            date_ranges = [tuple(r) for r in index['date_ranges']]
+            recent_date_ranges = [tuple(r)
+                                  for r in index.get('recent_date_ranges', [])]
+
+            dates = np.load(self._file_name(
+                ticker, 'dates.npy'), mmap_mode=mmap_mode)
+            closes = np.load(self._file_name(
+                ticker, 'close.npy'), mmap_mode=mmap_mode)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            raise FileSystemError(
+                "Could not read %s prices from the price store" % ticker, e)
+
+        return (date_ranges, recent_date_ranges, dates, closes)
+
+    @contextmanager
+    def _ticker_lock(self, ticker: str, operation: int):
+        '''
+            Holds a shared (fcntl.LOCK_SH) or exclusive (fcntl.LOCK_EX) lock
+            on the ticker's lock file, which serializes access across processes
+        '''
+        try:
+            lock_file = open(self._file_name(ticker, 'lock'), 'a')
+        except Exception as e:
+            raise FileSystemError(
+                "Could not lock %s prices in the price store" % ticker, e)
+
+        try:
+            fcntl.flock(lock_file, operation)
+            yield
+        finally:
+            lock_file.close()
+
+    def _file_name(self, ticker: str, suffix: str):
+        return os.path.join(self.path, "%s.%s" % (ticker, suffix))
+
+    def _save_array(self, file_name: str, array: object):
+        '''
+            Saves an array to a temporary file and then moves it in place,
+            so that existing memory maps are never partially overwritten
+        '''
+        temp_file_name = "%s.%d.tmp" % (file_name, os.getpid())
+
+        with open(temp_file_name, 'wb') as file:
+            np.save(file, array)
+        os.replace(temp_file_name, file_name)
+
+    def _save_index(self, ticker: str, date_ranges: list, recent_date_ranges: list):
+        file_name = self._file_name(ticker, 'index.json')
+        temp_file_name = "%s.%d.tmp" % (file_name, os.getpid())
+
+        with open(temp_file_name, 'w') as file:
+            json.dump({
+                'date_ranges': date_ranges,
+                'recent_date_ranges': recent_date_ranges
+            }, file)
+        os.replace(temp_file_name, file_name)
+
+
+def missing_date_ranges(date_ranges: list, start_date: str, end_date: str):
+    """
+      Given a list of (start, end) date ranges, returns the portions of the
+      supplied start/end dates that are not covered by any of them.
+      All dates are formatted as YYYY-MM-DD.
+
+      Input
+
+      [('2019-10-05', '2019-10-10')], '2019-10-01', '2019-10-31'
+
+      Output
+
+      [('2019-10-01', '2019-10-04'), ('2019-10-11', '2019-10-31')]
+    """
+    one_day = timedelta(days=1)
+
+    cursor = _string_to_date(start_date)
+    end = _string_to_date(end_date)
+
+    missing = []
+
+    for (range_start, range_end) in sorted(date_ranges):
+        range_start = _string_to_date(range_start)
+        range_end = _string_to_date(range_end)
+
+        if cursor > end or range_start > end:
+            break
+        if range_end < cursor:
+            continue
+        if range_start > cursor:
+            missing.append((cursor, range_start - one_day))
+        cursor = range_end + one_day
+
+    if cursor <= end:
+        missing.append((cursor, end))
+
+    return [(_date_to_string(s), _date_to_string(e)) for (s, e) in missing]
+
+
+def merge_date_ranges(date_ranges: list):
+    """
+      Merges a list of (start, end) date ranges so that overlapping
+      or adjacent ranges are combined. All dates are formatted as YYYY-MM-DD.
+
+      Input
+
+      [('2019-10-01', '2019-10-10'), ('2019-10-11', '2019-10-20'), ('2019-12-01', '2019-12-31')]
+
+      Output
+
+      [('2019-10-01', '2019-10-20'), ('2019-12-01', '2019-12-31')]
+    """
+    merged = []
+
+    for (range_start, range_end) in sorted(date_ranges):
+        if len(merged) > 0:
+            (last_start, last_end) = merged[-1]
+            if _string_to_date(range_start) <= _string_to_date(last_end) + timedelta(days=1):
+                merged[-1] = (last_start, max(last_end, range_end))
+                continue
+        merged.append((range_start, range_end))
+
+    return merged
+
+
+def _empty_ticker():
+    return ([], [], np.array([], dtype=DATE_DTYPE), np.array([], dtype=CLOSE_DTYPE))
+
+
+def _string_to_date(date_str: str):
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def _date_to_string(date: object):
+    return date.strftime("%Y-%m-%d")
+
+
+# pylint: disable=invalid-name
+price_store = PriceStore(constants.PRICE_STORE_DIR)
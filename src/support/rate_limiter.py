@@ -0,0 +1,183 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module implements a client side rate limiter, used to keep the calls
+made to an external API (e.g. Intrinio) within the limits of the vendor.
+
+The limiter is a token bucket shared by all the threads calling the API.
+Tokens are added at a constant rate, up to the capacity of the bucket
+(the burst size), and every call consumes one, waiting until a token is
+available. When the API rejects a call anyway (e.g. with a 429 response),
+the limiter may be paused, so that all threads stop calling the API until
+it can be called again.
+
+    rate_limiter = RateLimiter(300, burst=10)
+
+    rate_limiter.acquire()
+    call_api()
+
+Limits are enforced within a single process.
+"""
+import threading
+from collections import deque
+from exception.exceptions import ValidationError
+from support.util import SystemClock
+
+# window (in seconds) used to measure the current throughput
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# waits shorter than this are ignored, so that floating point rounding
+# cannot leave acquire() waiting for a time that never elapses
+MIN_WAIT_SECONDS = 1e-6
+
+
+class RateLimiter():
+    """
+        A token bucket limiting the rate of calls made to an API
+    """
+
+    def __init__(self, requests_per_minute: float, **kwargs):
+        '''
+            Initializes the rate limiter
+
+            Parameters
+            ----------
+            requests_per_minute : float
+                the maximum sustained rate of calls
+            burst : int (kwargs)
+                (optional) the maximum number of calls that may be made at once
+                after the API was idle. Defaults to 1
+            clock : object (kwargs)
+                (optional) an object exposing time() and sleep(seconds).
+                Defaults to the SystemClock
+        '''
+        try:
+            burst = kwargs['burst']
+        except KeyError:
+            burst = 1
+
+        try:
+            self.clock = kwargs['clock']
+        except KeyError:
+            self.clock = SystemClock()
+
+        if requests_per_minute is None or requests_per_minute <= 0:
+            raise ValidationError(
+                "Invalid requests per minute: %s. Must be positive" % str(requests_per_minute), None)
+
+        if not isinstance(burst, int) or burst < 1:
+            raise ValidationError(
+                "Invalid burst: %s. Must be at least 1" % str(burst), None)
+
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.lock = threading.Lock()
+
+        self.tokens = float(burst)
+        self.last_refill_time = self.clock.time()
+
+        # calls are not allowed until this time. See pause()
+        self.paused_until = self.last_refill_time
+
+        # metrics
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttle_wait_seconds = 0.0
+        self.pauses = 0
+        self.recent_request_times = deque()
+
+    def _refill(self, now: float):
+        '''
+            Adds the tokens accrued since the last refill
+        '''
+        elapsed = now - self.last_refill_time
+        if elapsed > 0:
+            self.tokens = min(float(self.burst), self.tokens +
+                              elapsed * self.requests_per_minute / 60)
+            self.last_refill_time = now
+
+    def acquire(self):
+        '''
+            Waits until a call can be made, and consumes a token
+
+            Returns
+            -------
+            The number of seconds spent waiting
+        '''
+        waited_seconds = 0.0
+
+        while True:
+            with self.lock:
+                now = self.clock.time()
+                self._refill(now)
+
+                wait_seconds = self.paused_until - now
+                if wait_seconds <= MIN_WAIT_SECONDS:
+                    wait_seconds = (1 - self.tokens) * \
+                        60 / self.requests_per_minute
+
+                    if wait_seconds <= MIN_WAIT_SECONDS:
+                        self.tokens = max(self.tokens - 1, 0.0)
+                        self._record_request(now, waited_seconds)
+                        return waited_seconds
+
+            self.clock.sleep(wait_seconds)
+            waited_seconds += wait_seconds
+
+    def _record_request(self, now: float, waited_seconds: float):
+        '''
+            Updates the metrics after a token was acquired
+        '''
+        self.requests += 1
+        if waited_seconds > 0:
+            self.throttled_requests += 1
+            self.throttle_wait_seconds += waited_seconds
+
+        self.recent_request_times.append(now)
+        self._expire_request_times(now)
+
+    def _expire_request_times(self, now: float):
+        '''
+            Removes the request times that are outside the throughput window
+        '''
+        while len(self.recent_request_times) > 0 and \
+                self.recent_request_times[0] <= now - THROUGHPUT_WINDOW_SECONDS:
+            self.recent_request_times.popleft()
+
+    def pause(self, seconds: float):
+        '''
+            Stops all calls for the supplied number of seconds, e.g. after
+            the API responded with a 429 (Too Many Requests). The bucket is
+            emptied, so that calls resume at the sustained rate
+        '''
+        with self.lock:
+            now = self.clock.time()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.0
+            self.last_refill_time = max(self.last_refill_time, self.paused_until)
+            self.pauses += 1
+
+    def stats(self):
+        '''
+            Returns the rate limiter metrics as a dictionary, e.g.
+
+            {
+                "requests": 120,
+                "requests_last_minute": 60,
+                "throttled_requests": 12,
+                "throttle_wait_seconds": 5.2,
+                "pauses": 1
+            }
+
+            where requests_last_minute is the current throughput, and
+            throttled_requests the number of requests that had to wait
+        '''
+        with self.lock:
+            self._expire_request_times(self.clock.time())
+
+            return {
+                'requests': self.requests,
+                'requests_last_minute': len(self.recent_request_times),
+                'throttled_requests': self.throttled_requests,
+                'throttle_wait_seconds': round(self.throttle_wait_seconds, 6),
+                'pauses': self.pauses
+            }
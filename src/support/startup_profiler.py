@@ -0,0 +1,266 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module measures the startup cost of the service entry points, which
+run as short lived tasks, so that the time spent importing modules is a
+meaningful fraction of every run.
+
+When enabled, it records the import time of every module imported after
+it was started, and the time it took to make the first call to each of
+the external APIs (Intrinio, TDAmeritrade and AWS). A report is logged
+as a JSON document when the process exits.
+
+It must be started before any other import of the entry point, e.g.
+
+    import sys
+    from support import startup_profiler
+
+    if startup_profiler.PROFILE_STARTUP_ARG in sys.argv:
+        startup_profiler.start()
+
+    import ...
+"""
+import atexit
+import importlib.abc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+log = logging.getLogger()
+
+# command line argument that enables the profiler
+PROFILE_STARTUP_ARG = '--profile-startup'
+
+# number of packages and modules, sorted by import time, included in the report
+STARTUP_PROFILE_TOP_MODULES = 25
+
+# pylint: disable=invalid-name
+profiler = None
+
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    """
+        Records the time spent importing modules, by timing the loader of
+        every module found by the other finders, and the time of the
+        first call made to each external API.
+
+        Times are measured in seconds since the profiler was created.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+
+        # per thread import state
+        self.local = threading.local()
+
+        # module name => [self seconds, cumulative seconds]
+        self.module_times = {}
+
+        # time spent in top level imports, including nested ones
+        self.import_seconds = 0.0
+
+        # API name => seconds until the first call
+        self.first_api_calls = {}
+
+    def install(self):
+        '''
+            Adds the profiler to the import system
+        '''
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        '''
+            Removes the profiler from the import system
+        '''
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname: str, path: object, target: object = None):
+        '''
+            Finds the module spec using the remaining finders, and replaces its
+            loader with one that measures how long it takes to load the module
+        '''
+        if getattr(self.local, 'finding', False):
+            return None
+
+        self.local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self.local.finding = False
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self)
+
+        return spec
+
+    def time_import(self, module_name: str, load_function: object, *args):
+        '''
+            Executes one of the loader functions (create_module or exec_module)
+            of a module, and adds its duration to the module times.
+            Time spent importing other modules is subtracted from the self time
+        '''
+        try:
+            stack = self.local.stack
+        except AttributeError:
+            stack = self.local.stack = []
+
+        # the time spent importing nested modules
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return load_function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested_seconds = stack.pop()
+
+            with self.lock:
+                times = self.module_times.setdefault(module_name, [0.0, 0.0])
+                times[0] += elapsed - nested_seconds
+                times[1] += elapsed
+
+                if len(stack) > 0:
+                    stack[-1] += elapsed
+                else:
+                    self.import_seconds += elapsed
+
+    def record_api_call(self, api_name: str):
+        '''
+            Records the time of the first call made to the supplied API
+        '''
+        if api_name in self.first_api_calls:
+            return
+
+        with self.lock:
+            self.first_api_calls.setdefault(
+                api_name, time.perf_counter() - self.start_time)
+
+    def report(self):
+        '''
+            Returns the startup report as a dictionary, e.g.
+
+            {
+                "entry_point": "securities_recommendation_svc.py",
+                "elapsed_seconds": 12.5,
+                "import_seconds": 0.61,
+                "imported_modules": 812,
+                "first_api_call_seconds": {
+                    "intrinio": 0.72
+                },
+                "packages": [
+                    {"package": "pandas", "seconds": 0.31}
+                ],
+                "modules": [
+                    {"module": "pandas._libs.lib", "self_seconds": 0.02, "cumulative_seconds": 0.03}
+                ]
+            }
+
+            where packages contains the self import time of the top level
+            packages, and modules the self and cumulative import time of the
+            modules, limited to the STARTUP_PROFILE_TOP_MODULES slowest ones
+        '''
+        with self.lock:
+            module_times = dict(self.module_times)
+            first_api_calls = dict(self.first_api_calls)
+            import_seconds = self.import_seconds
+
+        package_times = {}
+        for (module_name, (self_seconds, _)) in module_times.items():
+            package = module_name.split('.')[0]
+            package_times[package] = package_times.get(
+                package, 0.0) + self_seconds
+
+        slowest_packages = sorted(package_times.items(),
+                                  key=lambda p: p[1], reverse=True)
+        slowest_modules = sorted(module_times.items(),
+                                 key=lambda m: m[1][0], reverse=True)
+
+        return {
+            'entry_point': os.path.basename(sys.argv[0]),
+            'elapsed_seconds': round(time.perf_counter() - self.start_time, 6),
+            'import_seconds': round(import_seconds, 6),
+            'imported_modules': len(module_times),
+            'first_api_call_seconds': {api_name: round(seconds, 6)
+                                       for (api_name, seconds) in first_api_calls.items()},
+            'packages': [{
+                'package': package,
+                'seconds': round(seconds, 6)
+            } for (package, seconds) in slowest_packages[:STARTUP_PROFILE_TOP_MODULES]],
+            'modules': [{
+                'module': module_name,
+                'self_seconds': round(self_seconds, 6),
+                'cumulative_seconds': round(cumulative_seconds, 6)
+            } for (module_name, (self_seconds, cumulative_seconds)) in slowest_modules[:STARTUP_PROFILE_TOP_MODULES]]
+        }
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """
+        Wraps the loader of a module, and times its create_module and
+        exec_module functions. The original loader is restored before the
+        module is executed
+    """
+
+    def __init__(self, loader: object, startup_profiler: StartupProfiler):
+        self.loader = loader
+        self.startup_profiler = startup_profiler
+
+    def create_module(self, spec: object):
+        return self.startup_profiler.time_import(spec.name, self.loader.create_module, spec)
+
+    def exec_module(self, module: object):
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+
+        self.startup_profiler.time_import(
+            module.__name__, self.loader.exec_module, module)
+
+    def __getattr__(self, name: str):
+        return getattr(self.loader, name)
+
+
+def start():
+    '''
+        Starts the startup profiler, and logs its report when the process exits
+    '''
+    global profiler
+
+    if profiler is not None:
+        return
+
+    profiler = StartupProfiler()
+    profiler.install()
+
+    atexit.register(log_report)
+
+
+def record_api_call(api_name: str):
+    '''
+        Records the first call made to an external API, e.g. 'intrinio'.
+        Does nothing unless the profiler was started
+    '''
+    if profiler is not None:
+        profiler.record_api_call(api_name)
+
+
+def log_report():
+    '''
+        Logs the startup report as a JSON document, and stops the profiler
+    '''
+    if profiler is None:
+        return
+
+    profiler.uninstall()
+    log.info("Startup profile: %s" % json.dumps(profiler.report()))
@@ -0,0 +1,347 @@
+"""Author: Mark Hanegraaff -- 2020
+
+This module implements a lightweight timing API, used to measure how long
+the phases of a service take, e.g.
+
+    with timing.span('strategy.load_financial_data'):
+        ...
+
+    @timing.timed()
+    def get_latest_close_price(...):
+        ...
+
+Spans are aggregated by name, so that functions called many times, e.g. once
+per ticker, produce a single timing record with the number of calls, their
+total, mean and maximum duration, a latency histogram and the number of
+calls that raised an exception.
+
+Services may also register counters (e.g. cache hits and misses) that are
+reported along with the timing records. The report is logged as JSON
+records, one per line, or dumped as a single JSON document or in the
+Prometheus text exposition format, either on demand or when the service exits.
+"""
+import atexit
+import bisect
+import functools
+import json
+import logging
+import numbers
+import threading
+import time
+from contextlib import contextmanager
+from exception.exceptions import ValidationError, FileSystemError
+
+log = logging.getLogger()
+
+# upper bounds (in seconds) of the latency histogram buckets. Durations
+# longer than the last bound are only counted in the '+Inf' bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# report formats supported by dump_report()
+REPORT_FORMAT_JSON = 'json'
+REPORT_FORMAT_PROMETHEUS = 'prometheus'
+REPORT_FORMATS = (REPORT_FORMAT_JSON, REPORT_FORMAT_PROMETHEUS)
+
+# prefix of the Prometheus metric names
+PROMETHEUS_PREFIX = 'stock_advisor'
+
+# pylint: disable=invalid-name
+# span name => [count, errors, total seconds, max seconds, bucket counts]
+span_stats = {}
+
+# counters name => function returning a dictionary of counters
+counter_sources = {}
+
+stats_lock = threading.Lock()
+
+report_registered = False
+
+
+def record(span_name: str, seconds: float, error: bool = False):
+    '''
+        Adds a measurement to the supplied span
+    '''
+    with stats_lock:
+        try:
+            stats = span_stats[span_name]
+        except KeyError:
+            stats = span_stats[span_name] = [
+                0, 0, 0.0, 0.0, [0] * len(LATENCY_BUCKETS)]
+
+        stats[0] += 1
+        stats[2] += seconds
+        if error:
+            stats[1] += 1
+        if seconds > stats[3]:
+            stats[3] = seconds
+
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        if bucket < len(LATENCY_BUCKETS):
+            stats[4][bucket] += 1
+
+
+@contextmanager
+def span(span_name: str):
+    '''
+        Measures the duration of the enclosed block of code.
+        Blocks that raise an exception are counted as errors
+    '''
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record(span_name, time.perf_counter() - start, True)
+        raise
+
+    record(span_name, time.perf_counter() - start)
+
+
+def timed(span_name: str = None):
+    '''
+        Decorator that measures the duration of every call to a function.
+        The span name defaults to {module}.{function}, e.g.
+        'intrinio_data.get_latest_close_price'
+    '''
+    def decorator(func):
+        name = span_name
+        if name is None:
+            name = "%s.%s" % (func.__module__.split('.')[-1], func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def register_counters(counters_name: str, stats_function: object):
+    '''
+        Registers a function returning a dictionary of counters, e.g.
+        FinancialCache.stats(), that will be included in the report
+    '''
+    with stats_lock:
+        counter_sources[counters_name] = stats_function
+
+
+def reset():
+    '''
+        Clears all timing records and registered counters
+    '''
+    with stats_lock:
+        span_stats.clear()
+        counter_sources.clear()
+
+
+def report():
+    '''
+        Returns the timing and counter records, sorted by span name, e.g.
+
+        [
+            {
+                "span": "intrinio_data.get_latest_close_price",
+                "count": 30,
+                "errors": 0,
+                "total_seconds": 1.5,
+                "mean_seconds": 0.05,
+                "max_seconds": 0.2,
+                "buckets": {"0.005": 0, "0.01": 0, ..., "+Inf": 30}
+            },
+            {
+                "counters": "financial_cache",
+                "memory_hits": 10,
+                "disk_hits": 2,
+                "misses": 1
+            }
+        ]
+
+        where buckets is the cumulative latency histogram, i.e. the number
+        of calls that took at most the number of seconds of each bucket
+    '''
+    with stats_lock:
+        stats_list = sorted([(name, stats[:4] + [list(stats[4])])
+                             for (name, stats) in span_stats.items()])
+        sources = list(counter_sources.items())
+
+    records = [{
+        'span': name,
+        'count': count,
+        'errors': errors,
+        'total_seconds': round(total_seconds, 6),
+        'mean_seconds': round(total_seconds / count, 6),
+        'max_seconds': round(max_seconds, 6),
+        'buckets': _cumulative_buckets(count, bucket_counts)
+    } for (name, (count, errors, total_seconds, max_seconds, bucket_counts)) in stats_list]
+
+    for (counters_name, stats_function) in sources:
+        counters = {'counters': counters_name}
+        try:
+            counters.update(stats_function())
+        except Exception as e:
+            counters['error'] = str(e)
+        records.append(counters)
+
+    return records
+
+
+def _cumulative_buckets(count: int, bucket_counts: list):
+    '''
+        Converts the bucket counts of a span into a cumulative histogram
+        keyed by the bucket upper bound, e.g. {"0.005": 1, ..., "+Inf": 3}
+    '''
+    buckets = {}
+    cumulative_count = 0
+    for (upper_bound, bucket_count) in zip(LATENCY_BUCKETS, bucket_counts):
+        cumulative_count += bucket_count
+        buckets[str(upper_bound)] = cumulative_count
+    buckets['+Inf'] = count
+
+    return buckets
+
+
+def _prometheus_label(value: str):
+    '''
+        Escapes a Prometheus label value
+    '''
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_report():
+    '''
+        Returns the report in the Prometheus text exposition format. Spans are
+        reported as a histogram and an error counter labeled by span name,
+        and the numeric values of the registered counters as gauges
+        labeled by counters name and counter, e.g.
+
+        stock_advisor_span_seconds_bucket{span="td_ameritrade.get_order",le="0.5"} 3
+        stock_advisor_span_seconds_sum{span="td_ameritrade.get_order"} 0.74
+        stock_advisor_span_seconds_count{span="td_ameritrade.get_order"} 4
+        stock_advisor_span_errors_total{span="td_ameritrade.get_order"} 0
+        stock_advisor_counter{counters="financial_cache",counter="misses"} 1
+    '''
+    records = report()
+    span_records = [r for r in records if 'span' in r]
+    counter_records = [r for r in records if 'counters' in r]
+
+    seconds_metric = "%s_span_seconds" % PROMETHEUS_PREFIX
+    errors_metric = "%s_span_errors_total" % PROMETHEUS_PREFIX
+    counter_metric = "%s_counter" % PROMETHEUS_PREFIX
+
+    lines = [
+        "# HELP %s Duration of the instrumented operations" % seconds_metric,
+        "# TYPE %s histogram" % seconds_metric
+    ]
+    for span_record in span_records:
+        span_label = 'span="%s"' % _prometheus_label(span_record['span'])
+        for (upper_bound, bucket_count) in span_record['buckets'].items():
+            lines.append('%s_bucket{%s,le="%s"} %d' %
+                         (seconds_metric, span_label, upper_bound, bucket_count))
+        lines.append("%s_sum{%s} %s" %
+                     (seconds_metric, span_label, repr(span_record['total_seconds'])))
+        lines.append("%s_count{%s} %d" %
+                     (seconds_metric, span_label, span_record['count']))
+
+    lines.append(
+        "# HELP %s Number of instrumented operations that failed" % errors_metric)
+    lines.append("# TYPE %s counter" % errors_metric)
+    for span_record in span_records:
+        lines.append('%s{span="%s"} %d' % (errors_metric, _prometheus_label(
+            span_record['span']), span_record['errors']))
+
+    lines.append("# HELP %s Counters registered by the service" %
+                 counter_metric)
+    lines.append("# TYPE %s gauge" % counter_metric)
+    for counter_record in counter_records:
+        counters_label = _prometheus_label(counter_record['counters'])
+        for (counter_name, value) in counter_record.items():
+            if counter_name == 'counters' or isinstance(value, bool) \
+                    or not isinstance(value, numbers.Real):
+                continue
+            lines.append('%s{counters="%s",counter="%s"} %s' % (
+                counter_metric, counters_label, _prometheus_label(counter_name), repr(value)))
+
+    return "\n".join(lines) + "\n"
+
+
+def dump_report(report_format: str, file_name: str = None):
+    '''
+        Writes the report in the supplied format (see REPORT_FORMATS)
+        to a file, or logs it if no file name is supplied.
+
+        Parameters
+        ----------
+        report_format : str
+            'json' for a single JSON document containing all records,
+            or 'prometheus' for the Prometheus text exposition format
+        file_name : str
+            (optional) the file the report is written to
+    '''
+    if report_format == REPORT_FORMAT_JSON:
+        report_text = json.dumps(report(), indent=2)
+    elif report_format == REPORT_FORMAT_PROMETHEUS:
+        report_text = prometheus_report()
+    else:
+        raise ValidationError("Invalid report format: %s. Allowed values are %s" %
+                              (str(report_format), str(REPORT_FORMATS)), None)
+
+    if file_name is None:
+        log.info("Metrics:\n%s" % report_text)
+        return
+
+    try:
+        with open(file_name, 'w') as file:
+            file.write(report_text)
+    except Exception as e:
+        raise FileSystemError("Could not write metrics to %s" % file_name, e)
+
+    log.info("Metrics were written to %s" % file_name)
+
+
+def log_report():
+    '''
+        Logs every record returned by report() as a JSON document
+    '''
+    for timing_record in report():
+        log.info("Timing: %s" % json.dumps(timing_record))
+
+
+def log_report_at_exit():
+    '''
+        Logs the report when the application exits
+    '''
+    _register_report_at_exit(log_report)
+
+
+def dump_report_at_exit(report_format: str, file_name: str = None):
+    '''
+        Dumps the report when the application exits. See dump_report()
+    '''
+    if report_format not in REPORT_FORMATS:
+        raise ValidationError("Invalid report format: %s. Allowed values are %s" %
+                              (str(report_format), str(REPORT_FORMATS)), None)
+
+    def dump_report_at_exit_function():
+        try:
+            dump_report(report_format, file_name)
+        except FileSystemError as fse:
+            log.warning(str(fse))
+
+    _register_report_at_exit(dump_report_at_exit_function)
+
+
+def _register_report_at_exit(report_function: object):
+    '''
+        Registers the function that reports the timing records at exit.
+        Only the first function is registered
+    '''
+    global report_registered
+
+    with stats_lock:
+        if report_registered:
+            return
+        report_registered = True
+
+    atexit.register(report_function)
@@ -4,6 +4,7 @@ import json
 from datetime import datetime
 import pytz
 import os
+import time
 from exception.exceptions import ValidationError, FileSystemError
 
 
@@ -61,3 +62,36 @@ def trunc(date: datetime):
         truncates a date object and removes the time component
     '''
     return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_period(period_str: str):
+    '''
+        Converts a period string in yyyy/mm format into a (year, month) tuple
+    '''
+    try:
+        period = datetime.strptime(period_str, '%Y/%m')
+    except Exception:
+        raise ValidationError(
+            "%s is invalid. Expecting 'yyyy/mm' format" % period_str, None)
+
+    return (period.year, period.month)
+
+
+class SystemClock():
+    """
+        A clock backed by the system's monotonic time. Components that
+        wait (e.g. the OrderTracker and the RateLimiter) accept any object
+        exposing the same methods, so that tests do not require real sleeps
+    """
+
+    def time(self):
+        '''
+            returns the current time in seconds
+        '''
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        '''
+            suspends the current thread for the supplied number of seconds
+        '''
+        time.sleep(seconds)
@@ -0,0 +1,19 @@
+"""Author: Mark Hanegraaff -- 2020
+"""
+
+
+class FakeClock(object):
+    """
+        A clock that advances its time when sleeping, instead of blocking
+    """
+
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
@@ -27,6 +27,25 @@ class TestConnectorsAWSServiceWrapper(unittest.TestCase):
         list_exports tests
     '''
 
+    def test_clients_created_on_first_use(self):
+        s3_client = aws_service_wrapper.S3_CLIENT
+
+        self.assertIs(aws_service_wrapper._aws_client('S3_CLIENT'), s3_client)
+        self.assertIs(aws_service_wrapper.aws_clients['S3_CLIENT'], s3_client)
+
+        with self.assertRaises(AttributeError):
+            aws_service_wrapper.INVALID_CLIENT
+
+    def test_client_creation_error(self):
+        with patch.dict(aws_service_wrapper.aws_clients, clear=True), \
+                patch.dict(aws_service_wrapper.AWS_CLIENTS, {'SNS_CLIENT': 'invalid-service'}):
+            with self.assertRaises(AWSError):
+                aws_service_wrapper.SNS_CLIENT
+
+            with self.assertRaises(AWSError):
+                aws_service_wrapper.sns_publish_notification(
+                    'topic', 'subject', 'message')
+
     def test_cf_list_exports_with_boto_exception(self):
         with patch.object(aws_service_wrapper.CF_CLIENT, 'get_paginator',
                           side_effect=botocore.exceptions.BotoCoreError()):
@@ -4,12 +4,18 @@ Testing class for the connectors.intrinio_data module
 """
 
 import unittest
+import os
+import shutil
+import tempfile
 import requests
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from intrinio_sdk.rest import ApiException
 from exception.exceptions import ValidationError, DataError
 from connectors import intrinio_data
 from connectors import intrinio_util
+from support.price_store import PriceStore
+from support.rate_limiter import RateLimiter
+from test.fake_clock import FakeClock
 from test import nop
 import datetime
 
@@ -20,6 +26,12 @@ class TestConnectorsIntrinioData(unittest.TestCase):
         Testing class for the connectors.intrinio_data module
     """
 
+    def setUp(self):
+        self.test_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_path, ignore_errors=True)
+
     '''
         API Endpoint Test
     '''
@@ -45,6 +57,43 @@ class TestConnectorsIntrinioData(unittest.TestCase):
                 intrinio_data._get_company_historical_data(
                     'NON-EXISTENT-TICKER', start_date, start_date, 'tag')
 
+    def test_read_financial_metric_multi_with_api_exception(self):
+        with patch.object(intrinio_data.COMPANY_API, 'get_company_historical_data',
+                          side_effect=ApiException("Server Error")), \
+                patch('support.financial_cache.cache', new=nop.Nop()):
+
+            with self.assertRaises(DataError):
+                intrinio_data.get_company_historical_data_multi(
+                    'NON-EXISTENT-TICKER', datetime.date(2019, 9, 1),
+                    datetime.date(2019, 9, 30), ['tag_a', 'tag_b'])
+
+    def test_read_financial_metric_multi_no_tags(self):
+        with self.assertRaises(ValidationError):
+            intrinio_data.get_company_historical_data_multi(
+                'AAPL', datetime.date(2019, 9, 1), datetime.date(2019, 9, 30), [])
+
+    def test_read_financial_metric_multi_aggregates_by_tag(self):
+        historical_data = {
+            'tag_a': [
+                {'date': datetime.datetime(2019, 9, 1), 'value': 10},
+                {'date': datetime.datetime(2019, 9, 15), 'value': 20}
+            ],
+            'tag_b': [
+                {'date': datetime.datetime(2019, 9, 1), 'value': 1}
+            ]
+        }
+
+        with patch.object(intrinio_data, '_get_company_historical_data_multi',
+                          return_value=historical_data):
+            self.assertDictEqual(
+                intrinio_data.get_company_historical_data_multi(
+                    'AAPL', datetime.date(2019, 9, 1), datetime.date(2019, 9, 30), ['tag_a', 'tag_b']),
+                {
+                    'tag_a': {2019: {9: 15.0}},
+                    'tag_b': {2019: {9: 1.0}}
+                }
+            )
+
     def test_aggregate_by_year_month_1(self):
 
         input = [
@@ -63,6 +112,17 @@ class TestConnectorsIntrinioData(unittest.TestCase):
         self.assertDictEqual(
             expected_out, intrinio_data._aggregate_by_year_month(input))
 
+    def test_aggregate_by_year_month_missing_values(self):
+
+        input = [
+            {'date': datetime.datetime(2019, 9, 1), 'value': 10},
+            {'date': datetime.datetime(2019, 9, 15), 'value': None},
+            {'date': datetime.datetime(2019, 10, 12), 'value': None}
+        ]
+
+        self.assertDictEqual(
+            {2019: {9: 10}}, intrinio_data._aggregate_by_year_month(input))
+
     def test_aggregate_by_year_month_no_input(self):
 
         input = []
@@ -152,3 +212,251 @@ class TestConnectorsIntrinioData(unittest.TestCase):
             with self.assertRaises(DataError):
                 intrinio_data.get_latest_close_price(
                     'XXX', datetime.date(2018, 1, 1), 5)
+
+    def test_daily_stock_prices_reads_all_pages(self):
+        def price(date: datetime.date, close: float):
+            return MagicMock(date=date, close=close)
+
+        page_1 = MagicMock(stock_prices=[price(datetime.date(2019, 10, 2), 101)],
+                           next_page="page-2")
+        page_2 = MagicMock(stock_prices=[price(datetime.date(2019, 10, 1), 100)],
+                           next_page=None)
+
+        with patch.object(intrinio_data.SECURITY_API, 'get_security_stock_prices',
+                          side_effect=[page_1, page_2]) as get_prices, \
+                patch.object(intrinio_data, 'price_store', new=PriceStore(self.test_path)):
+
+            price_dict = intrinio_data.get_daily_stock_close_prices(
+                'AAPL', datetime.date(2019, 10, 1), datetime.date(2019, 10, 2))
+
+            self.assertDictEqual(price_dict, {
+                '2019-10-01': 100,
+                '2019-10-02': 101
+            })
+            self.assertEqual(get_prices.call_count, 2)
+
+    def test_daily_stock_prices_from_price_store(self):
+        test_store = PriceStore(self.test_path)
+        test_store.write('MSFT', {
+            '2019-09-30': 99,
+            '2019-10-01': 100,
+            '2019-10-02': 101,
+            '2019-10-03': 102
+        }, [('2019-09-30', '2019-10-31')])
+
+        with patch.object(intrinio_data.SECURITY_API, 'get_security_stock_prices',
+                          side_effect=ApiException("Not Found")), \
+                patch.object(intrinio_data, 'price_store', new=test_store):
+
+            self.assertDictEqual(intrinio_data.get_daily_stock_close_prices(
+                'MSFT', datetime.date(2019, 10, 2), datetime.date(2019, 10, 5)), {
+                '2019-10-02': 101,
+                '2019-10-03': 102
+            })
+            self.assertTupleEqual(intrinio_data.get_latest_close_price(
+                'MSFT', datetime.date(2019, 10, 5), 5), ('2019-10-03', 102))
+
+    def test_latest_close_prices_batch(self):
+        test_store = PriceStore(self.test_path)
+        test_store.write('IBM', {
+            '2019-10-01': 100,
+            '2019-10-02': 101,
+            '2019-10-07': 102
+        }, [('2019-09-01', '2019-10-31')])
+
+        with patch.object(intrinio_data.SECURITY_API, 'get_security_stock_prices',
+                          side_effect=ApiException("Not Found")), \
+                patch.object(intrinio_data, 'price_store', new=test_store):
+
+            prices = intrinio_data.get_latest_close_prices(['IBM'], [
+                datetime.date(2019, 10, 1), datetime.date(2019, 10, 5), datetime.date(2019, 10, 8)], 5)
+
+            self.assertListEqual(prices.tolist(), [[100, 101, 102]])
+
+            with self.assertRaises(DataError):
+                intrinio_data.get_latest_close_prices(
+                    ['IBM'], [datetime.date(2019, 9, 30)], 5)
+
+    def test_latest_close_prices_batch_invalid_lookback(self):
+        with self.assertRaises(ValidationError):
+            intrinio_data.get_latest_close_prices(
+                ['AAPL'], [datetime.date(2018, 1, 1)], 25)
+
+    '''
+        Cache format tests
+    '''
+
+    def test_cache_expiration(self):
+        yesterday = intrinio_util.date_to_string(
+            datetime.datetime.now() - datetime.timedelta(days=1))
+        today = intrinio_util.date_to_string(datetime.datetime.now())
+
+        self.assertIsNone(intrinio_data._cache_expiration('2019-10-31'))
+        self.assertIsNone(intrinio_data._cache_expiration(yesterday))
+        self.assertEqual(intrinio_data._cache_expiration(
+            today), intrinio_data.INTRINIO_CACHE_RECENT_TTL_SECONDS)
+
+    def test_encode_decode_historical_data(self):
+        historical_data_dict = [
+            {'date': datetime.date(2018, 9, 29), 'value': 123.5},
+            {'date': datetime.date(2017, 9, 30), 'value': None}
+        ]
+
+        encoded = intrinio_data._encode_historical_data(historical_data_dict)
+
+        self.assertIsInstance(encoded[0], bytes)
+        self.assertIsInstance(encoded[1], bytes)
+        self.assertListEqual(intrinio_data._decode_historical_data(
+            encoded), historical_data_dict)
+
+        # 8 byte, little endian dates on every platform
+        self.assertEqual(encoded[0][:8], (736966).to_bytes(8, 'little'))
+        self.assertEqual(len(encoded[1]), 16)
+
+    def test_compact_and_transform_financial_stmt(self):
+        def financial(tag: str, value: float):
+            data_point = MagicMock(value=value)
+            data_point.data_tag.tag = tag
+            return data_point
+
+        compact_financials = intrinio_data._compact_financial_stmt([
+            financial('totalrevenue', 100.0),
+            financial('freecashflow', 10.0)
+        ])
+
+        self.assertTupleEqual(compact_financials, (
+            ('totalrevenue', 100.0),
+            ('freecashflow', 10.0)
+        ))
+        self.assertDictEqual(intrinio_data._transform_financial_stmt(
+            compact_financials, ['freecashflow']), {'freecashflow': 10.0})
+        self.assertDictEqual(intrinio_data._transform_financial_stmt(
+            compact_financials, None), {'totalrevenue': 100.0, 'freecashflow': 10.0})
+
+    def test_api_clients_created_on_first_use(self):
+        company_api = intrinio_data.COMPANY_API
+
+        self.assertIs(intrinio_data._api_client('COMPANY_API'), company_api)
+        self.assertIs(intrinio_data.api_clients['COMPANY_API'], company_api)
+        self.assertGreaterEqual(
+            company_api.api_client.configuration.connection_pool_maxsize, 10)
+
+        with self.assertRaises(AttributeError):
+            intrinio_data.INVALID_API
+
+    def test_api_client_without_api_key(self):
+        with patch.dict(intrinio_data.api_clients, clear=True), \
+                patch.dict(os.environ):
+            del os.environ['INTRINIO_API_KEY']
+
+            with self.assertRaises(ValidationError):
+                intrinio_data.SECURITY_API
+
+            self.assertDictEqual(intrinio_data.api_clients, {})
+
+    def test_set_api_url(self):
+        original_url = intrinio_data.INTRINIO_API_URL
+        security_api = intrinio_data.SECURITY_API
+
+        try:
+            with patch.dict(intrinio_data.api_clients, {'SECURITY_API': security_api}, clear=True):
+                intrinio_data.set_api_url('http://127.0.0.1:5000')
+
+                self.assertEqual(
+                    security_api.api_client.configuration.host, 'http://127.0.0.1:5000')
+                self.assertEqual(intrinio_data.FUNDAMENTALS_API.api_client.configuration.host,
+                                 'http://127.0.0.1:5000')
+        finally:
+            intrinio_data.set_api_url(original_url)
+
+        self.assertEqual(security_api.api_client.configuration.host, original_url)
+
+    def test_api_client_requests_are_rate_limited(self):
+        api_client = intrinio_data.COMPANY_API.api_client
+
+        self.assertIs(api_client.request.func,
+                      intrinio_data._rate_limited_request)
+        self.assertFalse(api_client.configuration.retries['allow'])
+        self.assertFalse(
+            api_client.rest_client.pool_manager.connection_pool_kw['retries'].respect_retry_after_header)
+
+    def test_share_rate_limit(self):
+        with patch.object(intrinio_data, 'rate_limiter', None):
+            intrinio_data.share_rate_limit(4)
+
+            self.assertAlmostEqual(intrinio_data.rate_limiter.requests_per_minute,
+                                   intrinio_data.INTRINIO_MAX_REQUESTS_PER_MINUTE / 4)
+            self.assertEqual(intrinio_data.rate_limiter.burst,
+                             max(1, intrinio_data.INTRINIO_MAX_BURST // 4))
+
+            intrinio_data.share_rate_limit(100)
+            self.assertEqual(intrinio_data.rate_limiter.burst, 1)
+
+            with self.assertRaises(ValidationError):
+                intrinio_data.share_rate_limit(0)
+
+    def test_rate_limited_request_retries(self):
+        clock = FakeClock()
+        rate_limiter = RateLimiter(60, burst=10, clock=clock)
+        rate_limited = ApiException(status=429)
+        rate_limited.headers = {'Retry-After': '5'}
+        request_function = MagicMock(side_effect=[rate_limited, 'response'])
+
+        with patch.object(intrinio_data, 'rate_limiter', rate_limiter):
+            self.assertEqual(intrinio_data._rate_limited_request(
+                request_function, 'GET', 'url', headers={}), 'response')
+
+        request_function.assert_called_with('GET', 'url', headers={})
+        self.assertEqual(request_function.call_count, 2)
+        # calls resume at the sustained rate after the pause
+        self.assertListEqual(clock.sleeps, [5, 1])
+        self.assertEqual(rate_limiter.stats()['pauses'], 1)
+
+    def test_rate_limited_request_gives_up(self):
+        clock = FakeClock()
+        request_function = MagicMock(side_effect=ApiException(status=429))
+
+        with patch.object(intrinio_data, 'rate_limiter', RateLimiter(60, burst=10, clock=clock)), \
+                patch.object(intrinio_data, '_retry_delay', return_value=0.7):
+            with self.assertRaises(ApiException):
+                intrinio_data._rate_limited_request(
+                    request_function, 'GET', 'url')
+
+        self.assertEqual(request_function.call_count,
+                         intrinio_data.INTRINIO_MAX_RETRIES + 1)
+        self.assertEqual(len(clock.sleeps), intrinio_data.INTRINIO_MAX_RETRIES * 2)
+
+    def test_rate_limited_request_other_errors(self):
+        request_function = MagicMock(side_effect=ApiException(status=404))
+
+        with patch.object(intrinio_data, 'rate_limiter', RateLimiter(60, clock=FakeClock())):
+            with self.assertRaises(ApiException):
+                intrinio_data._rate_limited_request(
+                    request_function, 'GET', 'url')
+
+        self.assertEqual(request_function.call_count, 1)
+
+    def test_retry_delay(self):
+        api_exception = ApiException(status=429)
+
+        for attempt in range(0, 4):
+            delay = intrinio_data._retry_delay(api_exception, attempt)
+            self.assertGreaterEqual(delay, 2 ** attempt / 2)
+            self.assertLessEqual(delay, 2 ** attempt)
+
+        self.assertLessEqual(intrinio_data._retry_delay(api_exception, 20),
+                             intrinio_data.INTRINIO_RETRY_MAX_DELAY)
+
+        api_exception.headers = {'Retry-After': '3'}
+        self.assertEqual(intrinio_data._retry_delay(api_exception, 0), 3)
+
+        api_exception.headers = {'Retry-After': '3600'}
+        self.assertEqual(intrinio_data._retry_delay(api_exception, 0),
+                         intrinio_data.INTRINIO_RETRY_MAX_DELAY)
+
+        api_exception.headers = {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+        self.assertEqual(intrinio_data._retry_delay(api_exception, 0), 0)
+
+    def test_shutdown_without_thread_pools(self):
+        with patch.dict(intrinio_data.api_clients, {'SECURITY_API': intrinio_data.SECURITY_API}, clear=True):
+            intrinio_data.shutdown()
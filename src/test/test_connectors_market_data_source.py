@@ -0,0 +1,188 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the connectors.market_data_source module
+"""
+import unittest
+import pickle
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+from connectors import intrinio_data, market_data_source
+from connectors.market_data_source import IntrinioDataSource, LocalFileDataSource
+from exception.exceptions import ValidationError, DataError, FileSystemError
+from services import strategy_benchmark_svc
+from simulator import intrinio_simulator
+from simulator.intrinio_simulator import RecordedFixtures
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+
+
+class TestConnectorsMarketDataSource(unittest.TestCase):
+    """
+        Testing class for the connectors.market_data_source module
+    """
+
+    dataset = {
+        'AAPL': {
+            'historical_data': {
+                'zacks_target_price_mean': [
+                    {'date': '2019-08-30', 'value': 90.0},
+                    {'date': '2019-09-01', 'value': 110.0},
+                    {'date': '2019-09-15', 'value': 130.0},
+                    {'date': '2019-09-20', 'value': None},
+                    {'date': '2019-10-01', 'value': 140.0}
+                ],
+                'zacks_target_price_std_dev': [
+                    {'date': '2019-09-01', 'value': 10.0},
+                    {'date': '2019-10-01', 'value': 20.0}
+                ]
+            },
+            'prices': [
+                {'date': '2019-09-30', 'close': 100.0},
+                {'date': '2019-09-26', 'close': 98.0},
+                {'date': '2019-09-27', 'close': 99.0},
+                {'date': '2019-10-01', 'close': 101.0}
+            ]
+        },
+        'MSFT': {
+            'historical_data': {
+                'zacks_target_price_mean': [
+                    {'date': '2019-09-01', 'value': 200.0}
+                ],
+                'zacks_target_price_std_dev': [
+                    {'date': '2019-09-01', 'value': 40.0}
+                ]
+            },
+            'prices': [
+                {'date': '2019-09-27', 'close': 150.0},
+                {'date': '2019-10-01', 'close': 160.0}
+            ]
+        },
+        'GE': {
+            'historical_data': {},
+            'prices': []
+        }
+    }
+
+    tags = ['zacks_target_price_mean', 'zacks_target_price_std_dev']
+
+    def setUp(self):
+        self.dataset_dir = tempfile.TemporaryDirectory()
+        intrinio_simulator.save_fixtures(self.dataset_dir.name, self.dataset)
+        self.data_source = LocalFileDataSource(self.dataset_dir.name)
+
+    def tearDown(self):
+        self.dataset_dir.cleanup()
+
+    def test_invalid_dataset_dir(self):
+        with self.assertRaises(FileSystemError):
+            LocalFileDataSource('/does/not/exist')
+
+    def test_historical_data_multi(self):
+        self.assertDictEqual(self.data_source.get_company_historical_data_multi(
+            'AAPL', datetime(2019, 9, 1), datetime(2019, 9, 30), self.tags), {
+            'zacks_target_price_mean': {
+                2019: {
+                    9: 120.0
+                }
+            },
+            'zacks_target_price_std_dev': {
+                2019: {
+                    9: 10.0
+                }
+            }
+        })
+
+    def test_historical_data_multi_missing(self):
+        with self.assertRaises(ValidationError):
+            self.data_source.get_company_historical_data_multi(
+                'AAPL', datetime(2019, 9, 1), datetime(2019, 9, 30), [])
+
+        with self.assertRaises(DataError):
+            self.data_source.get_company_historical_data_multi(
+                'GE', datetime(2019, 9, 1), datetime(2019, 9, 30), self.tags)
+
+        with self.assertRaises(DataError):
+            self.data_source.get_company_historical_data_multi(
+                'AAPL', datetime(2019, 11, 1), datetime(2019, 11, 30), self.tags)
+
+        with self.assertRaises(DataError):
+            self.data_source.get_company_historical_data_multi(
+                'XOM', datetime(2019, 9, 1), datetime(2019, 9, 30), self.tags)
+
+    def test_latest_close_price(self):
+        self.assertTupleEqual(self.data_source.get_latest_close_price(
+            'AAPL', datetime(2019, 9, 29), 5), ('2019-09-27', 99.0))
+        self.assertTupleEqual(self.data_source.get_latest_close_price(
+            'AAPL', datetime(2019, 10, 1), 5), ('2019-10-01', 101.0))
+
+        with self.assertRaises(DataError):
+            self.data_source.get_latest_close_price(
+                'AAPL', datetime(2019, 10, 20), 5)
+
+        with self.assertRaises(DataError):
+            self.data_source.get_latest_close_price(
+                'AAPL', datetime(2019, 9, 1), 5)
+
+        with self.assertRaises(ValidationError):
+            self.data_source.get_latest_close_price(
+                'AAPL', datetime(2019, 9, 29), 0)
+
+    def test_latest_close_prices(self):
+        prices = self.data_source.get_latest_close_prices(
+            ['AAPL', 'MSFT'], [datetime(2019, 9, 29), datetime(2019, 10, 2)], 5)
+
+        self.assertListEqual(prices.tolist(), [
+            [99.0, 101.0],
+            [150.0, 160.0]
+        ])
+
+        with self.assertRaises(DataError):
+            self.data_source.get_latest_close_prices(
+                ['AAPL', 'GE'], [datetime(2019, 9, 29)], 5)
+
+        with self.assertRaises(ValidationError):
+            self.data_source.get_latest_close_prices(['AAPL'], [], 5)
+
+    def test_pickle(self):
+        self.data_source.get_latest_close_price(
+            'AAPL', datetime(2019, 9, 29), 5)
+
+        data_source = pickle.loads(pickle.dumps(self.data_source))
+
+        self.assertEqual(data_source.path, self.dataset_dir.name)
+        self.assertDictEqual(data_source.loaded_tickers, {})
+
+    def test_intrinio_data_source(self):
+        with patch.object(intrinio_data, 'get_latest_close_price',
+                          return_value=('2019-09-27', 99.0)) as mock:
+            self.assertTupleEqual(IntrinioDataSource().get_latest_close_price(
+                'AAPL', datetime(2019, 9, 29), 5), ('2019-09-27', 99.0))
+
+        mock.assert_called_once_with('AAPL', datetime(2019, 9, 29), 5)
+        self.assertIsInstance(
+            market_data_source.data_source, IntrinioDataSource)
+
+    def test_local_and_intrinio_data_are_equivalent(self):
+        ticker_list = ['AAPL', 'MSFT']
+
+        def read(data_source: object):
+            return ([data_source.get_company_historical_data_multi(
+                ticker, datetime(2019, 9, 1), datetime(2019, 10, 31), self.tags) for ticker in ticker_list],
+                data_source.get_latest_close_price(
+                    'AAPL', datetime(2019, 9, 29), 5),
+                data_source.get_latest_close_prices(
+                    ticker_list, [datetime(2019, 9, 29)], 5).tolist())
+
+        with strategy_benchmark_svc.local_intrinio(RecordedFixtures(self.dataset)):
+            intrinio_results = read(IntrinioDataSource())
+
+        self.assertEqual(read(self.data_source), intrinio_results)
+
+    def test_strategy(self):
+        strategy = PriceDispersionStrategy(
+            ['AAPL', 'MSFT', 'GE'], 2019, 9, 1, data_source=self.data_source)
+        strategy.generate_recommendation()
+
+        self.assertListEqual(list(strategy.raw_dataframe['ticker']), [
+                             'MSFT', 'AAPL'])
+        self.assertEqual(
+            strategy.recommendation_set.model['securities_set'][0]['ticker_symbol'], 'MSFT')
@@ -6,12 +6,15 @@ import botocore
 import os
 import requests
 import datetime
+import time
+import threading
+import tempfile
 from copy import deepcopy
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from connectors import td_ameritrade
 from exception.exceptions import ValidationError, TradeError
 from test import nop
-from support import constants
+from support import constants, timing
 
 
 class TestConnectorsTDAmeritrade(unittest.TestCase):
@@ -40,7 +43,7 @@ class TestConnectorsTDAmeritrade(unittest.TestCase):
             self.assertTupleEqual(ret, ("X", "X", "X"))
 
     def test_request_with_exception(self):
-        with patch.object(requests, 'request',
+        with patch.object(requests.Session, 'request',
                           side_effect=requests.ConnectionError("Connection Error")):
 
             with self.assertRaises(TradeError):
@@ -49,12 +52,176 @@ class TestConnectorsTDAmeritrade(unittest.TestCase):
     def test_login_with_api_exception(self):
         with patch.object(td_ameritrade, 'get_credentials',
                           return_value=("aaa", "bbb", "ccc")), \
-            patch.object(requests, 'post',
+            patch.object(requests.Session, 'request',
                          side_effect=requests.ConnectionError("Connection Error")):
 
             with self.assertRaises(TradeError):
                 td_ameritrade.login()
 
+    def test_session_is_reused(self):
+        self.assertIs(td_ameritrade.get_session(),
+                      td_ameritrade.get_session())
+
+    def test_get_session_creates_one_session(self):
+        def new_session(pool_size, max_retries):
+            time.sleep(0.01)
+            return MagicMock()
+
+        sessions = []
+        barrier = threading.Barrier(8)
+
+        def get_session():
+            barrier.wait()
+            sessions.append(td_ameritrade.get_session())
+
+        with patch.object(td_ameritrade, 'session', None), \
+                patch.object(td_ameritrade, '_new_session', side_effect=new_session) as new_session_mock:
+            threads = [threading.Thread(target=get_session) for i in range(0, 8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(new_session_mock.call_count, 1)
+            self.assertEqual(len(sessions), 8)
+            for session in sessions:
+                self.assertIs(session, sessions[0])
+            sessions[0].close.assert_not_called()
+
+    def test_create_session_pool_size(self):
+        session = td_ameritrade.create_session(pool_size=4, max_retries=2)
+
+        try:
+            adapter = session.get_adapter('https://api.tdameritrade.com')
+
+            self.assertIs(td_ameritrade.get_session(), session)
+            self.assertEqual(adapter._pool_maxsize, 4)
+            self.assertEqual(adapter.max_retries.total, 2)
+        finally:
+            td_ameritrade.create_session()
+
+    def test_create_session_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            td_ameritrade.create_session(pool_size=0)
+
+        with self.assertRaises(ValidationError):
+            td_ameritrade.create_session(max_retries=-1)
+
+    '''
+        access token tests
+    '''
+
+    def test_login_sets_token_expiration(self):
+        creds_response = MagicMock(ok=True)
+        creds_response.json.return_value = {
+            'access_token': 'new-token',
+            'expires_in': 1800
+        }
+
+        try:
+            with patch.object(td_ameritrade, 'get_credentials',
+                              return_value=("aaa", "bbb", "ccc")), \
+                    patch.object(requests.Session, 'request', return_value=creds_response), \
+                    patch.dict(os.environ, clear=False) as env:
+                env.pop('TDAMERITRADE_TOKEN_FILE', None)
+                td_ameritrade.login()
+
+            self.assertEqual(td_ameritrade.TD_ACCESS_TOKEN, 'new-token')
+            self.assertAlmostEqual(
+                td_ameritrade.TD_ACCESS_TOKEN_EXPIRATION, time.time() + 1800, delta=5)
+            self.assertTrue(td_ameritrade.access_token_valid())
+        finally:
+            td_ameritrade.set_access_token("", 0)
+
+    def test_authenticate_refreshes_expiring_token(self):
+        td_ameritrade.set_access_token(
+            'old-token', time.time() + td_ameritrade.TOKEN_REFRESH_MARGIN - 1)
+
+        try:
+            with patch.object(td_ameritrade, 'login') as mock_login, \
+                    patch.object(td_ameritrade, 'load_access_token', return_value=False):
+                td_ameritrade.td_authenticate(lambda: None)()
+
+                self.assertEqual(mock_login.call_count, 1)
+        finally:
+            td_ameritrade.set_access_token("", 0)
+
+    def test_authenticate_valid_token(self):
+        td_ameritrade.set_access_token('valid-token', time.time() + 1800)
+
+        try:
+            with patch.object(td_ameritrade, 'login') as mock_login:
+                td_ameritrade.td_authenticate(lambda: None)()
+
+                self.assertEqual(mock_login.call_count, 0)
+        finally:
+            td_ameritrade.set_access_token("", 0)
+
+    def test_authenticate_retries_unauthorized_once(self):
+        td_ameritrade.set_access_token('valid-token', time.time() + 1800)
+        unauthorized = TradeError(
+            "Unauthorized", None, MagicMock(status_code=401))
+        api_call = MagicMock(side_effect=[unauthorized, 'response'])
+
+        try:
+            with patch.object(td_ameritrade, 'login') as mock_login:
+                self.assertEqual(
+                    td_ameritrade.td_authenticate(api_call)(), 'response')
+
+                self.assertEqual(mock_login.call_count, 1)
+                self.assertEqual(api_call.call_count, 2)
+
+            api_call = MagicMock(side_effect=[unauthorized, unauthorized])
+            with patch.object(td_ameritrade, 'login'):
+                with self.assertRaises(TradeError):
+                    td_ameritrade.td_authenticate(api_call)()
+                self.assertEqual(api_call.call_count, 2)
+        finally:
+            td_ameritrade.set_access_token("", 0)
+
+    def test_authenticate_does_not_retry_other_errors(self):
+        td_ameritrade.set_access_token('valid-token', time.time() + 1800)
+        api_call = MagicMock(side_effect=TradeError(
+            "Bad Request", None, MagicMock(status_code=400)))
+
+        try:
+            with patch.object(td_ameritrade, 'login') as mock_login:
+                with self.assertRaises(TradeError):
+                    td_ameritrade.td_authenticate(api_call)()
+
+                self.assertEqual(mock_login.call_count, 0)
+                self.assertEqual(api_call.call_count, 1)
+        finally:
+            td_ameritrade.set_access_token("", 0)
+
+    def test_save_and_load_access_token(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            token_file = os.path.join(temp_dir, 'td-token.json')
+
+            try:
+                with patch.dict(os.environ, {'TDAMERITRADE_TOKEN_FILE': token_file}):
+                    td_ameritrade.set_access_token(
+                        'saved-token', time.time() + 1800)
+                    td_ameritrade.save_access_token()
+                    td_ameritrade.set_access_token("", 0)
+
+                    self.assertEqual(os.stat(token_file).st_mode & 0o777, 0o600)
+                    self.assertTrue(td_ameritrade.load_access_token())
+                    self.assertEqual(
+                        td_ameritrade.TD_ACCESS_TOKEN, 'saved-token')
+
+                    # expired tokens are not used
+                    td_ameritrade.set_access_token('expired-token', time.time())
+                    td_ameritrade.save_access_token()
+                    self.assertFalse(td_ameritrade.load_access_token())
+            finally:
+                td_ameritrade.set_access_token("", 0)
+
+    def test_load_access_token_not_configured(self):
+        with patch.dict(os.environ, clear=False) as env:
+            env.pop('TDAMERITRADE_TOKEN_FILE', None)
+            self.assertFalse(td_ameritrade.load_access_token())
+
     '''
         equity market open tests
     '''
@@ -307,6 +474,22 @@ class TestConnectorsTDAmeritrade(unittest.TestCase):
             order_id = td_ameritrade.place_order("SELL", "xxx", 1, "SHARES")
             self.assertEqual(order_id, '0987654321')
 
+    def test_place_order_is_timed(self):
+        with patch.object(timing, 'span_stats', {}), \
+                patch.object(td_ameritrade, 'get_credentials',
+                             return_value=("aaa", "bbb", "ccc")), \
+                patch.object(td_ameritrade, 'login', return_value=None), \
+                patch.object(td_ameritrade, 'request', side_effect=[({}, None), TradeError("Some Error", None, None)]):
+
+            td_ameritrade.place_order("SELL", "xxx", 1, "SHARES")
+            with self.assertRaises(TradeError):
+                td_ameritrade.place_order("SELL", "xxx", 1, "SHARES")
+
+            self.assertListEqual(
+                timing.span_stats['td_ameritrade.place_order'][:2], [2, 1])
+
+        self.assertEqual(td_ameritrade.place_order.__name__, 'place_order')
+
     def test_place_order_with_invalid_headers(self):
         with patch.object(td_ameritrade, 'get_credentials',
                           return_value=("aaa", "bbb", "ccc")), \
@@ -316,6 +499,14 @@ class TestConnectorsTDAmeritrade(unittest.TestCase):
             order_id = td_ameritrade.place_order("SELL", "xxx", 1, "SHARES")
             self.assertEqual(len(order_id), 2)
 
+            # the tag cannot be used to track the order
+            self.assertFalse(td_ameritrade.is_order_id(order_id))
+
+    def test_is_order_id(self):
+        self.assertTrue(td_ameritrade.is_order_id('0987654321'))
+        self.assertFalse(td_ameritrade.is_order_id(td_ameritrade.generate_tag()))
+        self.assertFalse(td_ameritrade.is_order_id(None))
+
     def test_place_order_with_invalid_param_values(self):
         with patch.object(td_ameritrade, 'get_credentials',
                           return_value=("aaa", "bbb", "ccc")), \
@@ -448,3 +639,59 @@ class TestConnectorsTDAmeritrade(unittest.TestCase):
 
             with self.assertRaises(TradeError):
                 td_ameritrade.get_latest_equity_price("SPY")
+
+    def test_get_latest_equity_prices_valid_response(self):
+        response = {
+            'AAPL': {'symbol': 'AAPL', 'lastPrice': 318.89},
+            'MSFT': {'symbol': 'MSFT', 'lastPrice': 184.91}
+        }
+
+        with patch.object(td_ameritrade, 'get_credentials',
+                          return_value=("aaa", "bbb", "ccc")), \
+                patch.object(td_ameritrade, 'login', return_value=None), \
+                patch.object(td_ameritrade, 'request', return_value=(None, response)) as mock_request:
+
+            prices = td_ameritrade.get_latest_equity_prices(
+                ['AAPL', 'MSFT', 'UNKNOWN'])
+
+            self.assertDictEqual(prices, {'AAPL': 318.89, 'MSFT': 184.91})
+            self.assertEqual(mock_request.call_count, 1)
+            self.assertDictEqual(mock_request.call_args[1]['params'], {
+                                 'symbol': 'AAPL,MSFT,UNKNOWN'})
+
+    def test_get_latest_equity_prices_no_tickers(self):
+        with patch.object(td_ameritrade, 'get_credentials',
+                          return_value=("aaa", "bbb", "ccc")), \
+                patch.object(td_ameritrade, 'login', return_value=None):
+
+            with self.assertRaises(ValidationError):
+                td_ameritrade.get_latest_equity_prices([])
+
+    def test_get_order_valid_response(self):
+        response = {
+            "orderId": 1111111111,
+            "status": "FILLED",
+            "orderLegCollection": [{
+                "quantity": 1.0,
+                "instrument": {
+                    "symbol": "SPY"
+                }
+            }],
+            "closeTime": "2020-05-05T03:11:00+0000",
+            "tag": "AA_User:a3",
+            "cancelable": False
+        }
+
+        with patch.object(td_ameritrade, 'get_credentials',
+                          return_value=("aaa", "bbb", "ccc")), \
+                patch.object(td_ameritrade, 'login', return_value=None), \
+                patch.object(td_ameritrade, 'request', return_value=(None, response)):
+
+            self.assertDictEqual(td_ameritrade.get_order('1111111111'), {
+                "status": "FILLED",
+                "symbol": "SPY",
+                "quantity": 1.0,
+                "closeTime": "2020-05-05T03:11:00+0000",
+                "tag": "AA_User:a3",
+                "cancelable": False
+            })
@@ -0,0 +1,124 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the services.backtest_svc module
+"""
+import unittest
+import math
+import pandas as pd
+from unittest.mock import patch
+from datetime import datetime
+from exception.exceptions import ValidationError, DataError
+from services import backtest_svc, prefetch_svc
+from connectors import intrinio_data
+from strategies import calculator
+from strategies.price_dispersion_strategy import PriceDispersionStrategy
+
+
+class TestServicesBacktest(unittest.TestCase):
+
+    """
+        Testing class for the services.backtest_svc module
+    """
+
+    def test_backtest_periods_valid(self):
+        self.assertListEqual(backtest_svc.backtest_periods(2019, 11, 2020, 2), [
+            (2019, 11), (2019, 12), (2020, 1), (2020, 2)
+        ])
+        self.assertListEqual(
+            backtest_svc.backtest_periods(2019, 5, 2019, 5), [(2019, 5)])
+
+    def test_backtest_periods_invalid(self):
+        with self.assertRaises(ValidationError):
+            backtest_svc.backtest_periods(2020, 2, 2019, 11)
+        with self.assertRaises(ValidationError):
+            backtest_svc.backtest_periods(2019, 0, 2019, 11)
+
+    def test_validate_horizons_invalid(self):
+        with self.assertRaises(ValidationError):
+            backtest_svc.validate_horizons([])
+        with self.assertRaises(ValidationError):
+            backtest_svc.validate_horizons([1, 0])
+
+    def test_horizon_price_dates(self):
+        price_dates = backtest_svc.horizon_price_dates(
+            datetime(2019, 5, 31), [1, 3])
+
+        self.assertDictEqual(price_dates, {
+            '1M': datetime(2019, 6, 30),
+            '3M': datetime(2019, 8, 29)
+        })
+
+    def test_run_backtest_invalid_workers(self):
+        with self.assertRaises(ValidationError):
+            backtest_svc.run_backtest(['A', 'B'], [(2019, 5)], [1], 1, 0)
+
+    def test_run_backtest_serial(self):
+        def generate_recommendation(strategy):
+            strategy.raw_dataframe = pd.DataFrame({
+                'ticker': ['A', 'B'],
+                'analysis_price': [10, 10]
+            })
+            strategy.recommendation_dataframe = strategy.raw_dataframe.head(1)
+
+        def mark_to_market_multi(data_frame, price_dates, data_source=None):
+            data_frame = data_frame.copy()
+            for horizon in price_dates.keys():
+                data_frame['actual_return_%s' % horizon] = [
+                    0.1 * (i + 1) for i in range(len(data_frame))]
+            return data_frame
+
+        with patch.object(prefetch_svc, 'prefetch', return_value=prefetch_svc.PrefetchStats()), \
+                patch.object(PriceDispersionStrategy, 'generate_recommendation',
+                             autospec=True, side_effect=generate_recommendation), \
+                patch.object(calculator, 'mark_to_market_multi',
+                             side_effect=mark_to_market_multi):
+
+            (report, summary) = backtest_svc.run_backtest(
+                ['A', 'B'], [(2019, 5), (2019, 6)], [1, 2], 1, 1)
+
+            self.assertListEqual(
+                list(report['investment_period']), ['2019/05', '2019/06'])
+            self.assertListEqual(list(report['ticker_sample_size']), [2, 2])
+            self.assertAlmostEqual(report['avg_ret_1M'][0], 15.0)
+            self.assertAlmostEqual(report['sel_ret_2M'][1], 10.0)
+            self.assertAlmostEqual(summary['avg_tot_2M'][0], 30.0)
+            self.assertAlmostEqual(summary['sel_tot_1M'][0], 20.0)
+
+    def test_run_backtest_workers_share_rate_limit(self):
+        row = {'investment_period': '2019/05', 'ticker_sample_size': 2,
+               'avg_ret_1M': 1.0, 'sel_ret_1M': 2.0}
+
+        with patch.object(prefetch_svc, 'prefetch', return_value=prefetch_svc.PrefetchStats()) as prefetch, \
+                patch.object(backtest_svc, 'ProcessPoolExecutor') as executor_class:
+            executor = executor_class.return_value.__enter__.return_value
+            executor.map.return_value = [row, row]
+
+            (report, summary) = backtest_svc.run_backtest(
+                ['A', 'B'], [(2019, 5), (2019, 6)], [1], 1, 4)
+
+            # data is warmed with the same number of workers, before forking
+            prefetch.assert_called_once_with(
+                ['A', 'B'], [(2019, 5), (2019, 6)], 4)
+            executor_class.assert_called_once_with(
+                max_workers=4, initializer=intrinio_data.share_rate_limit, initargs=(4,))
+            self.assertAlmostEqual(summary['sel_tot_1M'][0], 4.0)
+
+    def test_backtest_period_future_horizon(self):
+        def generate_recommendation(strategy):
+            strategy.raw_dataframe = pd.DataFrame({
+                'ticker': ['A', 'B'],
+                'analysis_price': [10, 10]
+            })
+            strategy.recommendation_dataframe = strategy.raw_dataframe.head(1)
+
+        now = datetime.now()
+
+        with patch.object(PriceDispersionStrategy, 'generate_recommendation',
+                          autospec=True, side_effect=generate_recommendation), \
+                patch.object(calculator, 'mark_to_market_multi',
+                             side_effect=DataError("Not Found", None)):
+
+            row = backtest_svc.backtest_period(
+                ['A', 'B'], now.year, now.month, 1, [1])
+
+            self.assertTrue(math.isnan(row['avg_ret_1M']))
+            self.assertTrue(math.isnan(row['sel_ret_1M']))
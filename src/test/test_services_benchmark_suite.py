@@ -0,0 +1,104 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the services.benchmark_suite_svc module
+"""
+import unittest
+import tempfile
+from exception.exceptions import ValidationError, FileSystemError
+from services import benchmark_suite_svc
+
+
+class TestServicesBenchmarkSuite(unittest.TestCase):
+    """
+        Testing class for the services.benchmark_suite_svc module
+    """
+
+    @staticmethod
+    def result(benchmark: str, universe_size: int, median_seconds: float):
+        return {
+            'benchmark': benchmark,
+            'universe_size': universe_size,
+            'runs': 1,
+            'min_seconds': median_seconds,
+            'median_seconds': median_seconds
+        }
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            benchmark_suite_svc.run_suite(['invalid'], [30], 1)
+
+        with self.assertRaises(ValidationError):
+            benchmark_suite_svc.run_suite(['base_model'], [], 1)
+
+        with self.assertRaises(ValidationError):
+            benchmark_suite_svc.run_suite(['base_model'], [1], 1)
+
+        with self.assertRaises(ValidationError):
+            benchmark_suite_svc.run_suite(['base_model'], [30], 0)
+
+        with self.assertRaises(ValidationError):
+            benchmark_suite_svc.regression_report([], [], -1)
+
+    def test_run_suite(self):
+        results = benchmark_suite_svc.run_suite(
+            ['financial_cache', 'base_model', 'ranking', 'reprice', 'broker_trade'], [5, 10], 2)
+
+        self.assertListEqual([(r['benchmark'], r['universe_size']) for r in results], [
+            ('financial_cache.write', 5),
+            ('financial_cache.read', 5),
+            ('financial_cache.read_disk', 5),
+            ('financial_cache.write', 10),
+            ('financial_cache.read', 10),
+            ('financial_cache.read_disk', 10),
+            ('from_dict', 5),
+            ('validate_model', 5),
+            ('from_dict', 10),
+            ('validate_model', 10),
+            ('ranking', 5),
+            ('ranking', 10),
+            ('reprice', 5),
+            ('reprice', 10),
+            ('broker_trade', 5),
+            ('broker_trade', 10)
+        ])
+
+        for result in results:
+            self.assertEqual(result['runs'], 2)
+            self.assertLessEqual(result['min_seconds'],
+                                 result['median_seconds'])
+
+    def test_save_and_load_baseline(self):
+        results = [self.result('reprice', 30, 0.5)]
+
+        with tempfile.TemporaryDirectory() as baseline_dir:
+            baseline_file = "%s/baselines/baseline.json" % baseline_dir
+            benchmark_suite_svc.save_baseline(baseline_file, results)
+
+            self.assertListEqual(
+                benchmark_suite_svc.load_baseline(baseline_file), results)
+
+        with self.assertRaises(FileSystemError):
+            benchmark_suite_svc.load_baseline('/does/not/exist.json')
+
+    def test_regression_report(self):
+        baseline = [
+            self.result('reprice', 30, 1.0),
+            self.result('reprice', 500, 1.0),
+            self.result('reprice', 3000, 1.0),
+            self.result('from_dict', 30, 0.0001)
+        ]
+        results = [
+            self.result('reprice', 30, 1.1),
+            self.result('reprice', 500, 1.5),
+            self.result('reprice', 3000, 0.5),
+            self.result('from_dict', 30, 0.0005),
+            self.result('from_dict', 500, 0.1)
+        ]
+
+        report = benchmark_suite_svc.regression_report(
+            results, baseline, 0.25)
+
+        self.assertListEqual(list(report['status']), [
+            'OK', 'REGRESSION', 'IMPROVEMENT', 'OK', 'NEW'])
+        self.assertAlmostEqual(report['change_pct'][1], 50)
+        self.assertAlmostEqual(report['baseline_seconds'][2], 1.0)
+        self.assertAlmostEqual(report['current_seconds'][2], 0.5)
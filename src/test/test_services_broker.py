@@ -2,13 +2,37 @@
     Testing class for the services.broker module
 """
 import unittest
+import threading
 import botocore
 from copy import deepcopy
 from connectors import td_ameritrade
-from exception.exceptions import TradeError
+from exception.exceptions import ValidationError, TradeError
 from unittest.mock import patch
 from model.portfolio import Portfolio
 from services.broker import Broker
+from services.order_tracker import OrderTracker
+from test.fake_clock import FakeClock
+
+
+def order_lookup(orders: dict):
+    '''
+        returns a td_ameritrade.get_order() replacement that reads
+        orders from the supplied dictionary
+    '''
+    return lambda order_id: orders[order_id]
+
+
+def place_order(order_ids: dict):
+    '''
+        returns a td_ameritrade.place_order() replacement that returns
+        (or raises) the order id of each ticker from the supplied dictionary
+    '''
+    def place(action: str, ticker: str, quantity: float, quantity_type: str):
+        if isinstance(order_ids[ticker], Exception):
+            raise order_ids[ticker]
+        return order_ids[ticker]
+
+    return place
 
 
 class TestBroker(unittest.TestCase):
@@ -337,7 +361,8 @@ class TestBroker(unittest.TestCase):
                         "cashAvailableForTrading": 1,
                     }
                 }), \
-                patch.object(td_ameritrade, 'get_latest_equity_price', return_value=100), \
+                patch.object(td_ameritrade, 'get_latest_equity_prices', return_value={
+                    'BA': 100, 'AAPL': 100, 'MSFT': 100}), \
                 patch.object(Broker, 'trade', return_value=True) as mock_trade:
 
             broker = Broker()
@@ -346,6 +371,31 @@ class TestBroker(unittest.TestCase):
                 self.base_positions, self.base_portfolio)
             self.assertEqual(mock_trade.call_count, 0)
 
+    def test_materialize_portfolio_single_quote_request(self):
+        '''
+            Tests that all buys are sized from a single quote request, and
+            that securities without a quote are skipped
+        '''
+        with patch.object(Broker, '_generate_trade_instructions', return_value=([], ['BA', 'AAPL', 'MSFT'])), \
+                patch.object(td_ameritrade, 'positions_summary', return_value={
+                    "equities": {},
+                    "cash": {
+                        "cashAvailableForTrading": 1000,
+                    }
+                }), \
+                patch.object(td_ameritrade, 'get_latest_equity_prices', return_value={
+                    'BA': 100, 'AAPL': 50}) as mock_prices, \
+                patch.object(Broker, 'trade', return_value=True) as mock_trade:
+
+            broker = Broker()
+
+            broker.materialize_portfolio(
+                self.base_positions, self.base_portfolio)
+
+            self.assertEqual(mock_prices.call_count, 1)
+            mock_trade.assert_called_once_with(
+                'BUY', [('BA', 3), ('AAPL', 6)], self.base_portfolio)
+
     '''
         trade tests
     '''
@@ -365,7 +415,7 @@ class TestBroker(unittest.TestCase):
         sell_positions = [('BA', 1.0)]
 
         with patch.object(td_ameritrade, 'place_order', return_value='order-xxx'), \
-                patch.object(td_ameritrade, 'list_recent_orders', return_value={
+                patch.object(td_ameritrade, 'get_order', side_effect=order_lookup({
                     "order-xxx": {
                         "status": "FILLED",
                         "symbol": "BA",
@@ -373,7 +423,7 @@ class TestBroker(unittest.TestCase):
                         "closeTime": "2020-05-04T03:21:04+0000",
                         "tag": "AA_myuser"
                     },
-                }):
+                })):
 
             broker = Broker()
             self.assertTrue(broker.trade('SELL', sell_positions, None))
@@ -389,7 +439,7 @@ class TestBroker(unittest.TestCase):
         portfolio = Portfolio.from_dict(portfolio)
 
         with patch.object(td_ameritrade, 'place_order', return_value='order-xxx'), \
-                patch.object(td_ameritrade, 'list_recent_orders', return_value={
+                patch.object(td_ameritrade, 'get_order', side_effect=order_lookup({
                     "order-xxx": {
                         "status": "FILLED",
                         "symbol": "BA",
@@ -397,7 +447,7 @@ class TestBroker(unittest.TestCase):
                         "closeTime": "2020-05-04T03:21:04+0000",
                         "tag": "AA_myuser"
                     },
-                }):
+                })):
 
             broker = Broker()
             self.assertTrue(broker.trade('BUY', buy_positions, portfolio))
@@ -416,9 +466,9 @@ class TestBroker(unittest.TestCase):
 
         portfolio = Portfolio.from_dict(portfolio)
 
-        with patch.object(td_ameritrade, 'place_order', side_effect=[
-                'order-1', 'order-2', 'order-3']), \
-                patch.object(td_ameritrade, 'list_recent_orders', return_value={
+        with patch.object(td_ameritrade, 'place_order', side_effect=place_order({
+                'BA': 'order-1', 'GE': 'order-2', 'XOM': 'order-3'})), \
+                patch.object(td_ameritrade, 'get_order', side_effect=order_lookup({
                     "order-1": {
                         "status": "FILLED",
                         "symbol": "BA",
@@ -440,7 +490,7 @@ class TestBroker(unittest.TestCase):
                         "closeTime": "2020-05-04T03:21:04+0000",
                         "tag": "AA_myuser"
                     },
-                }):
+                })):
 
             broker = Broker()
             self.assertTrue(broker.trade('BUY', buy_positions, portfolio))
@@ -469,9 +519,9 @@ class TestBroker(unittest.TestCase):
 
         portfolio = Portfolio.from_dict(portfolio)
 
-        with patch.object(td_ameritrade, 'place_order', side_effect=[
-                'order-1', 'order-2', TradeError("Some Error", None, None)]), \
-                patch.object(td_ameritrade, 'list_recent_orders', return_value={
+        with patch.object(td_ameritrade, 'place_order', side_effect=place_order({
+                'BA': 'order-1', 'GE': 'order-2', 'XOM': TradeError("Some Error", None, None)})), \
+                patch.object(td_ameritrade, 'get_order', side_effect=order_lookup({
                     "order-1": {
                         "status": "FILLED",
                         "symbol": "BA",
@@ -486,7 +536,7 @@ class TestBroker(unittest.TestCase):
                         "closeTime": "2020-05-04T03:21:04+0000",
                         "tag": "AA_myuser"
                     }
-                }):
+                })):
 
             broker = Broker()
             self.assertFalse(broker.trade('BUY', buy_positions, portfolio))
@@ -500,9 +550,9 @@ class TestBroker(unittest.TestCase):
 
         portfolio = Portfolio.from_dict(portfolio)
 
-        with patch.object(td_ameritrade, 'place_order', side_effect=[
-                'order-1', 'order-2', 'order-3']), \
-                patch.object(td_ameritrade, 'list_recent_orders', return_value={
+        with patch.object(td_ameritrade, 'place_order', side_effect=place_order({
+                'BA': 'order-1', 'GE': 'order-2', 'XOM': 'order-3'})), \
+                patch.object(td_ameritrade, 'get_order', side_effect=order_lookup({
                     "order-1": {
                         "status": "FILLED",
                         "symbol": "BA",
@@ -524,7 +574,7 @@ class TestBroker(unittest.TestCase):
                         "closeTime": "2020-05-04T03:21:04+0000",
                         "tag": "AA_myuser"
                     },
-                }):
+                })):
 
             broker = Broker()
             self.assertTrue(broker.trade('BUY', buy_positions, portfolio))
@@ -543,3 +593,61 @@ class TestBroker(unittest.TestCase):
             self.assertEqual(pos['trade_state'], 'UNFILLED')
             self.assertEqual(pos['quantity'], 0)
             self.assertIsNone(pos['purchase_date'])
+
+    def test_trade_buy_order_not_completed(self):
+        '''
+            Tests that orders that are still open when the tracking deadline
+            is reached are reported as not traded
+        '''
+        buy_positions = [('BA', 1.0)]
+
+        portfolio = deepcopy(self.base_portfolio)
+        del portfolio['current_portfolio']['securities'][2]
+        del portfolio['current_portfolio']['securities'][1]
+
+        portfolio = Portfolio.from_dict(portfolio)
+
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'place_order', return_value='order-xxx'), \
+                patch.object(td_ameritrade, 'get_order', return_value={
+                    "status": "QUEUED",
+                    "symbol": "BA",
+                    "quantity": 1,
+                    "closeTime": None,
+                    "tag": "AA_myuser"
+                }):
+
+            broker = Broker(OrderTracker(clock=clock, deadline=30))
+            self.assertFalse(broker.trade('BUY', buy_positions, portfolio))
+
+            self.assertEqual(portfolio.get_position('BA')['order_id'], 'order-xxx')
+            self.assertEqual(sum(clock.sleeps), 30)
+
+    def test_trade_orders_placed_concurrently(self):
+        '''
+            Tests that all orders are in flight at the same time. Orders
+            placed serially would never release the barrier.
+        '''
+        buy_positions = [('BA', 1.0), ('GE', 1.0), ('XOM', 1.0)]
+        barrier = threading.Barrier(3, timeout=5)
+
+        def place(action: str, ticker: str, quantity: float, quantity_type: str):
+            barrier.wait()
+            return 'order-%s' % ticker
+
+        with patch.object(td_ameritrade, 'place_order', side_effect=place), \
+                patch.object(td_ameritrade, 'get_order', return_value={
+                    "status": "FILLED",
+                    "symbol": "",
+                    "quantity": 1,
+                    "closeTime": "2020-05-04T03:21:04+0000",
+                    "tag": "AA_myuser"
+                }):
+
+            broker = Broker(max_workers=3)
+            self.assertTrue(broker.trade('SELL', buy_positions, None))
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValidationError):
+            Broker(max_workers=0)
@@ -0,0 +1,143 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the services.order_tracker module
+"""
+import unittest
+from unittest.mock import patch
+from connectors import td_ameritrade
+from exception.exceptions import ValidationError, TradeError
+from services.order_tracker import OrderTracker
+from support import timing
+from test.fake_clock import FakeClock
+
+
+class TestServicesOrderTracker(unittest.TestCase):
+    """
+        Testing class for the services.order_tracker module
+    """
+
+    open_order = {
+        "status": "QUEUED",
+        "symbol": "BA",
+        "quantity": 1,
+        "closeTime": None,
+        "tag": "AA_myuser",
+        "cancelable": True
+    }
+
+    filled_order = {
+        "status": "FILLED",
+        "symbol": "BA",
+        "quantity": 1,
+        "closeTime": "2020-05-04T03:21:04+0000",
+        "tag": "AA_myuser",
+        "cancelable": False
+    }
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            OrderTracker(initial_interval=0)
+
+        with self.assertRaises(ValidationError):
+            OrderTracker(backoff_factor=0.5)
+
+        with self.assertRaises(ValidationError):
+            OrderTracker(deadline=-1)
+
+    def test_no_orders(self):
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'get_order') as mock_get_order:
+            (completed, pending) = OrderTracker(
+                clock=clock).wait_for_orders([])
+
+        self.assertDictEqual(completed, {})
+        self.assertListEqual(pending, [])
+        self.assertEqual(mock_get_order.call_count, 0)
+        self.assertListEqual(clock.sleeps, [])
+
+    def test_orders_filled_immediately(self):
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'get_order', return_value=self.filled_order):
+            (completed, pending) = OrderTracker(
+                clock=clock).wait_for_orders(['order-1', 'order-2'])
+
+        self.assertListEqual(list(completed.keys()), ['order-1', 'order-2'])
+        self.assertListEqual(pending, [])
+        self.assertListEqual(clock.sleeps, [])
+
+    def test_exponential_backoff(self):
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'get_order', side_effect=[
+                self.open_order, self.open_order, self.open_order, self.open_order, self.filled_order]) as mock_get_order:
+            (completed, pending) = OrderTracker(
+                clock=clock, initial_interval=1, max_interval=5).wait_for_orders(['order-1'])
+
+        self.assertDictEqual(completed, {'order-1': self.filled_order})
+        self.assertListEqual(pending, [])
+        self.assertListEqual(clock.sleeps, [1, 2, 4, 5])
+        self.assertEqual(mock_get_order.call_count, 5)
+
+    def test_polls_are_timed(self):
+        clock = FakeClock()
+
+        with patch.object(timing, 'span_stats', {}), \
+                patch.object(td_ameritrade, 'get_order', side_effect=[
+                    self.open_order, self.open_order, self.filled_order]):
+            OrderTracker(clock=clock, initial_interval=1).wait_for_orders(
+                ['order-1'])
+
+            self.assertEqual(timing.span_stats['order_tracker.poll'][0], 3)
+            self.assertEqual(
+                timing.span_stats['order_tracker.wait_for_orders'][0], 1)
+
+    def test_only_pending_orders_are_polled(self):
+        clock = FakeClock()
+        statuses = {
+            'order-1': [self.filled_order],
+            'order-2': [self.open_order, self.filled_order]
+        }
+
+        with patch.object(td_ameritrade, 'get_order',
+                          side_effect=lambda order_id: statuses[order_id].pop(0)) as mock_get_order:
+            (completed, pending) = OrderTracker(
+                clock=clock).wait_for_orders(['order-1', 'order-2'])
+
+        self.assertListEqual(list(completed.keys()), ['order-1', 'order-2'])
+        self.assertListEqual(pending, [])
+        self.assertEqual(mock_get_order.call_count, 3)
+
+    def test_deadline(self):
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'get_order', return_value=self.open_order):
+            (completed, pending) = OrderTracker(
+                clock=clock, initial_interval=2, max_interval=8, deadline=20).wait_for_orders(['order-1'])
+
+        self.assertDictEqual(completed, {})
+        self.assertListEqual(pending, ['order-1'])
+        self.assertListEqual(clock.sleeps, [2, 4, 8, 6])
+
+    def test_orders_without_id_are_not_polled(self):
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'get_order', return_value=self.filled_order) as mock_get_order:
+            (completed, pending) = OrderTracker(
+                clock=clock).wait_for_orders(['Ab', 'order-1'])
+
+        self.assertDictEqual(completed, {'order-1': self.filled_order})
+        self.assertListEqual(pending, ['Ab'])
+        mock_get_order.assert_called_once_with('order-1')
+        self.assertListEqual(clock.sleeps, [])
+
+    def test_status_errors_are_retried(self):
+        clock = FakeClock()
+
+        with patch.object(td_ameritrade, 'get_order', side_effect=[
+                TradeError("Some Error", None, None), self.filled_order]):
+            (completed, pending) = OrderTracker(
+                clock=clock).wait_for_orders(['order-1'])
+
+        self.assertDictEqual(completed, {'order-1': self.filled_order})
+        self.assertListEqual(pending, [])
@@ -0,0 +1,77 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the services.prefetch_svc module
+"""
+import unittest
+from unittest.mock import patch
+from intrinio_sdk.rest import ApiException
+from connectors import intrinio_data
+from exception.exceptions import ValidationError, DataError
+from services import prefetch_svc
+
+
+class TestServicesPrefetch(unittest.TestCase):
+
+    """
+        Testing class for the services.prefetch_svc module
+    """
+
+    def test_prefetch_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            prefetch_svc.prefetch([], [(2019, 5)], 1)
+        with self.assertRaises(ValidationError):
+            prefetch_svc.prefetch(['A'], [], 1)
+        with self.assertRaises(ValidationError):
+            prefetch_svc.prefetch(['A'], [(2019, 5)], 0)
+
+    def test_prefetch_hits_and_misses(self):
+        def is_cached(ticker, start_date, end_date, tags):
+            return ticker == 'A'
+
+        with patch.object(intrinio_data, 'is_company_historical_data_multi_cached',
+                          side_effect=is_cached), \
+                patch.object(intrinio_data, 'is_daily_stock_close_prices_cached',
+                             return_value=False), \
+                patch.object(intrinio_data, 'get_company_historical_data_multi',
+                             return_value={}), \
+                patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                             side_effect=DataError("Not Found", None)):
+
+            stats = prefetch_svc.prefetch(
+                ['A', 'B'], [(2019, 5), (2019, 6)], 2)
+
+            self.assertDictEqual(stats.to_dict(), {
+                'hits': 2,
+                'misses': 4,
+                'fetched': 2,
+                'errors': 2,
+                'throttled': 0
+            })
+            self.assertEqual(stats.misses, stats.fetched +
+                             stats.throttled + stats.errors)
+
+    def test_fetch_rate_limited_is_not_retried(self):
+        rate_limited = DataError("Too many requests",
+                                 ApiException(status=429, reason="Too Many Requests"))
+        stats = prefetch_svc.PrefetchStats()
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          side_effect=rate_limited) as get_prices:
+
+            self.assertFalse(prefetch_svc.fetch(
+                stats, intrinio_data.get_daily_stock_close_prices, 'A'))
+
+            self.assertEqual(get_prices.call_count, 1)
+            self.assertEqual(stats.throttled, 1)
+            self.assertEqual(stats.errors, 0)
+            self.assertEqual(stats.fetched, 0)
+
+    def test_fetch_valid(self):
+        stats = prefetch_svc.PrefetchStats()
+
+        with patch.object(intrinio_data, 'get_daily_stock_close_prices',
+                          return_value={}):
+
+            self.assertTrue(prefetch_svc.fetch(
+                stats, intrinio_data.get_daily_stock_close_prices, 'A'))
+            self.assertEqual(stats.fetched, 1)
+            self.assertEqual(stats.errors, 0)
@@ -0,0 +1,53 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the services.strategy_benchmark_svc module
+"""
+import unittest
+from connectors import intrinio_data
+from exception.exceptions import ValidationError
+from services import strategy_benchmark_svc
+from simulator.intrinio_simulator import SyntheticFixtures
+
+
+class TestServicesStrategyBenchmark(unittest.TestCase):
+    """
+        Testing class for the services.strategy_benchmark_svc module
+    """
+
+    def test_synthetic_ticker_list(self):
+        self.assertListEqual(strategy_benchmark_svc.synthetic_ticker_list(3), [
+            'SYN0000', 'SYN0001', 'SYN0002'])
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            strategy_benchmark_svc.run_benchmark(
+                SyntheticFixtures(), ['A', 'B'], 2020, 1, 1, [])
+
+    def test_run_benchmark(self):
+        original_url = intrinio_data.INTRINIO_API_URL
+        original_cache = intrinio_data.cache
+        original_price_store = intrinio_data.price_store
+        original_rate_limiter = intrinio_data.rate_limiter
+
+        ticker_list = strategy_benchmark_svc.synthetic_ticker_list(10)
+        results = strategy_benchmark_svc.run_benchmark(
+            SyntheticFixtures(), ticker_list, 2020, 1, 3, [1, 4])
+
+        self.assertListEqual([(r['max_workers'], r['cache']) for r in results], [
+            (1, 'cold'), (1, 'warm'), (4, 'cold'), (4, 'warm')
+        ])
+
+        for result in results:
+            self.assertEqual(result['recommended'], 3)
+            self.assertEqual(result['throttled_requests'], 0)
+
+            # 2 target price tags and 1 price request per ticker
+            if result['cache'] == 'cold':
+                self.assertEqual(result['requests'], 30)
+            else:
+                self.assertEqual(result['requests'], 0)
+
+        # connector settings are restored
+        self.assertEqual(intrinio_data.INTRINIO_API_URL, original_url)
+        self.assertIs(intrinio_data.cache, original_cache)
+        self.assertIs(intrinio_data.price_store, original_price_store)
+        self.assertIs(intrinio_data.rate_limiter, original_rate_limiter)
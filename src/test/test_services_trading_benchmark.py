@@ -0,0 +1,47 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the services.trading_benchmark_svc module
+"""
+import unittest
+from connectors import td_ameritrade
+from exception.exceptions import ValidationError
+from services import trading_benchmark_svc
+
+
+class TestServicesTradingBenchmark(unittest.TestCase):
+    """
+        Testing class for the services.trading_benchmark_svc module
+    """
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            trading_benchmark_svc.run_benchmark(0, 1, 0.01)
+
+        with self.assertRaises(ValidationError):
+            trading_benchmark_svc.run_benchmark(1, 0, 0.01)
+
+    def test_run_benchmark(self):
+        original_url = td_ameritrade.TD_API_URL
+
+        (results, summary) = trading_benchmark_svc.run_benchmark(
+            3, 2, 0.01, seed=1)
+
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertEqual(result['filled'], 3)
+            self.assertEqual(result['unfilled'], 0)
+            self.assertGreater(result['requests'], 0)
+
+        self.assertEqual(summary['runs'], 2)
+        self.assertEqual(summary['mean_unfilled'], 0)
+        self.assertLessEqual(summary['min_seconds'], summary['max_seconds'])
+
+        # connector settings are restored
+        self.assertEqual(td_ameritrade.TD_API_URL, original_url)
+        self.assertEqual(td_ameritrade.TD_ACCESS_TOKEN, "")
+
+    def test_rejected_orders(self):
+        (results, _) = trading_benchmark_svc.run_benchmark(
+            3, 1, 0.01, rejection_rate=1)
+
+        self.assertEqual(results[0]['filled'], 0)
+        self.assertEqual(results[0]['unfilled'], 3)
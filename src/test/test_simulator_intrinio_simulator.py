@@ -0,0 +1,183 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the simulator.intrinio_simulator module
+"""
+import unittest
+import tempfile
+import requests
+from unittest.mock import patch
+from connectors import intrinio_data
+from exception.exceptions import ValidationError, DataError, FileSystemError
+from simulator import intrinio_simulator
+from simulator.http_simulator import HttpSimulator
+from simulator.intrinio_simulator import IntrinioSimulator, RecordedFixtures, SyntheticFixtures
+from support.rate_limiter import RateLimiter
+
+
+class TestIntrinioSimulator(unittest.TestCase):
+    """
+        Testing class for the simulator.intrinio_simulator module.
+        Requests are executed by the intrinio_data connector,
+        bypassing the cache.
+    """
+
+    fixtures = {
+        'AAPL': {
+            'historical_data': {
+                'zacks_target_price_mean': [
+                    {'date': '2019-09-30', 'value': 110.0},
+                    {'date': '2019-10-01', 'value': 120.0},
+                    {'date': '2019-11-01', 'value': 130.0}
+                ]
+            },
+            'prices': [
+                {'date': '2019-10-01', 'close': 100.0},
+                {'date': '2019-10-02', 'close': 101.0},
+                {'date': '2019-10-03', 'close': 102.0},
+                {'date': '2019-10-04', 'close': 103.0},
+                {'date': '2019-10-07', 'close': 104.0}
+            ],
+            'data_points': {'marketcap': 1000.0},
+            'financials': {
+                'income_statement-2019-FY': {'totalrevenue': 500.0}
+            }
+        }
+    }
+
+    def setUp(self):
+        self.simulator = IntrinioSimulator(RecordedFixtures(self.fixtures))
+        self.simulator.start()
+
+        self.original_url = intrinio_data.INTRINIO_API_URL
+        intrinio_data.set_api_url(self.simulator.url)
+
+    def tearDown(self):
+        intrinio_data.set_api_url(self.original_url)
+        self.simulator.stop()
+
+    def test_simulator_without_handle(self):
+        class IncompleteSimulator(HttpSimulator):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteSimulator(0)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            IntrinioSimulator(None)
+
+        with self.assertRaises(ValidationError):
+            IntrinioSimulator(SyntheticFixtures(), latency=-1)
+
+        with self.assertRaises(ValidationError):
+            IntrinioSimulator(SyntheticFixtures(), requests_per_second=0)
+
+    def test_unauthorized(self):
+        response = requests.get("%s/companies/AAPL" % self.simulator.url)
+        self.assertEqual(response.status_code, 401)
+
+        response = requests.get(
+            "%s/companies/AAPL" % self.simulator.url, params={'api_key': 'x'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_historical_data(self):
+        historical_data = intrinio_data._decode_historical_data(
+            intrinio_data._read_company_historical_data('AAPL', '2019-10-01', '2019-12-31', 'yearly', 'zacks_target_price_mean'))
+
+        self.assertListEqual([(str(d['date']), d['value']) for d in historical_data], [
+            ('2019-11-01', 130.0),
+            ('2019-10-01', 120.0)
+        ])
+
+    def test_missing_data(self):
+        with self.assertRaises(DataError):
+            intrinio_data._read_company_historical_data(
+                'AAPL', '2019-10-01', '2019-12-31', 'yearly', 'zacks_target_price_cnt')
+
+        with self.assertRaises(DataError):
+            intrinio_data._read_daily_stock_close_prices(
+                'MSFT', '2019-10-01', '2019-12-31')
+
+    def test_paginated_prices(self):
+        with patch.object(intrinio_data, 'INTRINIO_PRICE_PAGE_SIZE', 2):
+            request_count = self.simulator.request_count
+            price_dict = intrinio_data._read_daily_stock_close_prices(
+                'AAPL', '2019-10-02', '2019-10-07')
+
+        self.assertDictEqual(price_dict, {
+            '2019-10-02': 101.0,
+            '2019-10-03': 102.0,
+            '2019-10-04': 103.0,
+            '2019-10-07': 104.0
+        })
+        self.assertEqual(self.simulator.request_count - request_count, 2)
+
+    def test_rate_limited_requests_are_retried(self):
+        rate_limiter = RateLimiter(6000, burst=10)
+
+        with IntrinioSimulator(RecordedFixtures(self.fixtures), requests_per_second=2) as simulator, \
+                patch.object(intrinio_data, 'rate_limiter', rate_limiter):
+            intrinio_data.set_api_url(simulator.url)
+
+            for _ in range(0, 3):
+                historical_data = intrinio_data._read_company_historical_data(
+                    'AAPL', '2019-10-01', '2019-12-31', 'yearly', 'zacks_target_price_mean')
+
+            self.assertEqual(simulator.rate_limited_count, 1)
+
+        self.assertEqual(
+            len(intrinio_data._decode_historical_data(historical_data)), 2)
+        self.assertEqual(rate_limiter.stats()['pauses'], 1)
+        self.assertEqual(rate_limiter.stats()['requests'], 4)
+
+    def test_data_point_and_financials(self):
+        with patch.object(intrinio_data.cache, 'read', return_value=None), \
+                patch.object(intrinio_data.cache, 'write'):
+            self.assertEqual(intrinio_data._read_company_data_point(
+                'AAPL', 'marketcap'), 1000.0)
+            self.assertDictEqual(intrinio_data.get_historical_income_stmt(
+                'AAPL', 2019, 2019, None), {2019: {'totalrevenue': 500.0}})
+
+    def test_synthetic_fixtures(self):
+        fixtures = SyntheticFixtures(1)
+
+        prices = fixtures.stock_prices('XYZ', '2019-10-04', '2019-10-08')
+        self.assertListEqual([p['date'] for p in prices], [
+            '2019-10-04', '2019-10-07', '2019-10-08'])
+        self.assertListEqual(prices, SyntheticFixtures(
+            1).stock_prices('XYZ', '2019-10-04', '2019-10-08'))
+        self.assertNotEqual(prices, SyntheticFixtures(
+            2).stock_prices('XYZ', '2019-10-04', '2019-10-08'))
+
+        for tag in ['zacks_target_price_mean', 'zacks_target_price_std_dev']:
+            values = fixtures.historical_data(
+                'XYZ', tag, '2019-10-04', '2019-10-08')
+            self.assertEqual(len(values), 3)
+            self.assertTrue(all(v['value'] > 0 for v in values))
+
+    def test_save_and_load_fixtures(self):
+        with tempfile.TemporaryDirectory() as fixtures_dir:
+            intrinio_simulator.save_fixtures(fixtures_dir, self.fixtures)
+            fixtures = intrinio_simulator.load_fixtures(fixtures_dir)
+
+        self.assertListEqual(fixtures.ticker_list, ['AAPL'])
+        self.assertDictEqual(fixtures.fixtures, self.fixtures)
+
+        with self.assertRaises(FileSystemError):
+            intrinio_simulator.load_fixtures('/does/not/exist')
+
+    def test_record_fixtures(self):
+        fixtures = intrinio_simulator.record_fixtures(
+            ['AAPL', 'MSFT'], intrinio_data.datetime.date(2019, 10, 1),
+            intrinio_data.datetime.date(2019, 10, 2), ['zacks_target_price_mean'])
+
+        self.assertListEqual(fixtures['AAPL']['historical_data']['zacks_target_price_mean'], [
+            {'date': '2019-10-01', 'value': 120.0}
+        ])
+        self.assertListEqual(fixtures['AAPL']['prices'], [
+            {'date': '2019-10-01', 'close': 100.0},
+            {'date': '2019-10-02', 'close': 101.0}
+        ])
+
+        # data that could not be read is skipped
+        self.assertDictEqual(fixtures['MSFT']['historical_data'], {})
+        self.assertListEqual(fixtures['MSFT']['prices'], [])
@@ -0,0 +1,105 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the simulator.td_ameritrade_simulator module
+"""
+import unittest
+from unittest.mock import patch
+from connectors import td_ameritrade
+from exception.exceptions import ValidationError, TradeError
+from simulator.td_ameritrade_simulator import TDAmeritradeSimulator, SIMULATOR_ACCOUNT_ID
+
+
+class TestTDAmeritradeSimulator(unittest.TestCase):
+    """
+        Testing class for the simulator.td_ameritrade_simulator module.
+        Requests are executed by the td_ameritrade connector.
+    """
+
+    def setUp(self):
+        self.simulator = TDAmeritradeSimulator(
+            cash=1000, positions={'BA': 2}, prices={'BA': 100, 'GE': 10})
+        self.simulator.start()
+
+        self.original_url = td_ameritrade.TD_API_URL
+        td_ameritrade.TD_API_URL = self.simulator.url
+        td_ameritrade.set_access_token("", 0)
+
+        self.credentials = patch.object(td_ameritrade, 'get_credentials',
+                                        return_value=(SIMULATOR_ACCOUNT_ID, "client", "token"))
+        self.credentials.start()
+
+    def tearDown(self):
+        self.credentials.stop()
+        td_ameritrade.TD_API_URL = self.original_url
+        td_ameritrade.set_access_token("", 0)
+        self.simulator.stop()
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            TDAmeritradeSimulator(latency=-1)
+
+        with self.assertRaises(ValidationError):
+            TDAmeritradeSimulator(rejection_rate=2)
+
+    def test_login_and_positions(self):
+        self.assertTrue(td_ameritrade.equity_market_open(
+            td_ameritrade.datetime.now()))
+        self.assertEqual(self.simulator.token_count, 1)
+
+        self.assertDictEqual(td_ameritrade.positions_summary(), {
+            'equities': {
+                'BA': {
+                    'longQuantity': 2,
+                    'averagePrice': 0,
+                    'marketValue': 200
+                }
+            },
+            'cash': {
+                'cashAvailableForTrading': 1000
+            }
+        })
+
+    def test_quotes(self):
+        self.assertEqual(td_ameritrade.get_latest_equity_price('BA'), 100)
+        self.assertDictEqual(td_ameritrade.get_latest_equity_prices(
+            ['BA', 'GE']), {'BA': 100, 'GE': 10})
+
+    def test_place_and_fill_orders(self):
+        buy_order_id = td_ameritrade.place_order('BUY', 'GE', 5, 'SHARES')
+        sell_order_id = td_ameritrade.place_order('SELL', 'BA', 2, 'SHARES')
+
+        self.assertEqual(td_ameritrade.get_order(
+            buy_order_id)['status'], 'FILLED')
+        self.assertEqual(td_ameritrade.get_order(
+            sell_order_id)['status'], 'FILLED')
+        self.assertListEqual(
+            sorted(td_ameritrade.list_recent_orders().keys()), sorted([buy_order_id, sell_order_id]))
+
+        positions = td_ameritrade.positions_summary()
+        self.assertListEqual(list(positions['equities'].keys()), ['GE'])
+        self.assertEqual(positions['cash']['cashAvailableForTrading'], 1150)
+
+    def test_order_without_funds_is_rejected(self):
+        order_id = td_ameritrade.place_order('BUY', 'BA', 100, 'SHARES')
+
+        self.assertEqual(td_ameritrade.get_order(order_id)['status'], 'REJECTED')
+
+    def test_cancel_open_order(self):
+        self.simulator.fill_delay = 60
+
+        order_id = td_ameritrade.place_order('BUY', 'GE', 1, 'SHARES')
+        self.assertIsNone(td_ameritrade.get_order(order_id)['closeTime'])
+
+        td_ameritrade.cancel_order(order_id)
+        self.assertEqual(td_ameritrade.get_order(order_id)['status'], 'CANCELED')
+
+        with self.assertRaises(TradeError):
+            td_ameritrade.cancel_order(order_id)
+
+    def test_expired_token_is_refreshed(self):
+        td_ameritrade.positions_summary()
+
+        # invalidates the connector's token
+        self.simulator.access_token = "another-token"
+
+        td_ameritrade.positions_summary()
+        self.assertEqual(self.simulator.token_count, 2)
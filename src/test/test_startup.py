@@ -0,0 +1,78 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the startup cost of the main entry points
+"""
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+
+class TestStartup(unittest.TestCase):
+    """
+        Verifies that importing the main entry points stays within an import
+        time budget, and that expensive modules, which are only needed on
+        some code paths, are not imported until they are used
+    """
+
+    # entry point => modules that must not be imported at startup
+    ENTRY_POINTS = {
+        'securities_recommendation_svc': ['intrinio_sdk', 'boto3', 'pandas'],
+        'portfolio_manager_svc': ['intrinio_sdk', 'boto3', 'pandas'],
+        'price_dispersion_backtest': ['intrinio_sdk', 'boto3']
+    }
+
+    # generous enough for slow machines, but well below the time it takes
+    # to import the Intrinio SDK, boto3 and pandas eagerly
+    IMPORT_TIME_BUDGET_SECONDS = 1.0
+
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    @classmethod
+    def import_entry_point(cls, module_name: str, lazy_modules: list):
+        '''
+            Imports a module in a new interpreter, without any credentials,
+            and returns a tuple of (import seconds, list of lazy modules that were imported)
+        '''
+        script = """
+import json, sys, time
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in %s if m in sys.modules]]))
+""" % (module_name, lazy_modules)
+
+        env = dict(os.environ)
+        env.pop('INTRINIO_API_KEY', None)
+
+        output = subprocess.run([sys.executable, '-c', script], cwd=cls.src_dir, env=env,
+                                stdout=subprocess.PIPE, check=True).stdout
+
+        return tuple(json.loads(output.decode().splitlines()[-1]))
+
+    def test_entry_points_import_budget(self):
+        for (entry_point, lazy_modules) in self.ENTRY_POINTS.items():
+            # the fastest of two imports, to discount compiling the sources
+            results = [self.import_entry_point(
+                entry_point, lazy_modules) for i in range(2)]
+            elapsed = min([r[0] for r in results])
+
+            self.assertListEqual(results[-1][1], [], entry_point)
+            self.assertLess(elapsed, self.IMPORT_TIME_BUDGET_SECONDS,
+                            entry_point)
+
+    def test_profile_startup(self):
+        env = dict(os.environ)
+        env.pop('INTRINIO_API_KEY', None)
+
+        output = subprocess.run([sys.executable, 'portfolio_manager_svc.py', '--profile-startup', '-h'],
+                                cwd=self.src_dir, env=env, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, check=True).stdout.decode()
+
+        report = json.loads(output.split("Startup profile: ")[1])
+
+        self.assertEqual(report['entry_point'], 'portfolio_manager_svc.py')
+        self.assertGreater(report['import_seconds'], 0)
+        self.assertGreater(report['imported_modules'], 0)
+        self.assertDictEqual(report['first_api_call_seconds'], {})
+        self.assertIn('numpy', [p['package'] for p in report['packages']])
@@ -4,6 +4,7 @@
 import unittest
 from unittest.mock import patch
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from connectors import intrinio_data
 from exception.exceptions import CalculationError, ValidationError, DataError
@@ -59,3 +60,95 @@ class TestStrategiesCalculator(unittest.TestCase):
                           side_effect=Exception("Not Found")):
             with self.assertRaises(DataError):
                 calculator.mark_to_market(data_frame, datetime.now())
+
+    def test_mark_to_market_multi_null_parameters(self):
+        df_dict = {
+            'ticker': ['a', 'b'],
+            'analysis_price': [1, 2]
+        }
+        data_frame = pd.DataFrame(df_dict)
+        with self.assertRaises(ValidationError):
+            calculator.mark_to_market_multi(data_frame, {})
+        with self.assertRaises(ValidationError):
+            calculator.mark_to_market_multi(None, {'1M': datetime.now()})
+
+    def test_mark_to_market_multi_valid(self):
+        df_dict = {
+            'ticker': ['b', 'a', 'b'],
+            'analysis_price': [10, 20, 5]
+        }
+        data_frame = pd.DataFrame(df_dict)
+
+        # prices are returned for the sorted, unique tickers ('a', 'b')
+        prices = np.array([[40, 10], [20, 30]])
+
+        with patch.object(intrinio_data, 'get_latest_close_prices',
+                          return_value=prices) as get_prices:
+
+            mmt_df = calculator.mark_to_market_multi(data_frame, {
+                '1M': datetime(2019, 6, 30),
+                '2M': datetime(2019, 7, 30)
+            })
+
+            self.assertListEqual(get_prices.call_args[0][0], ['a', 'b'])
+            self.assertListEqual(
+                list(mmt_df['current_price_1M']), [20, 40, 20])
+            self.assertListEqual(
+                list(mmt_df['actual_return_1M']), [1.0, 1.0, 3.0])
+            self.assertListEqual(
+                list(mmt_df['current_price_2M']), [30, 10, 30])
+            self.assertListEqual(
+                list(mmt_df['actual_return_2M']), [2.0, -0.5, 5.0])
+
+    def test_mark_to_market_multi_price_exception(self):
+        df_dict = {
+            'ticker': ['a'],
+            'analysis_price': [10]
+        }
+        data_frame = pd.DataFrame(df_dict)
+        with patch.object(intrinio_data, 'get_latest_close_prices',
+                          side_effect=Exception("Not Found")):
+            with self.assertRaises(DataError):
+                calculator.mark_to_market_multi(
+                    data_frame, {'1M': datetime.now()})
+
+    def test_deciles_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            calculator.deciles(1.0)
+
+        with self.assertRaises(ValidationError):
+            calculator.deciles(np.zeros((2, 2, 2)))
+
+    def test_deciles_same_as_qcut(self):
+        rng = np.random.default_rng(1)
+
+        values_list = [
+            rng.normal(size=57),
+            rng.integers(0, 4, size=23).astype('float64'),
+            np.round(rng.exponential(size=41), 1),
+            [1.5, 0.7, 0.8, 2.8, 2.0, 1.4, 0.9, 0.3, 0.5, 1.4, 3.7],
+            [1.0, np.nan, 2.0, 3.0, np.nan, 4.0],
+            [5.0, 5.0, 5.0],
+            [5.0]
+        ]
+
+        for values in values_list:
+            expected = pd.qcut(values, 10, labels=False,
+                               duplicates='drop').astype('float64')
+            self.assertTrue(np.array_equal(calculator.deciles(
+                values), expected, equal_nan=True))
+
+    def test_deciles_multiple_rows(self):
+        rng = np.random.default_rng(2)
+
+        values = rng.normal(size=(12, 200))
+        values[rng.random(values.shape) < 0.1] = np.nan
+        values[3] = np.nan
+
+        deciles = calculator.deciles(values)
+
+        self.assertTupleEqual(deciles.shape, (12, 200))
+        self.assertTrue(np.isnan(deciles[3]).all())
+        for row in [0, 5, 11]:
+            self.assertTrue(np.array_equal(
+                deciles[row], calculator.deciles(values[row]), equal_nan=True))
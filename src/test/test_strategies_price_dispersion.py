@@ -4,6 +4,8 @@ Testing class for the strategies.price_dispersion module
 """
 import unittest
 from unittest.mock import patch
+import numpy as np
+import pandas as pd
 from intrinio_sdk.rest import ApiException
 from connectors import intrinio_data
 from datetime import datetime
@@ -43,3 +45,124 @@ class TestStrategiesPriceDispersion(unittest.TestCase):
 
             with self.assertRaises(DataError):
                 strategy.__load_financial_data__()
+
+    def test_init_invalid_max_workers(self):
+        with self.assertRaises(ValidationError):
+            PriceDispersionStrategy(['1', '2'], 2020, 1, 1, max_workers=0)
+
+    def test_load_financial_data_skips_errors(self):
+        def target_price_data(ticker, start_date, end_date, tags):
+            if ticker == 'B':
+                raise DataError("No Data", None)
+            return {
+                'zacks_target_price_std_dev': {2020: {2: 2}},
+                'zacks_target_price_mean': {2020: {2: 20}}
+            }
+
+        with patch.object(intrinio_data, 'get_company_historical_data_multi',
+                          side_effect=target_price_data), \
+                patch.object(intrinio_data, 'get_latest_close_price',
+                             return_value=('2020-02-28', 10)):
+
+            strategy = PriceDispersionStrategy(
+                ['A', 'B', 'C', 'D'], 2020, 2, 1, max_workers=3)
+            financial_data = strategy.__load_financial_data__()
+
+            self.assertListEqual(financial_data['ticker'], ['A', 'C', 'D'])
+            self.assertListEqual(
+                financial_data['dispersion_stdev_pct'], [10.0, 10.0, 10.0])
+            self.assertListEqual(
+                financial_data['analyst_expected_return'], [1.0, 1.0, 1.0])
+
+    def test_load_financial_data_unexpected_error(self):
+        with patch.object(intrinio_data, 'get_company_historical_data_multi',
+                          side_effect=KeyError("xxx")):
+
+            strategy = PriceDispersionStrategy(['A', 'B'], 2020, 2, 1)
+
+            with self.assertRaises(DataError):
+                strategy.__load_financial_data__()
+
+    def test_score_securities(self):
+        (dispersion_stdev_pct, analyst_expected_return) = PriceDispersionStrategy.score_securities(
+            [[10, 20], [40, np.nan]], [[20, 20], [30, 30]], [[2, 5], [3, 3]])
+
+        self.assertListEqual(dispersion_stdev_pct.tolist(), [
+                             [10.0, 25.0], [10.0, 10.0]])
+        self.assertEqual(analyst_expected_return[0].tolist(), [1.0, 0.0])
+        self.assertEqual(analyst_expected_return[1][0], -0.25)
+        self.assertTrue(np.isnan(analyst_expected_return[1][1]))
+
+    def test_rank_securities_same_as_dataframe_sort(self):
+        rng = np.random.default_rng(1)
+
+        for size in [2, 9, 30, 101]:
+            dispersion_stdev_pct = np.round(rng.exponential(size=size), 1)
+            analyst_expected_return = rng.integers(
+                0, 3, size=size).astype('float64')
+
+            data_frame = pd.DataFrame({
+                'dispersion_stdev_pct': dispersion_stdev_pct,
+                'analyst_expected_return': analyst_expected_return,
+                'decile': pd.qcut(dispersion_stdev_pct, 10, labels=False, duplicates='drop')
+            }).sort_values(['decile', 'analyst_expected_return'], ascending=(False, False))
+
+            (_, ranking) = PriceDispersionStrategy.rank_securities(
+                dispersion_stdev_pct, analyst_expected_return)
+
+            self.assertListEqual(ranking.tolist(), list(data_frame.index))
+
+    def test_rank_securities_multiple_periods(self):
+        dispersion_stdev_pct = [
+            [1, 2, 3, 4],
+            [4, np.nan, 2, 1]
+        ]
+        analyst_expected_return = [
+            [0.1, 0.2, 0.3, 0.4],
+            [0.1, np.nan, 0.3, 0.4]
+        ]
+
+        (decile, ranking) = PriceDispersionStrategy.rank_securities(
+            dispersion_stdev_pct, analyst_expected_return)
+
+        self.assertListEqual(decile[0].tolist(), [0, 3, 6, 9])
+        self.assertListEqual(ranking.tolist(), [
+            [3, 2, 1, 0],
+            [0, 2, 3, 1]
+        ])
+
+        with self.assertRaises(ValidationError):
+            PriceDispersionStrategy.rank_securities([1, 2], [1, 2, 3])
+
+    def test_generate_recommendation(self):
+        target_prices = {
+            'A': (2, 20),
+            'B': (1, 20),
+            'C': (4, 20),
+            'D': (4, 40)
+        }
+
+        def target_price_data(ticker, start_date, end_date, tags):
+            (std_dev, mean) = target_prices[ticker]
+            return {
+                'zacks_target_price_std_dev': {2020: {2: std_dev}},
+                'zacks_target_price_mean': {2020: {2: mean}}
+            }
+
+        with patch.object(intrinio_data, 'get_company_historical_data_multi',
+                          side_effect=target_price_data), \
+                patch.object(intrinio_data, 'get_latest_close_price',
+                             return_value=('2020-02-28', 10)):
+
+            strategy = PriceDispersionStrategy(
+                ['A', 'B', 'C', 'D'], 2020, 2, 2)
+            strategy.generate_recommendation()
+
+        self.assertListEqual(list(strategy.raw_dataframe['ticker']), [
+                             'C', 'D', 'A', 'B'])
+        self.assertListEqual(
+            list(strategy.raw_dataframe['decile']), [7, 3, 3, 0])
+        self.assertListEqual(list(strategy.recommendation_dataframe.columns), [
+                             'analysis_period', 'ticker', 'analysis_price'])
+        self.assertListEqual([s['ticker_symbol'] for s in strategy.recommendation_set.model['securities_set']],
+                             ['C', 'D'])
@@ -3,6 +3,9 @@
 """
 import unittest
 import shutil
+import pickle
+from unittest.mock import patch
+from support import financial_cache
 from support.financial_cache import FinancialCache
 from exception.exceptions import ValidationError, FileSystemError
 
@@ -78,6 +81,14 @@ class TestFinancialCache(unittest.TestCase):
         self.assertEqual(self.test_cache.read(key)["a"], 1)
         self.assertEqual(self.test_cache.read(key)["b"], 2)
 
+    def test_contains(self):
+        key = 'test-contains'
+
+        self.assertFalse(self.test_cache.contains(key))
+        self.test_cache.write(key, 1234)
+        self.assertTrue(self.test_cache.contains(key))
+        self.assertFalse(self.test_cache.contains(None))
+
     def test_value_not_found(self):
         key = 'not-found'
         self.assertEqual(self.test_cache.read(key), None)
@@ -103,3 +114,91 @@ class TestFinancialCache(unittest.TestCase):
 
         finally:
             shutil.rmtree(small_cache_path)
+
+    def test_memory_tier_hits(self):
+        memory_cache_path = "./test/cache-unittest-memory/"
+        memory_test_cache = FinancialCache(memory_cache_path)
+
+        try:
+            memory_test_cache.write("test-key", "1234")
+
+            self.assertEqual(memory_test_cache.read("test-key"), "1234")
+            self.assertEqual(memory_test_cache.read("not-found"), None)
+
+            # clear the memory tier so that the next read goes to disk
+            memory_test_cache.memory_cache.clear()
+            memory_test_cache.memory_cache_size_bytes = 0
+
+            self.assertEqual(memory_test_cache.read("test-key"), "1234")
+            self.assertEqual(memory_test_cache.read("test-key"), "1234")
+
+            stats = memory_test_cache.stats()
+            self.assertEqual(stats['memory_hits'], 2)
+            self.assertEqual(stats['disk_hits'], 1)
+            self.assertEqual(stats['misses'], 1)
+            self.assertEqual(stats['memory_items'], 1)
+        finally:
+            memory_test_cache.disk_cache.close()
+            shutil.rmtree(memory_cache_path)
+
+    def test_memory_tier_eviction(self):
+        memory_cache_path = "./test/cache-unittest-eviction/"
+        value_size = len(pickle.dumps("x" * 100, pickle.HIGHEST_PROTOCOL))
+        memory_test_cache = FinancialCache(
+            memory_cache_path, max_memory_cache_size_bytes=value_size * 2)
+
+        try:
+            memory_test_cache.write("key-1", "1" * 100)
+            memory_test_cache.write("key-2", "2" * 100)
+
+            # key-1 becomes the most recently used
+            memory_test_cache.read("key-1")
+            memory_test_cache.write("key-3", "3" * 100)
+
+            self.assertListEqual(
+                list(memory_test_cache.memory_cache.keys()), ["key-1", "key-3"])
+            self.assertEqual(
+                memory_test_cache.stats()['memory_size_bytes'], value_size * 2)
+
+            # evicted keys are still served by the disk tier
+            self.assertEqual(memory_test_cache.read("key-2"), "2" * 100)
+        finally:
+            memory_test_cache.disk_cache.close()
+            shutil.rmtree(memory_cache_path)
+
+    def test_values_are_pickled_once(self):
+        key = 'test-pickled-once'
+
+        with patch.object(financial_cache.pickle, 'dumps', wraps=pickle.dumps) as dumps:
+            self.test_cache.write(key, {'a': [1, 2, 3]})
+
+            # clear the memory tier so that the next read goes to disk
+            with self.test_cache.lock:
+                self.test_cache.memory_cache.pop(key)
+                self.test_cache.memory_cache_size_bytes = 0
+
+            self.assertDictEqual(self.test_cache.read(key), {'a': [1, 2, 3]})
+            self.assertEqual(dumps.call_count, 1)
+
+        self.assertEqual(self.test_cache.memory_cache[key][1], len(
+            pickle.dumps({'a': [1, 2, 3]}, pickle.HIGHEST_PROTOCOL)))
+
+    def test_read_unpickled_disk_value(self):
+        key = 'test-unpickled'
+
+        # written directly to disk, as earlier versions of the cache did
+        self.test_cache.disk_cache.set(key, {'a': 1})
+
+        self.assertDictEqual(self.test_cache.read(key), {'a': 1})
+        self.assertNotIn(key, self.test_cache.memory_cache)
+
+    def test_expired_value(self):
+        key = 'test-expired'
+
+        self.test_cache.write(key, 1234, expire_seconds=-1)
+        self.assertEqual(self.test_cache.read(key), None)
+        self.assertFalse(self.test_cache.contains(key))
+
+        # values without an expiration are kept
+        self.test_cache.write(key, 1234, expire_seconds=None)
+        self.assertEqual(self.test_cache.read(key), 1234)
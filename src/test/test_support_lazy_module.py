@@ -0,0 +1,37 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the support.lazy_module module
+"""
+import unittest
+import json
+import sys
+from unittest.mock import patch
+from support import lazy_module
+from support.lazy_module import LazyModule
+
+
+class TestLazyModule(unittest.TestCase):
+    """
+        Testing class for the support.lazy_module module
+    """
+
+    def test_import_on_first_use(self):
+        with patch.dict(sys.modules):
+            del sys.modules['json']
+
+            module = lazy_module.lazy_import('json')
+
+            self.assertIsInstance(module, LazyModule)
+            self.assertNotIn('json', sys.modules)
+
+            self.assertEqual(module.dumps([1]), '[1]')
+            self.assertIn('json', sys.modules)
+            self.assertIn('dumps', dir(module))
+
+    def test_already_imported(self):
+        self.assertIs(lazy_module.lazy_import('json'), json)
+
+    def test_missing_module(self):
+        module = lazy_module.lazy_import('does_not_exist')
+
+        with self.assertRaises(ImportError):
+            module.anything
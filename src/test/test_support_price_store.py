@@ -0,0 +1,183 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the support.price_store module
+"""
+import unittest
+import multiprocessing
+import resource
+import shutil
+import tempfile
+from datetime import date, timedelta
+import numpy as np
+from support import price_store
+from support.price_store import PriceStore
+from exception.exceptions import FileSystemError, ValidationError
+
+
+def write_alternate_days(store_path: str, first_day: int):
+    '''
+        Writes the price of every other day, starting from 'first_day',
+        one day at a time. Executed by a separate process
+    '''
+    test_store = PriceStore(store_path)
+    for day in range(first_day, 80, 2):
+        price_date = (date(2019, 1, 1) + timedelta(days=day)).strftime("%Y-%m-%d")
+        test_store.missing_date_ranges('AAPL', price_date, price_date)
+        test_store.write('AAPL', {price_date: day}, [(price_date, price_date)])
+
+
+class TestPriceStore(unittest.TestCase):
+
+    """
+        Testing class for the support.price_store module
+    """
+
+    test_path = "./test/price-store-unittest/"
+    test_store = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.test_store = PriceStore(cls.test_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_path)
+
+    def test_no_store_path(self):
+        with self.assertRaises(FileSystemError):
+            PriceStore(None)
+
+    def test_invalid_max_loaded_tickers(self):
+        with self.assertRaises(ValidationError):
+            PriceStore(self.test_path, max_loaded_tickers=0)
+
+    def test_read_more_tickers_than_open_file_limit(self):
+        (soft_limit, hard_limit) = resource.getrlimit(resource.RLIMIT_NOFILE)
+        store_path = tempfile.mkdtemp()
+
+        try:
+            test_store = PriceStore(store_path, max_loaded_tickers=32)
+            ticker_list = ["T%03d" % i for i in range(0, 300)]
+            for ticker in ticker_list:
+                test_store.write(ticker, {'2019-10-01': 100},
+                                 [('2019-10-01', '2019-10-01')])
+
+            # two memory mapped files per loaded ticker would exceed this limit
+            resource.setrlimit(resource.RLIMIT_NOFILE,
+                               (min(256, soft_limit), hard_limit))
+
+            for ticker in ticker_list:
+                (_, closes) = test_store.read(
+                    ticker, '2019-10-01', '2019-10-31')
+                self.assertEqual(closes[0], 100)
+
+            self.assertEqual(len(test_store.loaded_tickers), 32)
+            self.assertListEqual(
+                list(test_store.loaded_tickers.keys())[-2:], ['T298', 'T299'])
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE,
+                               (soft_limit, hard_limit))
+            shutil.rmtree(store_path)
+
+    def test_write_from_multiple_processes(self):
+        store_path = tempfile.mkdtemp()
+
+        try:
+            processes = [multiprocessing.Process(target=write_alternate_days, args=(store_path, first_day))
+                         for first_day in (0, 1)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+
+            test_store = PriceStore(store_path)
+            (_, closes) = test_store.read('AAPL', '2019-01-01', '2019-12-31')
+
+            self.assertListEqual(list(closes), list(range(0, 80)))
+            self.assertListEqual(test_store.missing_date_ranges(
+                'AAPL', '2019-01-01', '2019-03-21'), [])
+        finally:
+            shutil.rmtree(store_path)
+
+    def test_read_unknown_ticker(self):
+        (dates, closes) = self.test_store.read(
+            'UNKNOWN', '2019-10-01', '2019-10-31')
+
+        self.assertEqual(len(dates), 0)
+        self.assertEqual(len(closes), 0)
+        self.assertListEqual(self.test_store.missing_date_ranges(
+            'UNKNOWN', '2019-10-01', '2019-10-31'), [('2019-10-01', '2019-10-31')])
+
+    def test_write_and_read(self):
+        self.test_store.write('AAA', {
+            '2019-10-02': 101,
+            '2019-10-01': 100,
+            '2019-10-04': 103
+        }, [('2019-10-01', '2019-10-04')])
+
+        (dates, closes) = self.test_store.read(
+            'AAA', '2019-10-02', '2019-10-31')
+
+        self.assertListEqual([str(d) for d in dates], [
+                             '2019-10-02', '2019-10-04'])
+        self.assertListEqual(list(closes), [101, 103])
+        self.assertIsInstance(closes.base, np.memmap)
+
+    def test_write_merges_prices_and_ranges(self):
+        self.test_store.write('BBB', {
+            '2019-10-01': 100,
+            '2019-10-02': 101
+        }, [('2019-10-01', '2019-10-02')])
+        self.test_store.write('BBB', {
+            '2019-10-02': 111,
+            '2019-10-03': 102
+        }, [('2019-10-02', '2019-10-03')])
+
+        (dates, closes) = self.test_store.read(
+            'BBB', '2019-10-01', '2019-10-31')
+
+        self.assertListEqual([str(d) for d in dates], [
+                             '2019-10-01', '2019-10-02', '2019-10-03'])
+        self.assertListEqual(list(closes), [100, 111, 102])
+        self.assertListEqual(self.test_store.missing_date_ranges(
+            'BBB', '2019-10-01', '2019-10-05'), [('2019-10-04', '2019-10-05')])
+
+    def test_write_recent_date_ranges(self):
+        self.test_store.write('CCC', {
+            '2019-10-01': 100,
+            '2019-10-02': 101
+        }, [('2019-10-01', '2019-10-01')], [('2019-10-02', '2019-10-02')], 60)
+        self.test_store.write('DDD', {
+            '2019-10-01': 100,
+            '2019-10-02': 101
+        }, [('2019-10-01', '2019-10-01')], [('2019-10-02', '2019-10-02')], -1)
+
+        self.assertListEqual(self.test_store.missing_date_ranges(
+            'CCC', '2019-10-01', '2019-10-02'), [])
+        self.assertListEqual(self.test_store.missing_date_ranges(
+            'DDD', '2019-10-01', '2019-10-02'), [('2019-10-02', '2019-10-02')])
+
+    def test_missing_date_ranges(self):
+        date_ranges = [('2019-10-05', '2019-10-10'),
+                       ('2019-10-20', '2019-10-25')]
+
+        self.assertListEqual(price_store.missing_date_ranges(date_ranges, '2019-10-01', '2019-10-31'), [
+            ('2019-10-01', '2019-10-04'),
+            ('2019-10-11', '2019-10-19'),
+            ('2019-10-26', '2019-10-31')
+        ])
+        self.assertListEqual(price_store.missing_date_ranges(
+            date_ranges, '2019-10-06', '2019-10-09'), [])
+        self.assertListEqual(price_store.missing_date_ranges(
+            [], '2019-10-06', '2019-10-09'), [('2019-10-06', '2019-10-09')])
+
+    def test_merge_date_ranges(self):
+        date_ranges = [('2019-12-01', '2019-12-31'),
+                       ('2019-10-11', '2019-10-20'),
+                       ('2019-10-01', '2019-10-10'),
+                       ('2019-10-15', '2019-10-18')]
+
+        self.assertListEqual(price_store.merge_date_ranges(date_ranges), [
+            ('2019-10-01', '2019-10-20'),
+            ('2019-12-01', '2019-12-31')
+        ])
@@ -0,0 +1,104 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the support.rate_limiter module
+"""
+import random
+import unittest
+from exception.exceptions import ValidationError
+from support.rate_limiter import RateLimiter
+from test.fake_clock import FakeClock
+
+
+class TestSupportRateLimiter(unittest.TestCase):
+    """
+        Testing class for the support.rate_limiter module
+    """
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            RateLimiter(0)
+
+        with self.assertRaises(ValidationError):
+            RateLimiter(None)
+
+        with self.assertRaises(ValidationError):
+            RateLimiter(60, burst=0)
+
+    def test_burst(self):
+        clock = FakeClock()
+        rate_limiter = RateLimiter(60, burst=3, clock=clock)
+
+        for _ in range(0, 3):
+            self.assertEqual(rate_limiter.acquire(), 0)
+
+        self.assertEqual(rate_limiter.acquire(), 1)
+        self.assertListEqual(clock.sleeps, [1])
+
+    def test_sustained_rate(self):
+        clock = FakeClock()
+        rate_limiter = RateLimiter(120, clock=clock)
+
+        for _ in range(0, 5):
+            rate_limiter.acquire()
+
+        self.assertListEqual(clock.sleeps, [0.5, 0.5, 0.5, 0.5])
+
+    def test_tokens_do_not_exceed_burst(self):
+        clock = FakeClock()
+        rate_limiter = RateLimiter(60, burst=2, clock=clock)
+
+        clock.now = 1000
+        for _ in range(0, 3):
+            rate_limiter.acquire()
+
+        self.assertListEqual(clock.sleeps, [1])
+
+    def test_pause(self):
+        clock = FakeClock()
+        rate_limiter = RateLimiter(60, burst=5, clock=clock)
+
+        rate_limiter.pause(10)
+        rate_limiter.pause(2)
+
+        # the bucket is refilled from the end of the pause
+        self.assertEqual(rate_limiter.acquire(), 11)
+        self.assertEqual(clock.now, 11)
+
+    def test_stats(self):
+        clock = FakeClock()
+        rate_limiter = RateLimiter(60, burst=2, clock=clock)
+
+        for _ in range(0, 3):
+            rate_limiter.acquire()
+        rate_limiter.pause(5)
+
+        self.assertDictEqual(rate_limiter.stats(), {
+            'requests': 3,
+            'requests_last_minute': 3,
+            'throttled_requests': 1,
+            'throttle_wait_seconds': 1.0,
+            'pauses': 1
+        })
+
+        # requests were made at 0, 0 and 1 seconds
+        clock.now = 60
+        self.assertEqual(rate_limiter.stats()['requests_last_minute'], 1)
+
+        clock.now = 61
+        self.assertEqual(rate_limiter.stats()['requests_last_minute'], 0)
+
+    def test_fractional_waits_complete(self):
+        class BoundedClock(FakeClock):
+            def sleep(self, seconds: float):
+                if len(self.sleeps) > 1000:
+                    raise AssertionError("acquire() did not complete")
+                super().sleep(seconds)
+
+        clock = BoundedClock()
+        rate_limiter = RateLimiter(97, burst=3, clock=clock)
+        delays = random.Random(0)
+
+        for _ in range(0, 200):
+            rate_limiter.pause(delays.uniform(0, 2))
+            rate_limiter.acquire()
+
+        self.assertEqual(rate_limiter.stats()['requests'], 200)
@@ -0,0 +1,104 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the support.startup_profiler module
+"""
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+from support import startup_profiler
+from support.startup_profiler import StartupProfiler
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """
+        Testing class for the support.startup_profiler module
+    """
+
+    def setUp(self):
+        # a package whose __init__ imports a slow module
+        self.package_dir = tempfile.TemporaryDirectory()
+
+        package_path = os.path.join(self.package_dir.name, 'profiled_pkg')
+        os.mkdir(package_path)
+        with open(os.path.join(package_path, '__init__.py'), 'w') as file:
+            file.write("from profiled_pkg import slow_module\n")
+        with open(os.path.join(package_path, 'slow_module.py'), 'w') as file:
+            file.write("import time\ntime.sleep(0.05)\n")
+
+        sys.path.insert(0, self.package_dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self.package_dir.name)
+        for module_name in ['profiled_pkg', 'profiled_pkg.slow_module']:
+            sys.modules.pop(module_name, None)
+        self.package_dir.cleanup()
+
+    def test_import_times(self):
+        profiler = StartupProfiler()
+        profiler.install()
+        try:
+            import profiled_pkg
+        finally:
+            profiler.uninstall()
+
+        self.assertNotIn(profiler, sys.meta_path)
+
+        (package_self, package_cumulative) = profiler.module_times['profiled_pkg']
+        (module_self, module_cumulative) = profiler.module_times['profiled_pkg.slow_module']
+
+        self.assertGreaterEqual(module_self, 0.05)
+        self.assertAlmostEqual(module_self, module_cumulative)
+        self.assertGreaterEqual(package_cumulative, module_cumulative)
+        self.assertLess(package_self, module_self)
+        self.assertAlmostEqual(profiler.import_seconds, package_cumulative)
+
+        # the original loader is restored
+        self.assertNotIsInstance(
+            profiled_pkg.__loader__, startup_profiler._TimedLoader)
+        self.assertNotIsInstance(
+            profiled_pkg.__spec__.loader, startup_profiler._TimedLoader)
+
+    def test_record_api_call(self):
+        profiler = StartupProfiler()
+
+        profiler.record_api_call('intrinio')
+        first_call = profiler.first_api_calls['intrinio']
+        profiler.record_api_call('intrinio')
+
+        self.assertEqual(profiler.first_api_calls['intrinio'], first_call)
+
+        with patch.object(startup_profiler, 'profiler', None):
+            startup_profiler.record_api_call('intrinio')
+
+        with patch.object(startup_profiler, 'profiler', profiler):
+            startup_profiler.record_api_call('aws')
+
+        self.assertListEqual(
+            list(profiler.first_api_calls.keys()), ['intrinio', 'aws'])
+
+    def test_report(self):
+        profiler = StartupProfiler()
+        profiler.module_times = {
+            'pkg': [0.1, 0.4],
+            'pkg.a': [0.3, 0.3],
+            'other': [0.2, 0.2]
+        }
+        profiler.import_seconds = 0.6
+        profiler.record_api_call('intrinio')
+
+        with patch.object(startup_profiler, 'STARTUP_PROFILE_TOP_MODULES', 2):
+            report = profiler.report()
+
+        self.assertEqual(report['import_seconds'], 0.6)
+        self.assertEqual(report['imported_modules'], 3)
+        self.assertListEqual(
+            list(report['first_api_call_seconds'].keys()), ['intrinio'])
+        self.assertListEqual(report['packages'], [
+            {'package': 'pkg', 'seconds': 0.4},
+            {'package': 'other', 'seconds': 0.2}
+        ])
+        self.assertListEqual(report['modules'], [
+            {'module': 'pkg.a', 'self_seconds': 0.3, 'cumulative_seconds': 0.3},
+            {'module': 'other', 'self_seconds': 0.2, 'cumulative_seconds': 0.2}
+        ])
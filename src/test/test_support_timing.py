@@ -0,0 +1,183 @@
+"""Author: Mark Hanegraaff -- 2020
+    Testing class for the support.timing module
+"""
+import unittest
+import json
+import os
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+from connectors import intrinio_data
+from support import timing
+from exception.exceptions import ValidationError, FileSystemError
+
+
+class TestSupportTiming(unittest.TestCase):
+    """
+        Testing class for the support.timing module
+    """
+
+    def setUp(self):
+        self.span_stats = patch.object(timing, 'span_stats', {})
+        self.counter_sources = patch.object(timing, 'counter_sources', {})
+        self.span_stats.start()
+        self.counter_sources.start()
+
+    def tearDown(self):
+        self.span_stats.stop()
+        self.counter_sources.stop()
+
+    def test_span(self):
+        with timing.span('phase'):
+            pass
+
+        with self.assertRaises(ValueError):
+            with timing.span('phase'):
+                raise ValueError("error")
+
+        (count, errors, total_seconds, max_seconds,
+         bucket_counts) = timing.span_stats['phase']
+
+        self.assertEqual(count, 2)
+        self.assertEqual(errors, 1)
+        self.assertGreaterEqual(total_seconds, max_seconds)
+        self.assertEqual(sum(bucket_counts), 2)
+
+    def test_timed(self):
+        @timing.timed()
+        def add(a, b):
+            return a + b
+
+        @timing.timed('custom')
+        def fail():
+            raise ValueError("error")
+
+        self.assertEqual(add(1, b=2), 3)
+        self.assertEqual(add.__name__, 'add')
+
+        with self.assertRaises(ValueError):
+            fail()
+
+        self.assertListEqual(sorted(timing.span_stats.keys()), [
+                             'custom', 'test_support_timing.add'])
+        self.assertEqual(timing.span_stats['custom'][1], 1)
+
+    def test_report(self):
+        timing.record('b', 0.2)
+        timing.record('a', 0.1)
+        timing.record('a', 0.3, True)
+        timing.register_counters('cache', lambda: {'hits': 1, 'misses': 2})
+        timing.register_counters('broken', lambda: 1 / 0)
+
+        report = timing.report()
+
+        buckets = report[0].pop('buckets')
+        self.assertDictEqual(report[0], {
+            'span': 'a',
+            'count': 2,
+            'errors': 1,
+            'total_seconds': 0.4,
+            'mean_seconds': 0.2,
+            'max_seconds': 0.3
+        })
+        self.assertEqual(buckets['0.05'], 0)
+        self.assertEqual(buckets['0.1'], 1)
+        self.assertEqual(buckets['0.25'], 1)
+        self.assertEqual(buckets['0.5'], 2)
+        self.assertEqual(buckets['+Inf'], 2)
+        self.assertEqual(report[1]['span'], 'b')
+        self.assertDictEqual(
+            report[2], {'counters': 'cache', 'hits': 1, 'misses': 2})
+        self.assertEqual(report[3]['counters'], 'broken')
+        self.assertIn('error', report[3])
+
+    def test_log_report(self):
+        timing.record('a', 0.1)
+
+        with self.assertLogs(level='INFO') as logs:
+            timing.log_report()
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(json.loads(logs.output[0].split(
+            "Timing: ")[1])['span'], 'a')
+
+    def test_histogram_overflow(self):
+        timing.record('a', 1000.0)
+
+        buckets = timing.report()[0]['buckets']
+
+        self.assertEqual(buckets[str(timing.LATENCY_BUCKETS[-1])], 0)
+        self.assertEqual(buckets['+Inf'], 1)
+
+    def test_prometheus_report(self):
+        timing.record('td_ameritrade.get_order', 0.2)
+        timing.record('td_ameritrade.get_order', 2.0, True)
+        timing.register_counters(
+            'cache', lambda: {'misses': 2, 'enabled': True, 'path': 'x'})
+
+        lines = timing.prometheus_report().splitlines()
+
+        self.assertIn('# TYPE stock_advisor_span_seconds histogram', lines)
+        self.assertIn(
+            'stock_advisor_span_seconds_bucket{span="td_ameritrade.get_order",le="0.1"} 0', lines)
+        self.assertIn(
+            'stock_advisor_span_seconds_bucket{span="td_ameritrade.get_order",le="0.25"} 1', lines)
+        self.assertIn(
+            'stock_advisor_span_seconds_bucket{span="td_ameritrade.get_order",le="+Inf"} 2', lines)
+        self.assertIn(
+            'stock_advisor_span_seconds_sum{span="td_ameritrade.get_order"} 2.2', lines)
+        self.assertIn(
+            'stock_advisor_span_seconds_count{span="td_ameritrade.get_order"} 2', lines)
+        self.assertIn(
+            'stock_advisor_span_errors_total{span="td_ameritrade.get_order"} 1', lines)
+        self.assertIn(
+            'stock_advisor_counter{counters="cache",counter="misses"} 2', lines)
+        self.assertEqual(
+            len([line for line in lines if 'counter="' in line]), 1)
+
+    def test_prometheus_label_escaping(self):
+        timing.record('a"b\\c', 0.1)
+
+        self.assertIn('span="a\\"b\\\\c"', timing.prometheus_report())
+
+    def test_dump_report(self):
+        timing.record('a', 0.1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'metrics.json')
+            timing.dump_report(timing.REPORT_FORMAT_JSON, file_name)
+
+            with open(file_name) as file:
+                self.assertEqual(json.load(file)[0]['span'], 'a')
+
+            file_name = os.path.join(temp_dir, 'metrics.prom')
+            timing.dump_report(timing.REPORT_FORMAT_PROMETHEUS, file_name)
+
+            with open(file_name) as file:
+                self.assertTrue(file.read().startswith(
+                    '# HELP stock_advisor_span_seconds'))
+
+        with self.assertLogs(level='INFO') as logs:
+            timing.dump_report(timing.REPORT_FORMAT_JSON)
+        self.assertTrue(logs.output[0].endswith(
+            json.dumps(timing.report(), indent=2)))
+
+    def test_dump_report_invalid_parameters(self):
+        with self.assertRaises(ValidationError):
+            timing.dump_report('xml')
+
+        with self.assertRaises(ValidationError):
+            timing.dump_report_at_exit('xml')
+
+        with self.assertRaises(FileSystemError):
+            timing.dump_report(timing.REPORT_FORMAT_JSON,
+                               '/does/not/exist/metrics.json')
+
+    def test_intrinio_data_is_timed(self):
+        with patch.object(intrinio_data, '_get_company_historical_data', return_value=[]):
+            intrinio_data.get_target_price_mean(
+                'AAPL', datetime(2019, 9, 1), datetime(2019, 9, 30))
+
+        self.assertEqual(
+            timing.span_stats['intrinio_data.get_target_price_mean'][0], 1)
+
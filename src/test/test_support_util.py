@@ -25,3 +25,10 @@ class TestSupportUtil(unittest.TestCase):
 
     def test_date_to_iso_utc_string_none(self):
         self.assertEqual(util.date_to_iso_utc_string(None), "None")
+
+    def test_parse_period_valid(self):
+        self.assertTupleEqual(util.parse_period("2019/05"), (2019, 5))
+
+    def test_parse_period_invalid(self):
+        with self.assertRaises(ValidationError):
+            util.parse_period("2019-05")
@@ -0,0 +1,68 @@
+"""trading_benchmark.py
+
+Measures the latency of the portfolio manager trading path (cancel open
+orders, unwind positions, size and place buys, track fills, synchronize)
+against a local TDAmeritrade simulator, with configurable API latency,
+fill delays and rejection rates.
+"""
+import argparse
+import logging
+from services import trading_benchmark_svc
+from support import util
+from support import logging_definition
+
+log = logging.getLogger()
+
+
+def main():
+    """
+        Main Function for this script
+    """
+
+    description = """
+                Benchmarks the portfolio manager trading path against a local
+                TDAmeritrade simulator. Every run sells 'portfolio_size'
+                positions and buys a new portfolio of the same size.
+              """
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-portfolio_size", help="Number of securities sold and bought", type=int, default=10)
+    parser.add_argument(
+        "-runs", help="Number of benchmark runs", type=int, default=3)
+    parser.add_argument(
+        "-latency", help="Simulated API latency in seconds", type=float, default=0.05)
+    parser.add_argument(
+        "-fill_delay", help="Seconds after which orders are filled", type=float, default=1)
+    parser.add_argument(
+        "-rejection_rate", help="Probability that an order is rejected (0-1)", type=float, default=0)
+    parser.add_argument(
+        "-poll_interval", help="Initial order polling interval in seconds", type=float, default=2)
+    parser.add_argument(
+        "-seed", help="Random seed", type=int, default=None)
+
+    args = parser.parse_args()
+
+    log.info("Parameters:")
+    log.info("Portfolio Size: %d" % args.portfolio_size)
+    log.info("Runs: %d" % args.runs)
+    log.info("Latency: %.3fs" % args.latency)
+    log.info("Fill Delay: %.3fs" % args.fill_delay)
+    log.info("Rejection Rate: %.2f" % args.rejection_rate)
+    log.info("Poll Interval: %.3fs" % args.poll_interval)
+
+    try:
+        (_, summary) = trading_benchmark_svc.run_benchmark(
+            args.portfolio_size, args.runs, args.poll_interval,
+            latency=args.latency, fill_delay=args.fill_delay,
+            rejection_rate=args.rejection_rate, seed=args.seed)
+
+        log.info("Benchmark results:")
+        log.info(util.format_dict(summary))
+
+    except Exception as e:
+        log.error("Could run script, because, %s" % (str(e)))
+        exit(-1)
+
+if __name__ == "__main__":
+    main()